@@ -9,6 +9,7 @@ from api.accounts.user.utils import remove_user_dc_binding
 from api.accounts.messages import LOG_GROUP_CREATE, LOG_GROUP_UPDATE, LOG_GROUP_DELETE, LOG_USER_UPDATE
 from api.task.response import SuccessTaskResponse, FailureTaskResponse
 from api.task.utils import task_log_success
+from api.task.log import log_bulk
 from api.dc.utils import attach_dc_virt_object
 from api.dc.messages import LOG_GROUP_ATTACH
 from gui.models import User, Role
@@ -107,9 +108,11 @@ class GroupView(APIView):
                         remove_user_dc_binding(task_id, user, dc=dc)
 
             # Update Users that were removed from group or added to group
-            for user in affected_users:
-                detail = "groups='%s'" % ','.join(user.roles.all().values_list('name', flat=True))
-                task_log_success(task_id, LOG_USER_UPDATE, obj=user, owner=user, update_user_tasks=False, detail=detail)
+            with log_bulk():
+                for user in affected_users:
+                    detail = "groups='%s'" % ','.join(user.roles.all().values_list('name', flat=True))
+                    task_log_success(task_id, LOG_USER_UPDATE, obj=user, owner=user, update_user_tasks=False,
+                                     detail=detail)
 
         # Permission or users for this group were changed, which may affect the cached list of DC admins for DCs which
         # are attached to this group. So we need to clear the list of admins cached for each affected DC
@@ -8,6 +8,8 @@ from vms.models import DefaultDc
 # noinspection PyProtectedMember
 from api.fields import get_boolean_value
 from api.exceptions import InvalidInput
+from api.paginator import KeysetPaginator, get_keyset_pager
+from api.renderers import JSONStream
 from api.task.response import TaskResponse, FailureTaskResponse, SuccessTaskResponse
 
 
@@ -17,6 +19,8 @@ class APIView(object):
     """
     _full = None
     _extended = None
+    _stream = None
+    stream_chunk_size = 500  # Number of rows fetched and serialized at once in a streamed response
     serializer = None
     data = None
     dc_bound = True
@@ -117,6 +121,21 @@ class APIView(object):
 
         return SuccessTaskResponse(self.request, res, dc_bound=self.dc_bound)
 
+    def get_many(self, qs, serialize=list, per_page=100):
+        """Return serialized rows of a queryset. The rows are paginated by a keyset paginator if the cursor
+        parameter is present or streamed in chunks (JSONStream) if the stream parameter is true"""
+        cursor = self.data.get('cursor', None) if self.data else None
+
+        if cursor is not None:
+            pager = get_keyset_pager(self.request, qs, self.order_by, per_page=per_page, cursor=cursor)
+            return pager.get_response_results(serialize(pager.object_list))
+
+        if self.stream:
+            pager = KeysetPaginator(self.request, qs, self.order_by, per_page=self.stream_chunk_size)
+            return JSONStream(serialize(page) for page in pager.iter_pages())
+
+        return serialize(qs)
+
     def is_full(self, data):
         return self.request.method == 'GET' and bool(data) and get_boolean_value(data.get('full', False))
 
@@ -135,6 +154,15 @@ class APIView(object):
             self._extended = self.is_extended(self.data)
         return self._extended
 
+    def is_stream(self, data):
+        return self.request.method == 'GET' and bool(data) and get_boolean_value(data.get('stream', False))
+
+    @property
+    def stream(self):
+        if self._stream is None:
+            self._stream = self.is_stream(self.data)
+        return self._stream
+
 
 class TaskAPIView(APIView):
     """
@@ -218,12 +218,28 @@ class TokenAuthentication(BaseAuthentication):
         return self.authenticate_credentials(token)
 
     def authenticate_credentials(self, key):
+        from api.authtoken.cache import authtoken_cache, INVALID
+
         model = self.get_model()
-        try:
-            token = model.objects.select_related('user').get(key=key)
-        except model.DoesNotExist:
+        cached = authtoken_cache.get(key)
+
+        if cached is None:
+            try:
+                token = model.objects.select_related('user').get(key=key)
+            except model.DoesNotExist:
+                authtoken_cache.set_invalid(key)
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            else:
+                authtoken_cache.set(token)
+
+        elif cached is INVALID:
             raise exceptions.AuthenticationFailed(_('Invalid token.'))
 
+        else:
+            # The cached user is invalidated when the user is saved and deleted users have no tokens
+            user, created = cached
+            token = model(key=key, user=user, created=created)
+
         if not token.user.is_active:
             raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
 
@@ -26,9 +26,20 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 *******************************************************************************
 """
 from django.apps import AppConfig
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
 from django.utils.translation import ugettext_lazy as _
 
 
 class AuthTokenConfig(AppConfig):
     name = 'api.authtoken'
     verbose_name = _("Auth Token")
+
+    def ready(self):
+        from api.authtoken.cache import AuthTokenCache
+
+        token = self.get_model('Token')
+        post_save.connect(AuthTokenCache.token_post_save, sender=token, dispatch_uid='post_save_authtoken')
+        post_delete.connect(AuthTokenCache.token_post_delete, sender=token, dispatch_uid='post_delete_authtoken')
+        post_save.connect(AuthTokenCache.user_post_save, sender=get_user_model(),
+                          dispatch_uid='post_save_user_authtoken')
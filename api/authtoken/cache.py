@@ -0,0 +1,91 @@
+from hashlib import sha256
+from logging import getLogger
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = getLogger(__name__)
+
+CACHE_AUTHTOKEN_KEY = 'authtoken:%s'
+INVALID = False
+
+
+class AuthTokenCache(object):
+    """
+    Short-lived cache of API token lookups used by TokenAuthentication: sha256(token key) -> (user, created) for valid
+    tokens or INVALID for unknown tokens. A cache hit does not touch the DB - the user object is stored in the cache
+    and every hit returns a new (unpickled) copy.
+
+    Entries are removed when a token or its user is saved. A deleted (revoked) token is replaced by an INVALID entry,
+    which cannot be overwritten by a concurrent request that loaded the token from DB before it was deleted
+    (new entries are stored by cache.add()). The hit/miss counters are process-local.
+    """
+    def __init__(self):
+        self.hits = 0
+        self.invalid_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def cache_key(key):
+        return CACHE_AUTHTOKEN_KEY % sha256(key.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return tuple (user, created), INVALID or None if the token is not cached"""
+        res = cache.get(self.cache_key(key))
+
+        if res is None:
+            self.misses += 1
+        elif res is INVALID:
+            self.invalid_hits += 1
+        else:
+            self.hits += 1
+
+        return res
+
+    def set(self, token):
+        cache.add(self.cache_key(token.key), (token.user, token.created), settings.AUTHTOKEN_CACHE_TIMEOUT)
+
+    def set_invalid(self, key):
+        cache.add(self.cache_key(key), INVALID, settings.AUTHTOKEN_CACHE_INVALID_TIMEOUT)
+
+    def revoke(self, key):
+        cache.set(self.cache_key(key), INVALID, settings.AUTHTOKEN_CACHE_INVALID_TIMEOUT)
+
+    def delete(self, key):
+        cache.delete(self.cache_key(key))
+
+    def get_stats(self):
+        """Return process-local counters of cached lookups and DB fallbacks"""
+        total = self.hits + self.invalid_hits + self.misses
+
+        return {
+            'hits': self.hits,
+            'invalid_hits': self.invalid_hits,
+            'misses': self.misses,
+            'hit_rate': float(self.hits + self.invalid_hits) / total if total else None,
+        }
+
+    # noinspection PyUnusedLocal
+    @staticmethod
+    def token_post_save(sender, instance, **kwargs):
+        authtoken_cache.delete(instance.key)
+
+    # noinspection PyUnusedLocal
+    @staticmethod
+    def token_post_delete(sender, instance, **kwargs):
+        authtoken_cache.revoke(instance.key)
+
+    # noinspection PyUnusedLocal
+    @staticmethod
+    def user_post_save(sender, instance, created, **kwargs):
+        """The user object is part of the cached value"""
+        if created:
+            return
+
+        from api.authtoken.models import Token
+
+        for key in Token.objects.filter(user=instance).values_list('key', flat=True):
+            authtoken_cache.delete(key)
+
+
+authtoken_cache = AuthTokenCache()
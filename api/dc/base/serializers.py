@@ -15,6 +15,7 @@ from api.sms.utils import get_services
 from api.mon.backends.abstract import VM_KWARGS, VM_KWARGS_NIC, VM_KWARGS_DISK
 from gui.models import User, UserProfile, Role
 from vms.models import Dc, DefaultDc, Vm, BackupDefine
+from vms.models.placement import PlacementEngine
 from vms.utils import DefAttrDict
 from pdns.models import Domain
 
@@ -376,6 +377,11 @@ class DcSettingsSerializer(s.InstanceSerializer):
     VMS_BHYVE_BOOTROM_DEFAULT = s.ChoiceField(label='VMS_BHYVE_BOOTROM_DEFAULT', choices=Vm.BHYVE_BOOTROM,
                                           help_text=_('Default VM boot firmware emulation. Options are "bios" or '
                                                       '"uefi". Note that only "uefi" bootrom supports VNC.'))
+    VMS_NODE_PLACEMENT_POLICY = s.ChoiceField(label='VMS_NODE_PLACEMENT_POLICY', choices=PlacementEngine.POLICY,
+                                              help_text=_('Policy used for automatic selection of a compute node for '
+                                                          'new servers. One of: priority (nodes with less free '
+                                                          'resources first), pack (fill up nodes), spread (distribute '
+                                                          'servers evenly across nodes).'))
 
     VMS_VM_SNAPSHOT_DEFINE_LIMIT = s.IntegerField(label='VMS_VM_SNAPSHOT_DEFINE_LIMIT', required=False,
                                                   help_text=_('Maximum number of snapshot definitions per server.'))
@@ -514,7 +520,7 @@ class DcSettingsSerializer(s.InstanceSerializer):
             dc_settings = DefAttrDict(dc.custom_settings, defaults=dc1_settings)  # instance
         else:
             dc1_settings = None
-            dc_settings = dc.settings  # instance
+            dc_settings = DefAttrDict(dc.custom_settings, defaults=settings)  # instance (dc.settings is immutable)
 
         self.dc_settings = dc_settings
         dc_settings['dc'] = dc.name
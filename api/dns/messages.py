@@ -8,4 +8,6 @@ LOG_DOMAIN_DELETE = _('Delete DNS domain')
 LOG_RECORD_CREATE = _('Create DNS record')
 LOG_RECORD_UPDATE = _('Update DNS record')
 LOG_RECORD_DELETE = _('Delete DNS record')
+LOG_RECORDS_CREATE = _('Create DNS records')
+LOG_RECORDS_UPDATE = _('Update DNS records')
 LOG_RECORDS_DELETE = _('Delete DNS records')
@@ -11,8 +11,9 @@ from api.exceptions import ExpectationFailed, InvalidInput, ObjectNotFound
 from api.task.response import SuccessTaskResponse, FailureTaskResponse
 from api.dns.domain.utils import get_domain
 from api.dns.record.serializers import RecordSerializer
-from api.dns.messages import LOG_RECORD_CREATE, LOG_RECORD_UPDATE, LOG_RECORD_DELETE, LOG_RECORDS_DELETE
-from pdns.models import Domain, Record
+from api.dns.messages import (LOG_RECORD_CREATE, LOG_RECORD_UPDATE, LOG_RECORD_DELETE, LOG_RECORDS_CREATE,
+                              LOG_RECORDS_UPDATE, LOG_RECORDS_DELETE)
+from pdns.models import Domain, Record, RecordChangeSet
 
 logger = getLogger(__name__)
 
@@ -57,7 +58,12 @@ class RecordView(APIView):
             qs = self.domain.record_set.select_related('domain').order_by(*self.order_by)
 
             if records is None:
-                if request.method == 'DELETE':
+                if request.method in ('POST', 'PUT', 'DELETE'):
+                    raise InvalidInput('Invalid records')
+                self.record = qs
+            elif request.method in ('POST', 'PUT'):  # Bulk create or update (records is a list of record objects)
+                if not (isinstance(records, (tuple, list)) and records and
+                        all(isinstance(i, dict) for i in records)):
                     raise InvalidInput('Invalid records')
                 self.record = qs
             else:
@@ -103,7 +109,35 @@ class RecordView(APIView):
 
         return SuccessTaskResponse(self.request, res, dc_bound=False)
 
-    def post(self):
+    def _save_many(self, sers, status=None, msg=None):
+        errors = [ser.errors for ser in sers]
+
+        if any(errors):
+            return FailureTaskResponse(self.request, {'records': errors}, obj=self.domain, dc_bound=False,
+                                       task_id=self.task_id, **self.log_failure(msg))
+
+        # One transaction, one SOA serial increment
+        with RecordChangeSet():
+            for ser in sers:
+                ser.object.save()
+
+        dd = {'records': [ser.object.desc for ser in sers]}
+
+        return SuccessTaskResponse(self.request, [ser.data for ser in sers], status=status, obj=self.domain,
+                                   msg=msg, detail_dict=self._fix_detail_dict(dd), task_id=self.task_id,
+                                   dc_bound=False)
+
+    def post(self, many=False):
+        if many:
+            assert not self.record_id
+            domain = self.domain
+            sers = [RecordSerializer(self.request, Record(domain=domain), data=data) for data in self.data['records']]
+
+            for ser in sers:
+                ser.is_valid()
+
+            return self._save_many(sers, status=HTTP_201_CREATED, msg=LOG_RECORDS_CREATE)
+
         ser = RecordSerializer(self.request, self.record, data=self.data)
 
         if not ser.is_valid():
@@ -116,7 +150,37 @@ class RecordView(APIView):
                                    detail_dict=self._fix_detail_dict(ser.detail_dict()), msg=LOG_RECORD_CREATE,
                                    task_id=self.task_id, dc_bound=False)
 
-    def put(self):
+    def put(self, many=False):
+        if many:
+            assert not self.record_id
+            items = self.data['records']
+
+            try:
+                ids = [int(data['id']) for data in items]
+            except (KeyError, TypeError, ValueError):
+                raise InvalidInput('Invalid records')
+
+            if len(set(ids)) != len(ids):
+                raise InvalidInput('Invalid records')
+
+            records = self.record.in_bulk(ids)
+            sers = []
+
+            for record_id, data in zip(ids, items):
+                try:
+                    record = records[record_id]
+                except KeyError:
+                    raise ObjectNotFound(model=Record)
+
+                data = data.copy()
+                del data['id']
+                sers.append(RecordSerializer(self.request, record, data=data, partial=True))
+
+            for ser in sers:
+                ser.is_valid()
+
+            return self._save_many(sers, msg=LOG_RECORDS_UPDATE)
+
         record = self.record
         ser = RecordSerializer(self.request, record, data=self.data, partial=True)
 
@@ -144,7 +208,8 @@ class RecordView(APIView):
             msg = LOG_RECORD_DELETE
             dd = {'record': record.desc}
 
-        record.delete()
+        with RecordChangeSet():
+            record.delete()
 
         return SuccessTaskResponse(self.request, None, obj=self.domain, msg=msg, detail_dict=self._fix_detail_dict(dd),
                                    task_id=self.task_id, dc_bound=False)
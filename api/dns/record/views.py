@@ -5,13 +5,17 @@ from api.dns.record.api_views import RecordView
 __all__ = ('dns_record_list', 'dns_record')
 
 
-@api_view(('GET', 'POST', 'DELETE'))
+@api_view(('GET', 'POST', 'PUT', 'DELETE'))
 @request_data_defaultdc(permissions=(IsAnyDcDnsAdmin,))  # IsAnyDcDnsAdmin does not do any checks; it sets request.dcs
 @setting_required('DNS_ENABLED')
 def dns_record_list(request, name, data=None):
     """
     List (:http:get:`GET </dns/domain/(name)/record>`) all DNS records which belong to a DNS domain.
-    Delete (:http:delete:`DELETE </dns/domain/(name)/record>`) specified DNS records that belong to a DNS domain.
+    Create (:http:post:`POST </dns/domain/(name)/record>`), update (:http:put:`PUT </dns/domain/(name)/record>`) or
+    delete (:http:delete:`DELETE </dns/domain/(name)/record>`) many DNS records that belong to a DNS domain.
+
+    .. note:: All records are created, updated or deleted in one transaction and the serial number of the \
+domain's SOA record is incremented only once.
 
     .. http:get:: /dns/domain/(name)/record
 
@@ -50,9 +54,48 @@ def dns_record_list(request, name, data=None):
         :status 403: Forbidden
         :status 404: Domain not found / Record not found
         :status 412: Invalid records
+
+    .. http:post:: /dns/domain/(name)/record
+
+        :DC-bound?:
+            * |dc-yes| - ``domain.dc_bound=true``
+            * |dc-no| - ``domain.dc_bound=false``
+        :Permissions:
+            * |DnsAdmin| or |DomainOwner|
+        :Asynchronous?:
+            * |async-no|
+        :arg name: **required** - Domain name
+        :type name: string
+        :arg data.records: **required** List of DNS record objects to be created \
+(see :http:post:`POST /dns/domain/(name)/record </dns/domain/(name)/record>` for object attributes)
+        :type data.records: array
+        :status 201: SUCCESS
+        :status 400: FAILURE
+        :status 403: Forbidden
+        :status 404: Domain not found
+        :status 412: Invalid records
+
+    .. http:put:: /dns/domain/(name)/record
+
+        :DC-bound?:
+            * |dc-yes| - ``domain.dc_bound=true``
+            * |dc-no| - ``domain.dc_bound=false``
+        :Permissions:
+            * |DnsAdmin| or |DomainOwner|
+        :Asynchronous?:
+            * |async-no|
+        :arg name: **required** - Domain name
+        :type name: string
+        :arg data.records: **required** List of DNS record objects to be updated; every object must include \
+the record ``id`` (see :http:put:`PUT /dns/domain/(name)/record/(record_id) </dns/domain/(name)/record/(record_id)>` \
+for other object attributes)
+        :type data.records: array
+        :status 200: SUCCESS
+        :status 400: FAILURE
+        :status 403: Forbidden
+        :status 404: Domain not found / Record not found
+        :status 412: Invalid records
     """
-    if request.method == 'POST':
-        return dns_record(request, name, 0, data=data)
     return RecordView(request, name, None, data).response(many=True)
 
 
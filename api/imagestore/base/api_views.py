@@ -2,6 +2,7 @@
 from logging import getLogger
 from django.utils import timezone
 from celery.states import SUCCESS, FAILURE
+from gevent.monkey import is_module_patched
 
 from api.api_views import APIView
 from api.exceptions import ObjectNotFound, TaskIsAlreadyRunning
@@ -29,6 +30,7 @@ class ImageStoreView(APIView):
     dc_bound = False
     HTTP_TIMEOUT = 20
     HTTP_MAX_SIZE = 10485760
+    HTTP_CONCURRENCY = 8
     LOCK_KEY = 'imagestore-update'
 
     def __init__(self, request, name, data, many=False):
@@ -52,14 +54,29 @@ class ImageStoreView(APIView):
                 self.repo = repositories.keys()
 
     @classmethod
-    def _update(cls, task_id, repo):
+    def _download(cls, repo):
+        """Download image list from repository. Return tuple (response, images, error); images are None if the
+        repository has not changed since the last refresh. Only HTTP requests are made here (see _download_many)"""
         err = res = images = None
         repo_url = repo.get_images_url()
+        headers = {}
+        catalog = repo.catalog
+
+        if catalog.gen:
+            if catalog.etag:
+                headers['If-None-Match'] = catalog.etag
+            if catalog.last_modified:
+                headers['If-Modified-Since'] = catalog.last_modified
+
         logger.info('Downloading images from image repository %s (%s)', repo.name, repo_url)
 
         try:
             curl = HttpClient(repo_url)
-            res = curl.get(timeout=cls.HTTP_TIMEOUT, max_size=cls.HTTP_MAX_SIZE, allow_redirects=True)
+            res = curl.get(timeout=cls.HTTP_TIMEOUT, max_size=cls.HTTP_MAX_SIZE, allow_redirects=True, headers=headers)
+
+            if res.status_code == 304:
+                return res, None, None
+
             images = res.json()
         except RequestException as exc:
             err = '%s' % exc
@@ -69,12 +86,45 @@ class ImageStoreView(APIView):
             if not isinstance(images, list):
                 err = 'Unexpected output from image server (%s)' % type(images)
 
+        return res, images, err
+
+    @classmethod
+    def _download_many(cls, repos):
+        """Download image lists from all repositories concurrently"""
+        if len(repos) < 2:
+            return [cls._download(repo) for repo in repos]
+
+        if is_module_patched('socket'):
+            from gevent.pool import Pool
+        else:
+            from multiprocessing.pool import ThreadPool as Pool
+
+        pool = Pool(min(cls.HTTP_CONCURRENCY, len(repos)))
+
+        try:
+            return pool.map(cls._download, repos)
+        finally:
+            if hasattr(pool, 'close'):  # ThreadPool
+                pool.close()
+                pool.join()
+
+    @classmethod
+    def _update(cls, task_id, repo, download):
+        res, images, err = download
+
         if err:
             status = FAILURE
             msg = err
             logger.error(err)
             repo.error = err
             repo.save()
+        elif images is None:
+            status = SUCCESS
+            msg = u'Image repository %s has not changed since last update (%d images)' % (repo.name, repo.image_count)
+            logger.info(msg)
+            repo.last_update = timezone.now()
+            repo.error = None
+            repo.save()
         else:
             status = SUCCESS
             img_count = len(images)
@@ -84,7 +134,7 @@ class ImageStoreView(APIView):
             repo.image_count = img_count
             repo.last_update = timezone.now()
             repo.error = None
-            repo.save(images=images)
+            repo.save(images=images, etag=res.headers.get('ETag'), last_modified=res.headers.get('Last-Modified'))
             del images  # The list can be big => remove from memory, we don't need it now
 
         task_log(task_id, LOG_IMAGE_STORE_UPDATE, obj=repo, task_status=status, detail=msg, update_user_tasks=False)
@@ -92,14 +142,16 @@ class ImageStoreView(APIView):
         return repo
 
     @classmethod
-    def update(cls, task_id, repo):
-        lock = TaskLock(cls.LOCK_KEY, desc='Image repository %s update' % repo.name)
+    def update(cls, task_id, repos):
+        lock = TaskLock(cls.LOCK_KEY, desc='Image repository %s update' % ', '.join(repo.name for repo in repos))
 
         if not lock.acquire(task_id, timeout=60, save_reverse=False):
             raise TaskIsAlreadyRunning
 
         try:
-            return cls._update(task_id, repo)
+            downloads = cls._download_many(repos)
+
+            return [cls._update(task_id, repo, download) for repo, download in zip(repos, downloads)]
         finally:
             lock.delete(fail_silently=True, delete_reverse=False)
 
@@ -111,10 +163,10 @@ class ImageStoreView(APIView):
         task_id = task_id_from_request(request, dummy=True, tt=TT_DUMMY, tg=TG_DC_UNBOUND)
 
         if self.many:
-            res = [self.update(task_id, repo) for repo in self.repo]
+            res = self.update(task_id, self.repo)
             err = any(bool(repo['error']) for repo in res)
         else:
-            res = self.update(task_id, self.repo)
+            res = self.update(task_id, [self.repo])[0]
             err = bool(res.error)
 
         if err:
@@ -2,6 +2,7 @@ from django.db.models import Q
 
 from api.api_views import APIView
 from api.exceptions import ObjectNotFound, ObjectAlreadyExists
+from api.paginator import get_pager
 from api.task.response import SuccessTaskResponse
 from api.utils.views import call_api_view
 from api.image.base.views import image_manage
@@ -27,22 +28,29 @@ class ImageStoreImageView(APIView):
             raise ObjectNotFound(model=ImageStore)
 
     def get_image(self):
-        uuid = self.uuid
+        img = self.repo.get_image(self.uuid)
 
-        for img in self.repo.images:
-            if img['uuid'] == uuid:
-                return img
-        else:
+        if img is None:
             raise ObjectNotFound(model=Image)
 
+        return img
+
     def get(self, many=False):
         if many:
             assert not self.uuid
+            images = self.repo.images_query(name=self.data.get('name', None))
 
             if self.full or self.extended:
-                res = self.repo.images
+                serialize = list
+            else:
+                def serialize(imgs):
+                    return [img['uuid'] for img in imgs]
+
+            if self.data.get('page', None):
+                pager = get_pager(self.request, images, per_page=100)
+                res = pager.paginator.get_response_results(serialize(pager))
             else:
-                res = [img['uuid'] for img in self.repo.images]
+                res = serialize(images)
         else:
             assert self.uuid
 
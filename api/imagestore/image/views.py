@@ -21,6 +21,11 @@ def imagestore_image_list(request, name, data=None):
             * |async-no|
         :arg data.full: Return list of objects with all image repository details (default: false)
         :type data.full: boolean
+        :arg data.name: Return only images with this name
+        :type data.name: string
+        :arg data.page: Page number to fetch. Each page has 100 images ordered by publish date (newest first) \
+(default: null - all images)
+        :type data.page: integer
         :status 200: SUCCESS
         :status 403: Forbidden
         :status 404: ImageStore not found
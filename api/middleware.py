@@ -1,9 +1,14 @@
 from logging import getLogger
+from time import time
 
 from django.conf import settings
 from django.http.response import StreamingHttpResponse
-from gevent import sleep
+from gevent import sleep, spawn
+from gevent.event import Event
+from gevent.monkey import is_module_patched
 
+from que.tasks import cq
+from que.utils import TASK_DONE_CHANNEL
 from api.status import HTTP_201_CREATED
 from api.task.response import TaskResponse
 from api.task.utils import is_dummy_task, get_task_status, get_task_result
@@ -15,58 +20,128 @@ logger = getLogger(__name__)
 ES_STREAM_CLIENT = 'es'
 
 
-def task_status_loop(request, response, task_id, stream=None):
+class TaskDoneListener(object):
     """
-    Loop and check for task result. Send keep-alive whitespace for every loop.
-    TODO: Trailing headers are not supported, so status code cannot be changed.
+    Process-wide subscriber for task completion notifications (que.utils.task_done_notify). One greenlet reads
+    the redis pub/sub channel and wakes up all requests waiting for a finished task.
     """
-    logger.debug('Starting APISyncMiddleware loop (%s)', request.path)
-    logger.info('Waiting for pending task %s status in "%s" streaming loop', task_id, stream)
-    elapsed = 0
-    task_status_request = set_request_method(request, 'GET')
+    channel_prefix_length = len(TASK_DONE_CHANNEL % '')
 
-    # Task check loop
-    while elapsed < settings.API_SYNC_TIMEOUT:
-        if elapsed > 1200:
-            nap = 30
-        elif elapsed > 60:
-            nap = 12
-        elif elapsed > 30:
-            nap = 6
-        elif elapsed > 5:
-            nap = 3
-        else:
-            nap = 1
+    def __init__(self):
+        self._waiters = {}
+        self._greenlet = None
 
-        sleep(nap)
-        elapsed += nap
+    def _listen(self):
+        pubsub = cq.backend.client.pubsub(ignore_subscribe_messages=True)
 
-        result, status = get_task_status(task_id, get_task_result)
-        logger.debug('APISyncMiddleware loop (%s) status: %s', request.path, status)
+        try:
+            pubsub.psubscribe(TASK_DONE_CHANNEL % '*')
 
-        if status != HTTP_201_CREATED:
-            logger.debug('APISyncMiddleware loop finished (%s) in %d seconds', request.path, elapsed)
-            logger.info('Task %s finished', task_id)
-            res = task_status(task_status_request, task_id=task_id)
+            for msg in pubsub.listen():
+                if msg['type'] == 'pmessage':
+                    for event in self._waiters.get(msg['channel'][self.channel_prefix_length:], ()):
+                        event.set()
+        finally:
+            pubsub.close()
 
-            if stream == ES_STREAM_CLIENT:
-                yield '%d\n' % res.status_code  # new status code (es knows how to interpret this)
+    def _run(self):
+        while True:
+            try:
+                self._listen()
+            except Exception as exc:
+                logger.error('Task completion listener failed (%s). Restarting in 5 seconds...', exc)
+                sleep(5)
 
-            yield res.rendered_content  # will call render()
-            break
-        else:
-            yield ' '  # keep-alive
+    @property
+    def enabled(self):
+        # The listener greenlet would block the whole process without gevent monkey patching
+        return is_module_patched('socket')
+
+    def register(self, task_id):
+        """Return event, which is set when the task finishes"""
+        event = Event()
+
+        if self.enabled:
+            if self._greenlet is None:
+                self._greenlet = spawn(self._run)
+
+            self._waiters.setdefault(task_id, set()).add(event)
+
+        return event
+
+    def unregister(self, task_id, event):
+        waiters = self._waiters.get(task_id)
 
-    else:  # Timeout
-        logger.debug('APISyncMiddleware loop finished with timeout (%s)', request.path)
-        logger.warning('Task %s is running too long; no point to wait', task_id)
-        yield response  # is already rendered
+        if waiters:
+            waiters.discard(event)
+
+            if not waiters:
+                del self._waiters[task_id]
+
+
+task_done_listener = TaskDoneListener()
+
+
+def task_status_loop(request, response, task_id, stream=None):
+    """
+    Wait for task result and send keep-alive whitespace for every loop. The task status is checked immediately after
+    a task completion notification is received; periodic status checks are only a fallback.
+    TODO: Trailing headers are not supported, so status code cannot be changed.
+    """
+    logger.debug('Starting APISyncMiddleware loop (%s)', request.path)
+    logger.info('Waiting for pending task %s status in "%s" streaming loop', task_id, stream)
+    start = time()
+    elapsed = 0
+    task_status_request = set_request_method(request, 'GET')
+    task_done = task_done_listener.register(task_id)
+
+    try:
+        # Task check loop
+        while elapsed < settings.API_SYNC_TIMEOUT:
+            if elapsed > 1200:
+                nap = 30
+            elif elapsed > 60:
+                nap = 12
+            elif elapsed > 30:
+                nap = 6
+            elif elapsed > 5:
+                nap = 3
+            else:
+                nap = 1
+
+            task_done.wait(nap)
+            task_done.clear()
+            elapsed = time() - start
+
+            result, status = get_task_status(task_id, get_task_result)
+            logger.debug('APISyncMiddleware loop (%s) status: %s', request.path, status)
+
+            if status != HTTP_201_CREATED:
+                logger.debug('APISyncMiddleware loop finished (%s) in %d seconds', request.path, elapsed)
+                logger.info('Task %s finished', task_id)
+                res = task_status(task_status_request, task_id=task_id)
+
+                if stream == ES_STREAM_CLIENT:
+                    yield '%d\n' % res.status_code  # new status code (es knows how to interpret this)
+
+                yield res.rendered_content  # will call render()
+                break
+            else:
+                yield ' '  # keep-alive
+
+        else:  # Timeout
+            logger.debug('APISyncMiddleware loop finished with timeout (%s)', request.path)
+            logger.warning('Task %s is running too long; no point to wait', task_id)
+            yield response  # is already rendered
+    finally:
+        task_done_listener.unregister(task_id, task_done)
 
 
 class APISyncMiddleware(object):
     """
     Provide synchronous API. Convert asynchronous responses to synchronous by
-    periodically checking task results. Only for HTTP requests to /api/...
+    waiting for task completion notifications (or periodically checking task results).
+    Only for HTTP requests to /api/...
     """
     # noinspection PyMethodMayBeStatic
     def process_view(self, request, view_func, view_args, view_kwargs):
@@ -92,6 +92,9 @@ class AbstractMonitoringBackend(object):
     def vm_sync(self, vm, force_update=False, task_log=LOG):
         raise NotImplementedError
 
+    def vm_sync_all(self, vms, task_log=LOG, vm_task_logs=None):
+        raise NotImplementedError
+
     def vm_disable(self, vm, task_log=LOG):
         raise NotImplementedError
 
@@ -110,7 +113,7 @@ class AbstractMonitoringBackend(object):
     def node_delete(self, node, task_log=LOG):
         raise NotImplementedError
 
-    def node_history(self, node_id, items, zhistory, since, until, items_search=None):
+    def node_history(self, node_id, items, zhistory, since, until, items_search=None, max_points=None):
         raise NotImplementedError
 
     def template_list(self, full=False, extended=False):
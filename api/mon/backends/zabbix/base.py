@@ -1,7 +1,6 @@
-from logging import getLogger, INFO, WARNING, CRITICAL, ERROR
+from logging import getLogger, DEBUG, INFO, WARNING, CRITICAL, ERROR
 from time import time
 from datetime import timedelta
-from operator import itemgetter
 from datetime import datetime
 from subprocess import call
 
@@ -11,6 +10,7 @@ from zabbix_api import ZabbixAPI, ZabbixAPIException
 from que.tasks import get_task_logger
 from api.mon.backends.abstract import VM_KWARGS_KEYS, NODE_KWARGS_KEYS
 from api.mon.backends.zabbix.server import ZabbixMonitoringServer
+from api.mon.backends.zabbix.history import HistoryCache, downsample
 from api.mon.backends.zabbix.utils import parse_zabbix_result
 from api.mon.backends.zabbix.exceptions import MonitoringError, InternalMonitoringError, RemoteObjectDoesNotExist
 
@@ -18,6 +18,12 @@ logger = getLogger(__name__)
 task_logger = get_task_logger(__name__)
 
 RESULT_CACHE_TIMEOUT = 3600
+HOST_GET_CHUNK_SIZE = 500
+
+
+def cache_result_key(fun_name, *args):
+    """Return key used by @cache_result"""
+    return fun_name + '_' + '_'.join(map(str, args))
 
 
 def cache_result(f):
@@ -29,7 +35,7 @@ def cache_result(f):
         if kwargs.pop('bypass_cache', False):
             return f(obj, *args, **kwargs)
 
-        key = f.__name__ + '_' + '_'.join(map(str, args))
+        key = cache_result_key(f.__name__, *args)
 
         try:
             res, expiry = obj.__cache__[key]
@@ -39,6 +45,9 @@ def cache_result(f):
                 del obj.__cache__[key]
                 raise KeyError
         except (KeyError, ValueError, TypeError):
+            if f.__name__ in obj.prefetched:  # All existing objects are in cache => skip the API call
+                raise RemoteObjectDoesNotExist(name=' '.join(map(str, args)))
+
             res = f(obj, *args, **kwargs)
 
             if res:  # Cache only if valid result is found
@@ -55,6 +64,7 @@ class ZabbixBase(object):
     Danube Cloud methods for working with Zabbix. #219
     """
     __cache__ = None  # Store output from methods with @cache_result decorator
+    prefetched = ()  # Names of @cache_result methods with all results stored in __cache__ (see prefetch_ids())
 
     NO = 0
     YES = 1
@@ -125,6 +135,7 @@ class ZabbixBase(object):
         """Clear item cache"""
         self.log(INFO, 'Resetting object cache')
         self.__cache__.clear()
+        self.prefetched = ()
 
     @property
     def login_error(self):
@@ -391,6 +402,7 @@ class ZabbixBase(object):
             # If not even the ~global~ hostgroup exists, we are free to create a ~local~ hostgroup.
             new_hostgroup = ZabbixHostGroupContainer.create_from_name(self.zapi, qualified_hostgroup_name)
             gids.add(new_hostgroup.zabbix_id)
+            self._cache_result_set('_zabbix_get_groupid', qualified_hostgroup_name, new_hostgroup.zabbix_id)
             log(INFO, 'Monitoring hostgroup "%s" was successfully created', hostgroup_name)
 
         return gids
@@ -504,19 +516,24 @@ class ZabbixBase(object):
             'port': str(port),
         }
 
+    @staticmethod
+    def _host_get_params(zabbix_id):
+        """Return host.get parameters for one or more vm_uuids or node_uuids (zabbix_id)"""
+        return {
+            'filter': {'host': zabbix_id},
+            'output': 'extend',
+            'selectInterfaces': 'extend',
+            'selectMacros': 'extend',
+            'selectGroups': 'extend',
+            'selectParentTemplates': ['templateid', 'hostid'],
+        }
+
     def get_host(self, zabbix_id, log=None):
         """Return zabbix host according to vm_uuid or node_uuid (zabbix_id)"""
         log = log or self.log
 
         try:
-            res = self.zapi.host.get({
-                'filter': {'host': zabbix_id},
-                'output': 'extend',
-                'selectInterfaces': 'extend',
-                'selectMacros': 'extend',
-                'selectGroups': 'extend',
-                'selectParentTemplates': ['templateid', 'hostid'],
-            })
+            res = self.zapi.host.get(self._host_get_params(zabbix_id))
         except ZabbixAPIException as e:
             log(ERROR, 'Zabbix API Error in get_host(%s): %s', zabbix_id, e)
             raise e
@@ -526,6 +543,68 @@ class ZabbixBase(object):
         except RemoteObjectDoesNotExist:
             return {}
 
+    def get_hosts(self, zabbix_ids, log=None):
+        """Return dict of zabbix hosts {zabbix_id: host} for a list of vm_uuids or node_uuids (zabbix_id)"""
+        log = log or self.log
+        hosts = {}
+
+        for i in range(0, len(zabbix_ids), HOST_GET_CHUNK_SIZE):
+            chunk = zabbix_ids[i:i + HOST_GET_CHUNK_SIZE]
+
+            try:
+                res = self.zapi.host.get(self._host_get_params(chunk))
+            except ZabbixAPIException as e:
+                log(ERROR, 'Zabbix API Error in get_hosts(%d hosts): %s', len(chunk), e)
+                raise e
+
+            for host in res:
+                hosts[host['host']] = host
+
+        return hosts
+
+    def _cache_result_set(self, fun_name, arg, res):
+        """Save result of a @cache_result method called with one argument"""
+        try:
+            key = cache_result_key(fun_name, arg)
+        except UnicodeError:  # The @cache_result decorator cannot handle such arguments either
+            return
+
+        self.__cache__[key] = (res, int(time()) + RESULT_CACHE_TIMEOUT)
+
+    def _prefetch_ids(self, fun_name, objects, name_attr, id_attr):
+        """Save IDs of zabbix objects into the cache used by the @cache_result method fun_name"""
+        for obj in objects:
+            self._cache_result_set(fun_name, obj[name_attr], obj[id_attr])
+
+        return len(objects)
+
+    def prefetch_ids(self, log=None):
+        """Fetch all hostgroup, template and proxy IDs with one API call per object type, so that the
+        _zabbix_get_groupid(), _zabbix_get_templateid() and _zabbix_get_proxyid() methods used when computing the
+        configuration of many hosts do not query the Zabbix API for every name.
+        Names not found in cache are treated as non-existent until clear_prefetched() is called."""
+        log = log or self.log
+        zapi = self.zapi
+        self.prefetched = ()
+
+        try:
+            groups = self._prefetch_ids('_zabbix_get_groupid', zapi.hostgroup.get({'output': ['groupid', 'name']}),
+                                        'name', 'groupid')
+            templates = self._prefetch_ids('_zabbix_get_templateid',
+                                           zapi.template.get({'output': ['templateid', 'host']}), 'host', 'templateid')
+            proxies = self._prefetch_ids('_zabbix_get_proxyid', zapi.proxy.get({'output': ['proxyid', 'host']}),
+                                         'host', 'proxyid')
+        except ZabbixAPIException as e:
+            log(ERROR, 'Zabbix API Error in prefetch_ids(): %s', e)
+            raise e
+
+        self.prefetched = ('_zabbix_get_groupid', '_zabbix_get_templateid', '_zabbix_get_proxyid')
+        log(DEBUG, 'Prefetched %d hostgroup, %d template and %d proxy IDs', groups, templates, proxies)
+
+    def clear_prefetched(self):
+        """Query the Zabbix API again for names missing in cache"""
+        self.prefetched = ()
+
     def has_host_info(self, obj):
         """Return True if host info is saved in obj"""
         return 'hostid' in self.host_info(obj)
@@ -635,6 +714,27 @@ class ZabbixBase(object):
 
         return parse_zabbix_result(res, 'hostids', from_get_request=False)
 
+    def _mass_host_call(self, method, hostids, log=None, **params):
+        """Run host.massadd or host.massupdate for many Zabbix hosts. Return list of hostids or False"""
+        log = log or self.log
+        params['hosts'] = [{'hostid': str(i)} for i in hostids]
+
+        try:
+            res = getattr(self.zapi.host, method)(params)
+        except ZabbixAPIException as e:
+            log(ERROR, 'Zabbix API Error in host.%s(%d hosts): %s', method, len(hostids), e)
+            return False
+
+        return parse_zabbix_result(res, 'hostids', from_get_request=False, many=True)
+
+    def mass_add_hosts(self, hostids, log=None, **params):
+        """Add templates or hostgroups to many Zabbix hosts at once"""
+        return self._mass_host_call('massadd', hostids, log=log, **params)
+
+    def mass_update_hosts(self, hostids, log=None, **params):
+        """Replace parameters of many Zabbix hosts at once"""
+        return self._mass_host_call('massupdate', hostids, log=log, **params)
+
     def delete_host(self, hostid, log=None):
         """Delete host from Zabbix"""
         log = log or self.log
@@ -811,10 +911,15 @@ class ZabbixBase(object):
 
         return parse_zabbix_result(res, 'serviceids', from_get_request=False)
 
-    def get_history(self, hosts, items, history, since, until, items_search=None, skip_nonexistent_items=False):
-        """Return monitoring history for selected zabbix host, items and period"""
+    def get_history(self, hosts, items, history, since, until, items_search=None, skip_nonexistent_items=False,
+                    max_points=None):
+        """Return monitoring history for selected zabbix host, items and period.
+        Values of every item are downsampled to max_points (default: MON_ZABBIX_GRAPH_MAX_POINTS)"""
         res = {'history': [], 'items': []}
 
+        if max_points is None:
+            max_points = self.settings.MON_ZABBIX_GRAPH_MAX_POINTS
+
         now = int(datetime.now().strftime('%s'))
         max_period = self.settings.MON_ZABBIX_GRAPH_MAX_PERIOD
         max_history = now - self.settings.MON_ZABBIX_GRAPH_MAX_HISTORY
@@ -845,25 +950,20 @@ class ZabbixBase(object):
                 itemids.update(i['itemid'] for i in host_items)
                 res['items'].extend(host_items)
 
-            # noinspection PyTypeChecker
-            params = {
-                'itemids': list(itemids),
-                'history': history,
-                'sortfield': 'clock',
-                'sortorder': 'ASC',
-                'output': 'extend',
-            }
+            history_cache = HistoryCache(self.zapi, self.server.name, self.settings.MON_ZABBIX_HISTORY_CACHE_TIMEOUT)
 
             if since_trend and until_trend:
-                params['time_from'] = since_trend
-                params['time_till'] = until_trend
-                # Zabbix trend.get does not support sorting -> https://support.zabbix.com/browse/ZBXNEXT-3974
-                res['history'] = sorted(self.zapi.trend.get(params), key=itemgetter('clock'))
-
-            if since_history and until_history:
-                params['time_from'] = since_history
-                params['time_till'] = until_history
-                res['history'] += self.zapi.history.get(params)
+                values = history_cache.get('trend', itemids, history, since_trend, until_trend)
+            elif since_history and until_history:
+                values = history_cache.get('history', itemids, history, since_history, until_history)
+            else:
+                values = {}
+
+            for item_values in values.values():
+                res['history'].extend(downsample(item_values, max_points))
+
+            # Values of every item are sorted => this is a merge of sorted lists
+            res['history'].sort(key=lambda i: int(i['clock']))
 
         except ZabbixAPIException as exc:
             self.log(ERROR, 'Zabbix API Error in get_history(%s, %s): %s', hosts, items, exc)
@@ -0,0 +1,192 @@
+from collections import OrderedDict
+from time import time
+
+from django.core.cache import cache
+
+CACHE_HISTORY_KEY = 'mon-history:%s:%s:%s:%s:%s'  # server, method, history type, itemid, bucket start
+
+# method: (bucket size, delay) - a bucket is closed (immutable) when it ended more than delay seconds ago
+BUCKETS = {
+    'history': (3600, 300),  # values are cached per item and hour; zabbix can receive values a bit late
+    'trend': (86400, 3600),  # trends are cached per item and day; zabbix computes trends once an hour
+}
+
+
+class HistoryCache(object):
+    """
+    Cache of Zabbix history.get/trend.get results split into fixed time buckets per item.
+
+    Only closed buckets are stored in cache, because their values do not change anymore. Closed buckets missing in
+    cache are fetched by one API call for all items and the open part of the requested period is always fetched from
+    Zabbix. Returned values are sorted by clock per item.
+    """
+    def __init__(self, zapi, server_name, timeout):
+        self.zapi = zapi
+        self.server_name = server_name
+        self.timeout = timeout
+
+    def _key(self, method, history, itemid, bucket):
+        return CACHE_HISTORY_KEY % (self.server_name, method, history, itemid, bucket)
+
+    def _fetch(self, method, itemids, history, since, until):
+        res = getattr(self.zapi, method).get({
+            'itemids': list(itemids),
+            'history': history,
+            'sortfield': 'clock',
+            'sortorder': 'ASC',
+            'output': 'extend',
+            'time_from': since,
+            'time_till': until,
+        })
+
+        # Zabbix trend.get does not support sorting -> https://support.zabbix.com/browse/ZBXNEXT-3974
+        if method == 'trend':
+            res.sort(key=lambda i: int(i['clock']))
+
+        return res
+
+    @staticmethod
+    def _split(values, bucket_size):
+        """Return dict {(itemid, bucket): [values]}"""
+        buckets = {}
+
+        for i in values:
+            clock = int(i['clock'])
+            buckets.setdefault((i['itemid'], clock - clock % bucket_size), []).append(i)
+
+        return buckets
+
+    def _get_closed(self, method, itemids, history, buckets, bucket_size):
+        """Return dict {(itemid, bucket): [values]} for closed buckets from cache or Zabbix"""
+        keys = {self._key(method, history, itemid, bucket): (itemid, bucket)
+                for itemid in itemids for bucket in buckets}
+        cached = cache.get_many(list(keys.keys()))
+        data = {keys[key]: values for key, values in cached.items()}
+        missing = [item for key, item in keys.items() if key not in cached]
+
+        if missing:
+            fetched = self._split(self._fetch(method, set(itemid for itemid, _ in missing), history,
+                                              min(bucket for _, bucket in missing),
+                                              max(bucket for _, bucket in missing) + bucket_size - 1),
+                                  bucket_size)
+            new = {}
+
+            for item in missing:
+                data[item] = new[self._key(method, history, *item)] = fetched.get(item, [])
+
+            cache.set_many(new, self.timeout)
+
+        return data
+
+    def get(self, method, itemids, history, since, until):
+        """Return dict {itemid: [values]} for the time period from history.get or trend.get (method)"""
+        bucket_size, delay = BUCKETS[method]
+        itemids = [str(i) for i in itemids]
+        closed_until = int(time()) - delay
+        closed_until -= closed_until % bucket_size
+        res = OrderedDict((itemid, []) for itemid in itemids)
+        buckets = []
+
+        if not itemids:
+            return res
+
+        live_since = since
+
+        if self.timeout:
+            buckets = [bucket for bucket in range(since - since % bucket_size, until + 1, bucket_size)
+                       if bucket + bucket_size <= closed_until]
+
+        if buckets:
+            data = self._get_closed(method, itemids, history, buckets, bucket_size)
+            live_since = buckets[-1] + bucket_size
+
+            for itemid, values in res.items():
+                for bucket in buckets:
+                    values.extend(i for i in data[(itemid, bucket)] if since <= int(i['clock']) <= until)
+
+        if live_since <= until:
+            for i in self._fetch(method, itemids, history, live_since, until):
+                res[i['itemid']].append(i)
+
+        return res
+
+
+def _lttb(values, max_points):
+    """Largest-Triangle-Three-Buckets downsampling of history values sorted by clock"""
+    try:
+        xs = [int(i['clock']) for i in values]
+        ys = [float(i['value']) for i in values]
+    except (KeyError, ValueError):  # Not a numeric item
+        return values
+
+    size = len(values)
+    every = float(size - 2) / (max_points - 2)
+    res = [values[0]]
+    a = 0
+
+    for i in range(max_points - 2):
+        # Average point of the next bucket
+        avg_start = min(int((i + 1) * every) + 1, size - 1)
+        avg_end = max(min(int((i + 2) * every) + 1, size), avg_start + 1)
+        avg_x = sum(xs[avg_start:avg_end]) / float(avg_end - avg_start)
+        avg_y = sum(ys[avg_start:avg_end]) / float(avg_end - avg_start)
+        # Point with the largest triangle area in the current bucket
+        ax, ay = xs[a], ys[a]
+        max_area = -1
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+
+            if area > max_area:
+                max_area = area
+                a = j
+
+        res.append(values[a])
+
+    res.append(values[-1])
+
+    return res
+
+
+def _aggregate_trends(values, max_points):
+    """Merge trend values sorted by clock into max_points values keeping min, max and weighted average"""
+    step = float(len(values)) / max_points
+    res = []
+
+    for i in range(max_points):
+        chunk = values[int(i * step):int((i + 1) * step)]
+
+        if not chunk:
+            continue
+
+        nums = [int(j['num']) for j in chunk]
+        avgs = [float(j['value_avg']) for j in chunk]
+        total = sum(nums)
+
+        if total:
+            value_avg = sum(num * avg for num, avg in zip(nums, avgs)) / total
+        else:
+            value_avg = sum(avgs) / len(avgs)
+
+        res.append({
+            'itemid': chunk[0]['itemid'],
+            'clock': chunk[0]['clock'],
+            'num': str(total),
+            'value_min': str(min(float(j['value_min']) for j in chunk)),
+            'value_avg': str(value_avg),
+            'value_max': str(max(float(j['value_max']) for j in chunk)),
+        })
+
+    return res
+
+
+def downsample(values, max_points):
+    """Reduce number of values of one item (sorted by clock) to max_points"""
+    if not max_points or len(values) <= max(max_points, 3):
+        return values
+
+    if 'value_avg' in values[0]:
+        return _aggregate_trends(values, max_points)
+    else:
+        return _lttb(values, max(max_points, 3))
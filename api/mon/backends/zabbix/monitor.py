@@ -7,6 +7,7 @@ from api.mon.backends.zabbix.containers import (ZabbixHostGroupContainer, Zabbix
 from api.mon.backends.zabbix.base import ZabbixBase
 from api.mon.backends.zabbix.internal import InternalZabbix
 from api.mon.backends.zabbix.external import ExternalZabbix
+from api.mon.backends.zabbix.reconcile import ZabbixHostReconciler
 from gui.models import User, AdminPermission
 from vms.models import DefaultDc
 
@@ -311,6 +312,60 @@ class Zabbix(AbstractMonitoringBackend):
 
         return result
 
+    def vm_sync_all(self, vms, task_log=LOG, vm_task_logs=None):
+        """[INTERNAL+EXTERNAL] Create or update zabbix hosts of many VMs in one DC with a few bulk API calls.
+        Messages related to one VM are logged into vm_task_logs[vm.uuid] (if available) instead of task_log.
+        Return tuple of (dict with summary of changes in internal and external zabbix,
+        dict {vm_uuid: [internal result, external result]} - the same result as vm_sync() returns for one VM)"""
+        dc_settings = self.dc.settings
+        vm_task_logs = vm_task_logs or {}
+        vm_results = {vm.uuid: [] for vm in vms}
+        result = {}
+
+        # noinspection PyProtectedMember
+        for name, zx, zx_sync, vm_sync in (('internal', self.izx, 'is_zabbix_sync_active',
+                                            dc_settings._MON_ZABBIX_VM_SYNC),
+                                           ('external', self.ezx, 'is_external_zabbix_sync_active',
+                                            dc_settings.MON_ZABBIX_VM_SYNC)):
+            log = zx.get_log_fun(task_log)
+            vm_logs = {vm.uuid: zx.get_log_fun(vm_task_logs.get(vm.uuid, task_log)) for vm in vms}
+
+            if not zx.enabled:
+                log(INFO, 'Monitoring is disabled')
+
+                for vm in vms:
+                    if vm.uuid in vm_task_logs:
+                        vm_logs[vm.uuid](INFO, 'Monitoring is disabled')
+
+                    vm_results[vm.uuid].append(None)
+
+                result[name] = None
+                continue
+
+            reconciler = ZabbixHostReconciler(zx, log=log, obj_log=lambda vm: vm_logs[vm.uuid])
+            sync_vms = []
+
+            for vm in vms:
+                if getattr(vm, zx_sync)():
+                    sync_vms.append(vm)
+                else:
+                    reconciler.count(self._vm_disable_sync(zx, vm, log=vm_logs[vm.uuid]), ok='deleted', obj=vm)
+
+            for vm in reconciler.reconcile(sync_vms, zx.diff_vm_host):
+                if vm_sync:
+                    reconciler.count(self._vm_create_host(zx, vm, log=vm_logs[vm.uuid]), ok='created', obj=vm)
+                else:
+                    vm_logs[vm.uuid](INFO, 'Zabbix synchronization disabled for VM %s in DC %s', vm, vm.dc)
+                    reconciler.count(None, obj=vm)
+
+            for vm in vms:
+                vm_results[vm.uuid].append(reconciler.results[vm])
+
+            log(INFO, 'Zabbix hosts of %d VMs were synchronized: %s', len(vms), dict(reconciler.summary))
+            result[name] = reconciler.summary
+
+        return result, vm_results
+
     def vm_disable(self, vm, task_log=LOG):
         """[INTERNAL+EXTERNAL] Switch host status in zabbix to not monitored in internal and external zabbix"""
         result = []
@@ -499,9 +554,10 @@ class Zabbix(AbstractMonitoringBackend):
 
         return result
 
-    def node_history(self, node_id, items, zhistory, since, until, items_search=None):
+    def node_history(self, node_id, items, zhistory, since, until, items_search=None, max_points=None):
         """[INTERNAL] Return node history data for selected graph and period"""
-        return self.izx.get_history((node_id,), items, zhistory, since, until, items_search=items_search)
+        return self.izx.get_history((node_id,), items, zhistory, since, until, items_search=items_search,
+                                    max_points=max_points)
 
     def template_list(self, full=False, extended=False):
         """[EXTERNAL] Return list of available templates"""
@@ -0,0 +1,215 @@
+from collections import OrderedDict
+from logging import INFO, WARNING, ERROR
+
+from zabbix_api import ZabbixAPIException
+
+from api.mon.backends.zabbix.exceptions import MonitoringError
+
+
+class ZabbixHostReconciler(object):
+    """
+    Compare and update Zabbix hosts of many objects (VMs) with a few bulk API calls:
+
+    1. hostgroup, template and proxy IDs and all hosts are fetched by a few *.get calls (ZabbixBase.prefetch_ids()
+       and ZabbixBase.get_hosts()),
+    2. the wanted host configuration is compared with the Zabbix host in memory (the diff method, e.g. diff_vm_host()),
+    3. added templates and hostgroups are applied by host.massadd, other changes of templates, hostgroups, status
+       and proxy are applied by host.massupdate for all hosts with the same change and host specific changes
+       (host, name, interfaces, macros) by host.update.
+
+    Objects without a Zabbix host are returned by reconcile() and have to be created by the caller.
+    Messages related to one object are logged by the log function returned by obj_log(obj) and the result of every
+    object sync (True, False, None) is stored in results.
+    """
+    HOST_PARAMS = ('host', 'name', 'interfaces', 'macros')  # Different for every host => one host.update per host
+
+    def __init__(self, zx, log=None, obj_log=None):
+        self.zx = zx
+        self.log = log or zx.log
+        self.obj_log = obj_log or (lambda obj: self.log)
+        self.results = OrderedDict()  # {obj: result}
+        self.summary = OrderedDict((
+            ('hosts', 0),
+            ('unchanged', 0),
+            ('updated', 0),
+            ('created', 0),
+            ('deleted', 0),
+            ('skipped', 0),
+            ('failed', 0),
+            ('massadd_calls', 0),
+            ('massupdate_calls', 0),
+            ('update_calls', 0),
+        ))
+
+    def count(self, result, ok='updated', obj=None):
+        """Update summary according to a result of a single object sync (True, False, None)"""
+        if obj is not None:
+            self.results[obj] = result
+
+        if result:
+            self.summary[ok] += 1
+        elif result is None:
+            self.summary['skipped'] += 1
+        else:
+            self.summary['failed'] += 1
+
+    @staticmethod
+    def _ids(items, id_attr):
+        return frozenset(int(i[id_attr]) for i in items)
+
+    # noinspection PyProtectedMember
+    def _plan(self, host, params, massadd, massupdate):
+        """Split params into mass operations; return dict of host specific params"""
+        zx = self.zx
+        hostid = int(host['hostid'])
+        own = {key: params.pop(key) for key in self.HOST_PARAMS if key in params}
+        mass = []
+
+        if 'templates' in params:
+            templates = self._ids(params.pop('templates'), 'templateid')
+            templates_clear = self._ids(params.pop('templates_clear', ()), 'templateid')
+
+            if templates_clear:
+                mass.append(('templates', templates))
+                mass.append(('templates_clear', templates_clear))
+            else:
+                massadd.setdefault(('templates', templates - zx._parse_host_templates(host)), []).append(hostid)
+
+        if 'groups' in params:
+            groups = self._ids(params.pop('groups'), 'groupid')
+            current_groups = zx._parse_host_groups(host)
+
+            if current_groups - groups:
+                mass.append(('groups', groups))
+            else:
+                massadd.setdefault(('groups', groups - current_groups), []).append(hostid)
+
+        mass.extend(params.items())  # status, proxy_hostid
+
+        if mass:
+            massupdate.setdefault(tuple(sorted(mass)), []).append(hostid)
+
+        return own
+
+    # noinspection PyProtectedMember
+    def _gen_params(self, items):
+        """Create host.massadd/host.massupdate parameters from a plan key"""
+        zx = self.zx
+        params = {}
+
+        for key, value in items:
+            if key in ('templates', 'templates_clear'):
+                value = zx._gen_host_templates(value)
+            elif key == 'groups':
+                value = zx._gen_host_groups(value)
+
+            params[key] = value
+
+        return params
+
+    def _apply(self, changes):
+        """Apply host changes; return set of hostids which could not be updated"""
+        zx, log, summary = self.zx, self.log, self.summary
+        massadd = OrderedDict()  # {(param, ids): [hostid, ...]}
+        massupdate = OrderedDict()  # {((param, value), ...): [hostid, ...]}
+        failed = set()
+        update = []
+
+        for obj, host, params in changes:
+            self.obj_log(obj)(INFO, 'Updating Zabbix host ID "%s" according to %s with following parameters: %s',
+                              host['hostid'], obj, params)
+            own = self._plan(host, params, massadd, massupdate)
+
+            if own:
+                update.append((obj, int(host['hostid']), own))
+
+        for items, hostids in massupdate.items():
+            params = self._gen_params(items)
+            log(INFO, 'Updating %d Zabbix hosts with following parameters: %s', len(hostids), params)
+            summary['massupdate_calls'] += 1
+
+            if not zx.mass_update_hosts(hostids, log=log, **params):
+                failed.update(hostids)
+
+        for item, hostids in massadd.items():
+            params = self._gen_params((item,))
+            log(INFO, 'Adding following parameters to %d Zabbix hosts: %s', len(hostids), params)
+            summary['massadd_calls'] += 1
+
+            if not zx.mass_add_hosts(hostids, log=log, **params):
+                failed.update(hostids)
+
+        for obj, hostid, params in update:
+            log(INFO, 'Updating Zabbix host ID "%s" with following parameters: %s', hostid, params)
+            summary['update_calls'] += 1
+
+            if not zx.update_host(hostid, log=self.obj_log(obj), **params):
+                failed.add(hostid)
+
+        return failed
+
+    def reconcile(self, objs, diff):
+        """Compare and update existing Zabbix hosts of objects; return list of objects without a Zabbix host"""
+        zx, log, summary = self.zx, self.log, self.summary
+        summary['hosts'] += len(objs)
+        missing = []
+        changes = []
+
+        zx.prefetch_ids(log=log)
+
+        try:
+            hosts = zx.get_hosts([zx.host_id(obj) for obj in objs], log=log)
+
+            for obj in objs:
+                host = hosts.get(zx.host_id(obj), None)
+
+                if not host:
+                    missing.append(obj)
+                    continue
+
+                obj_log = self.obj_log(obj)
+                hostid = host['hostid']
+
+                try:
+                    params = diff(obj, host, log=obj_log)
+                except (ZabbixAPIException, MonitoringError) as exc:
+                    obj_log(ERROR, 'Could not compare Zabbix host ID "%s" with %s: %s', hostid, obj, exc)
+                    self.count(False, obj=obj)
+                    continue
+
+                if params:
+                    obj_log(WARNING, 'Zabbix host ID "%s" configuration differs from current %s configuration',
+                            hostid, obj)
+                    changes.append((obj, host, params))
+                else:
+                    obj_log(INFO, 'Zabbix host ID "%s" configuration is synchronized with current %s configuration',
+                            hostid, obj)
+                    self.count(True, ok='unchanged', obj=obj)
+        finally:
+            zx.clear_prefetched()
+
+        if changes:
+            failed = self._apply(changes)
+            updated = []
+
+            for obj, host, params in changes:
+                hostid = host['hostid']
+
+                if int(hostid) in failed:
+                    self.obj_log(obj)(ERROR, 'Could not update Zabbix host ID "%s"', hostid)
+                    self.count(False, obj=obj)
+                else:
+                    self.obj_log(obj)(INFO, 'Updated Zabbix host ID "%s"', hostid)
+                    self.count(True, obj=obj)
+                    updated.append(obj)
+
+            if updated:
+                hosts = zx.get_hosts([zx.host_id(obj) for obj in updated], log=log)
+
+                for obj in updated:
+                    host = hosts.get(zx.host_id(obj), None)
+
+                    if host:
+                        zx.save_host_info(obj, host=host, log=self.obj_log(obj))
+
+        return missing
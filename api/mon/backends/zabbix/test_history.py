@@ -0,0 +1,168 @@
+from time import time
+from unittest import TestCase
+
+from django.utils.crypto import get_random_string
+
+from api.mon.backends.zabbix.history import HistoryCache, downsample, _lttb, _aggregate_trends
+
+
+class FakeZabbixMethod(object):
+    """Zabbix history/trend API object returning values filtered like the Zabbix API does"""
+    def __init__(self, values):
+        self.values = values
+        self.calls = []
+
+    def get(self, params):
+        self.calls.append((params['time_from'], params['time_till']))
+        itemids = set(params['itemids'])
+
+        return [i for i in self.values
+                if i['itemid'] in itemids and params['time_from'] <= int(i['clock']) <= params['time_till']]
+
+
+class FakeZabbixAPI(object):
+    def __init__(self, history=(), trend=()):
+        self.history = FakeZabbixMethod(list(history))
+        self.trend = FakeZabbixMethod(list(trend))
+
+
+def _history(itemid, clock, value):
+    return {'itemid': itemid, 'clock': str(clock), 'value': str(value), 'ns': '0'}
+
+
+def _trend(itemid, clock, num, value_min, value_avg, value_max):
+    return {'itemid': itemid, 'clock': str(clock), 'num': str(num),
+            'value_min': str(value_min), 'value_avg': str(value_avg), 'value_max': str(value_max)}
+
+
+class HistoryCacheTests(TestCase):
+    itemids = ('10001', '10002')
+
+    def setUp(self):
+        self.now = int(time())
+        self.since = self.now - 3 * 3600 - 123
+        self.values = [_history(itemid, clock, clock % 100)
+                       for clock in range(self.now - 4 * 3600, self.now + 1, 600) for itemid in self.itemids]
+        self.zapi = FakeZabbixAPI(history=self.values, trend=reversed(self.values))
+
+    def _cache(self, timeout=3600):
+        return HistoryCache(self.zapi, 'test-' + get_random_string(10), timeout)
+
+    def _expected(self, itemid):
+        return [i for i in self.values if i['itemid'] == itemid and self.since <= int(i['clock']) <= self.now]
+
+    def test_no_items(self):
+        self.assertEqual(self._cache().get('history', [], 0, self.since, self.now), {})
+        self.assertEqual(self.zapi.history.calls, [])
+
+    def test_buckets(self):
+        hc = self._cache()
+        calls = self.zapi.history.calls
+        res = hc.get('history', self.itemids, 0, self.since, self.now)
+
+        self.assertEqual(list(res.keys()), list(self.itemids))
+        for itemid in self.itemids:
+            self.assertEqual(res[itemid], self._expected(itemid))
+
+        # One call for all closed buckets (aligned to bucket size) + one call for the open period
+        self.assertEqual(len(calls), 2)
+        closed_from, closed_till = calls[0]
+        self.assertEqual(closed_from, self.since - self.since % 3600)
+        self.assertEqual((closed_till + 1) % 3600, 0)
+        self.assertLessEqual(closed_till + 1, self.now - 300)
+        self.assertEqual(calls[1], (closed_till + 1, self.now))
+
+        # Closed buckets are read from cache
+        self.assertEqual(hc.get('history', self.itemids, 0, self.since, self.now), res)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(calls[2], calls[1])
+
+    def test_no_closed_buckets(self):
+        hc = self._cache()
+        since = self.now - 60
+        res = hc.get('history', self.itemids[:1], 0, since, self.now)
+
+        self.assertEqual(self.zapi.history.calls, [(since, self.now)])
+        self.assertEqual(res[self.itemids[0]], [i for i in self.values
+                                                if i['itemid'] == self.itemids[0] and int(i['clock']) >= since])
+
+    def test_cache_disabled(self):
+        res = self._cache(timeout=0).get('history', self.itemids, 0, self.since, self.now)
+
+        self.assertEqual(self.zapi.history.calls, [(self.since, self.now)])
+        for itemid in self.itemids:
+            self.assertEqual(res[itemid], self._expected(itemid))
+
+    def test_trend_sorted(self):
+        res = self._cache(timeout=0).get('trend', self.itemids, 0, self.since, self.now)
+
+        for itemid in self.itemids:
+            self.assertEqual(res[itemid], self._expected(itemid))
+
+
+class DownsampleTests(TestCase):
+    itemid = '10001'
+
+    def _history(self, count, spike=None):
+        return [_history(self.itemid, 1000 + i * 60, 100 if i == spike else 1) for i in range(count)]
+
+    def test_no_downsampling(self):
+        values = self._history(10)
+
+        self.assertIs(downsample(values, None), values)
+        self.assertIs(downsample(values, 0), values)
+        self.assertIs(downsample(values, 10), values)
+        self.assertIs(downsample(values, 20), values)
+        values = values[:3]
+        self.assertIs(downsample(values, 2), values)
+
+    def test_history(self):
+        values = self._history(100)
+        res = downsample(values, 10)
+
+        self.assertEqual(len(res), 10)
+        self.assertIs(res[0], values[0])
+        self.assertIs(res[-1], values[-1])
+        self.assertTrue(all(i in values for i in res))
+        clocks = [int(i['clock']) for i in res]
+        self.assertEqual(clocks, sorted(set(clocks)))
+
+    def test_lttb_keeps_spike(self):
+        values = self._history(100, spike=42)
+
+        self.assertIn(values[42], _lttb(values, 10))
+
+    def test_lttb_minimum_points(self):
+        values = self._history(100, spike=42)
+        res = downsample(values, 1)
+
+        self.assertEqual(res, [values[0], values[42], values[-1]])
+
+    def test_lttb_not_numeric(self):
+        values = [_history(self.itemid, 1000 + i * 60, 'text%d' % i) for i in range(10)]
+
+        self.assertIs(_lttb(values, 5), values)
+        self.assertIs(downsample(values, 5), values)
+
+    def test_trends(self):
+        values = [_trend(self.itemid, 3600 * i, 2 if i % 2 else 1, i, i + 0.5, i + 1) for i in range(10)]
+        res = downsample(values, 5)
+
+        self.assertEqual(len(res), 5)
+        self.assertEqual(res, _aggregate_trends(values, 5))
+        self.assertEqual(res[0], {
+            'itemid': self.itemid,
+            'clock': '0',
+            'num': '3',
+            'value_min': '0.0',
+            'value_avg': str((1 * 0.5 + 2 * 1.5) / 3),
+            'value_max': '2.0',
+        })
+        self.assertEqual([i['clock'] for i in res], [str(3600 * i) for i in range(0, 10, 2)])
+
+    def test_trends_without_num(self):
+        values = [_trend(self.itemid, 3600 * i, 0, 1, avg, 3) for i, avg in enumerate((1, 2, 3, 4))]
+        res = _aggregate_trends(values, 2)
+
+        self.assertEqual([i['value_avg'] for i in res], [str(1.5), str(3.5)])
+        self.assertEqual([i['num'] for i in res], ['0', '0'])
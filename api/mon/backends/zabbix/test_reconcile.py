@@ -0,0 +1,259 @@
+import json
+from copy import deepcopy
+from threading import Thread
+from unittest import TestCase
+
+from django.utils.six.moves.BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from zabbix_api import ZabbixAPI
+
+from api.mon.backends.zabbix.base import ZabbixBase
+from api.mon.backends.zabbix.reconcile import ZabbixHostReconciler
+
+
+class FakeZabbixRequestHandler(BaseHTTPRequestHandler):
+    """Zabbix JSON-RPC API endpoint (api_jsonrpc.php) implemented by methods of the FakeZabbixServer"""
+    # noinspection PyPep8Naming
+    def do_POST(self):
+        req = json.loads(self.rfile.read(int(self.headers.get('Content-Length'))).decode('utf-8'))
+        res = {'jsonrpc': '2.0', 'id': req['id']}
+        method, params = req['method'], req['params']
+        fun = getattr(self.server, method.replace('.', '_'), None)
+        self.server.calls.append(method)
+
+        if fun is None or method in self.server.failing:
+            res['error'] = {'code': -32602, 'message': 'Invalid params.', 'data': 'Method %s failed.' % method}
+        else:
+            res['result'] = fun(params)
+
+        body = json.dumps(res).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeZabbixServer(HTTPServer):
+    """Zabbix server with a few hostgroups and templates storing hosts in memory"""
+    groups = (('1', 'group1'), ('2', 'group2'))
+    templates = (('10', 'template1'), ('11', 'template2'))
+
+    def __init__(self):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), FakeZabbixRequestHandler)
+        self.url = 'http://127.0.0.1:%d' % self.server_port
+        self.hosts = {}  # {hostid: host}
+        self.calls = []
+        self.failing = set()  # Names of API methods which return an error
+
+    def add_host(self, hostid, host, name, groups, templates):
+        self.hosts[hostid] = {
+            'hostid': hostid,
+            'host': host,
+            'name': name,
+            'status': '0',
+            'proxy_hostid': '0',
+            'groups': [{'groupid': i} for i in groups],
+            'parentTemplates': [{'templateid': i} for i in templates],
+            'interfaces': [],
+            'macros': [],
+        }
+
+    def _hosts(self, params):
+        hostids = [str(i['hostid']) for i in params.pop('hosts')]
+        assert all(hostid in self.hosts for hostid in hostids)
+
+        return [self.hosts[hostid] for hostid in hostids]
+
+    # noinspection PyUnusedLocal
+    def user_login(self, params):
+        return 'auth'
+
+    # noinspection PyUnusedLocal
+    def hostgroup_get(self, params):
+        return [{'groupid': groupid, 'name': name} for groupid, name in self.groups]
+
+    # noinspection PyUnusedLocal
+    def template_get(self, params):
+        return [{'templateid': templateid, 'host': name} for templateid, name in self.templates]
+
+    # noinspection PyUnusedLocal
+    def proxy_get(self, params):
+        return []
+
+    def host_get(self, params):
+        names = params['filter']['host']
+
+        return [deepcopy(host) for host in self.hosts.values() if host['host'] in names]
+
+    def host_massadd(self, params):
+        hosts = self._hosts(params)
+
+        for host in hosts:
+            host['groups'].extend(i for i in params.get('groups', ()) if i not in host['groups'])
+            host['parentTemplates'].extend(i for i in params.get('templates', ()) if i not in host['parentTemplates'])
+
+        return {'hostids': [host['hostid'] for host in hosts]}
+
+    def host_massupdate(self, params):
+        hosts = self._hosts(params)
+
+        for host in hosts:
+            if 'groups' in params:
+                host['groups'] = params['groups']
+            if 'templates' in params:
+                host['parentTemplates'] = params['templates']
+
+        return {'hostids': [host['hostid'] for host in hosts]}
+
+    def host_update(self, params):
+        host = self.hosts[str(params.pop('hostid'))]  # Zabbix accepts IDs as numbers and strings
+        host.update(params)
+
+        return {'hostids': [host['hostid']]}
+
+
+class FakeSettings(object):
+    MON_ZABBIX_ENABLED = False  # Do not connect to a real Zabbix server
+
+
+class FakeDc(object):
+    name = 'test'
+    settings = FakeSettings()
+
+
+class FakeMeta(object):
+    verbose_name_raw = 'object'
+
+
+class FakeObj(object):
+    _meta = FakeMeta()
+
+    def __init__(self, uuid, name, groups, templates):
+        self.id = uuid
+        self.name = name
+        self.groups = groups
+        self.templates = templates
+        self.zabbix_host = {}
+        self.log = []
+
+    def __str__(self):
+        return self.id
+
+    def save_zabbix_host(self, host):
+        self.zabbix_host = host
+
+
+class ZabbixHostReconcilerTests(TestCase):
+    def setUp(self):
+        self.server = server = FakeZabbixServer()
+        self.thread = Thread(target=server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+        zapi = ZabbixAPI(server=server.url)
+        zapi.login('test', 'test')
+        self.zx = ZabbixBase(FakeDc(), zapi=zapi)
+
+        server.add_host('101', 'vm1', 'vm1', ['1'], ['10'])  # in sync
+        server.add_host('102', 'vm2', 'vm2', ['1'], ['10'])  # template2 and group2 added
+        server.add_host('103', 'vm3', 'vm3', ['1'], ['10'])  # template2 added and renamed
+        server.add_host('104', 'vm4', 'vm4', ['1'], ['10'])  # group1 replaced by group2
+        self.objs = [
+            FakeObj('vm1', 'vm1', ['group1'], ['template1']),
+            FakeObj('vm2', 'vm2', ['group1', 'group2'], ['template1', 'template2']),
+            FakeObj('vm3', 'vm3.example.com', ['group1'], ['template1', 'template2']),
+            FakeObj('vm4', 'vm4', ['group2'], ['template1']),
+            FakeObj('vm5', 'vm5', ['group1'], ['template1']),  # not in Zabbix
+        ]
+        server.calls = []
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    # noinspection PyProtectedMember,PyUnusedLocal
+    def _diff(self, obj, host, log=None):
+        zx = self.zx
+        groups = set(int(zx._zabbix_get_groupid(i)) for i in obj.groups)
+        templates = set(int(zx._zabbix_get_templateid(i)) for i in obj.templates)
+        params = {}
+
+        if groups != zx._parse_host_groups(host):
+            params['groups'] = zx._gen_host_groups(groups)
+
+        if templates != zx._parse_host_templates(host):
+            params['templates'] = zx._gen_host_templates(templates)
+            templates_clear = zx._parse_host_templates(host) - templates
+
+            if templates_clear:
+                params['templates_clear'] = zx._gen_host_templates(templates_clear)
+
+        if obj.name != host['name']:
+            params['name'] = obj.name
+
+        return params
+
+    @staticmethod
+    def _obj_log(obj):
+        def log(level, msg, *args):
+            obj.log.append(msg % args)
+        return log
+
+    def _reconcile(self):
+        reconciler = ZabbixHostReconciler(self.zx, obj_log=self._obj_log)
+
+        return reconciler, reconciler.reconcile(self.objs, self._diff)
+
+    def test_reconcile(self):
+        vm1, vm2, vm3, vm4, vm5 = self.objs
+        reconciler, missing = self._reconcile()
+        hosts = self.server.hosts
+
+        self.assertEqual(missing, [vm5])
+        self.assertEqual(self.server.calls, ['hostgroup.get', 'template.get', 'proxy.get', 'host.get',
+                                             'host.massupdate', 'host.massadd', 'host.massadd', 'host.update',
+                                             'host.get'])
+        self.assertEqual(dict(reconciler.summary), {
+            'hosts': 5,
+            'unchanged': 1,
+            'updated': 3,
+            'created': 0,
+            'deleted': 0,
+            'skipped': 0,
+            'failed': 0,
+            'massadd_calls': 2,
+            'massupdate_calls': 1,
+            'update_calls': 1,
+        })
+        self.assertEqual(reconciler.results, {vm1: True, vm2: True, vm3: True, vm4: True})
+        self.assertEqual(self.zx.prefetched, ())
+
+        self.assertEqual(self.zx._parse_host_groups(hosts['102']), {1, 2})
+        self.assertEqual(self.zx._parse_host_templates(hosts['102']), {10, 11})
+        self.assertEqual(self.zx._parse_host_templates(hosts['103']), {10, 11})
+        self.assertEqual(hosts['103']['name'], 'vm3.example.com')
+        self.assertEqual(self.zx._parse_host_groups(hosts['104']), {2})
+
+        self.assertEqual(vm1.zabbix_host, {})
+        for obj, hostid in ((vm2, '102'), (vm3, '103'), (vm4, '104')):
+            self.assertEqual(obj.zabbix_host, hosts[hostid])
+            self.assertIn('Updated Zabbix host ID "%s"' % hostid, obj.log)
+
+        self.assertIn('Zabbix host ID "101" configuration is synchronized with current vm1 configuration', vm1.log)
+
+    def test_reconcile_failure(self):
+        vm1, vm2, vm3, vm4, vm5 = self.objs
+        self.server.failing.add('host.massupdate')
+        reconciler, missing = self._reconcile()
+
+        self.assertEqual(missing, [vm5])
+        self.assertEqual(reconciler.summary['updated'], 2)
+        self.assertEqual(reconciler.summary['failed'], 1)
+        self.assertEqual(reconciler.results, {vm1: True, vm2: True, vm3: True, vm4: False})
+        self.assertEqual(self.zx._parse_host_groups(self.server.hosts['104']), {1})
+        self.assertEqual(vm4.zabbix_host, {})
+        self.assertIn('Could not update Zabbix host ID "104"', vm4.log)
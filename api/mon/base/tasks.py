@@ -2,14 +2,17 @@ from celery.utils.log import get_task_logger
 
 from api.mon import get_monitoring, del_monitoring
 from api.mon.exceptions import RemoteObjectDoesNotExist, RemoteObjectAlreadyExists
+from api.mon.log import DetailLog
+from api.mon.messages import LOG_MON_VM_UPDATE
 from api.mon.vm.tasks import mon_vm_sync
 from api.mon.node.tasks import mon_node_sync
 # noinspection PyProtectedMember
 from api.mon.alerting.tasks import mon_all_groups_sync
-from api.task.utils import mgmt_lock, mgmt_task
+from api.task.utils import mgmt_lock, mgmt_task, MGMT_LOCK_TIMEOUT
 from que.exceptions import MgmtTaskException
 from que.erigonesd import cq
 from que.internal import InternalTask
+from que.lock import TaskLock
 from que.mgmt import MgmtTask
 from vms.models import Dc, Node
 
@@ -42,14 +45,59 @@ def mon_clear_zabbix_cache(dc, full=True):
         logger.info('Cleared cache for zabbix instance %s in DC "%s"', zx, dc)
 
 
+def mon_vm_sync_all(task_id, dc):
+    """
+    Synchronize monitoring hosts of all VMs in a DC by one bulk reconciliation (used by mon_sync_all).
+    Every VM is locked by the same task lock as used by mon_vm_sync and gets its own task log entry.
+    Return list of VM UUIDs, which are locked by another task and have to be synchronized by mon_vm_sync.
+    """
+    locks = []
+    busy = []
+
+    try:
+        for vm_uuid in dc.vm_set.values_list('uuid', flat=True):
+            # Same lock key as created by @mgmt_lock(key_kwargs=('vm_uuid',)) of mon_vm_sync()
+            task_lock = TaskLock('mon_vm_sync:%s' % vm_uuid, desc='Task mon_vm_sync')
+
+            if task_lock.acquire(task_id, timeout=MGMT_LOCK_TIMEOUT, save_reverse=False):
+                locks.append((vm_uuid, task_lock))
+            else:
+                busy.append(vm_uuid)
+
+        locked = frozenset(vm_uuid for vm_uuid, _ in locks)
+        # VMs are loaded after they were locked, so that we do not work with data changed by a running mon_vm_sync
+        vms = [vm for vm in dc.vm_set.select_related('dc', 'node').filter(slavevm__isnull=True)
+               if vm.uuid in locked and not vm.is_deploying()]
+        vm_task_logs = {vm.uuid: DetailLog(task_id, LOG_MON_VM_UPDATE, obj=vm) for vm in vms}
+        result, vm_results = get_monitoring(dc).vm_sync_all(vms, vm_task_logs=vm_task_logs)
+
+        for vm in vms:
+            log = vm_task_logs[vm.uuid]
+            log.dc_id = vm.dc.id
+            log.save(vm_results[vm.uuid])
+
+        logger.info('Monitoring host synchronization for all VMs in DC %s finished: %s', dc, result)
+    finally:
+        for _, task_lock in locks:
+            task_lock.delete(fail_silently=True, delete_reverse=False)
+
+    if busy:
+        logger.warning('Monitoring host synchronization of %d VMs in DC %s will be done by mon_vm_sync, because '
+                       'the VMs are locked by another task', len(busy), dc)
+
+    return busy
+
+
 # noinspection PyUnusedLocal
 @cq.task(name='api.mon.base.tasks.mon_sync_all', base=InternalTask)
 @mgmt_lock(key_args=(1,), wait_for_release=True)
-def mon_sync_all(task_id, dc_id, clear_cache=True, sync_groups=True, sync_nodes=True, sync_vms=True, **kwargs):
+def mon_sync_all(task_id, dc_id, clear_cache=True, sync_groups=True, sync_nodes=True, sync_vms=True, bulk_vms=True,
+                 **kwargs):
     """
     Clear Zabbix cache and sync everything in Zabbix.
     Related to a specific DC.
     Triggered by dc_settings_changed signal.
+    VM hosts are synchronized by one bulk reconciliation if bulk_vms is True (otherwise by one task per VM).
     """
     dc = Dc.objects.get_by_id(int(dc_id))
 
@@ -69,7 +117,19 @@ def mon_sync_all(task_id, dc_id, clear_cache=True, sync_groups=True, sync_nodes=
 
     if sync_vms:
         logger.info('Running monitoring host synchronization for all VMs in DC %s', dc)
-        for vm_uuid in dc.vm_set.values_list('uuid', flat=True):
+
+        if bulk_vms:
+            try:
+                vm_uuids = mon_vm_sync_all(task_id, dc)
+            except Exception as exc:
+                logger.exception(exc)
+                logger.error('Bulk monitoring host synchronization for all VMs in DC %s failed. '
+                             'Falling back to synchronization of every VM', dc)
+                vm_uuids = dc.vm_set.values_list('uuid', flat=True)
+        else:
+            vm_uuids = dc.vm_set.values_list('uuid', flat=True)
+
+        for vm_uuid in vm_uuids:
             mon_vm_sync.call(task_id, vm_uuid=vm_uuid)
 
 
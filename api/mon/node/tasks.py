@@ -55,7 +55,8 @@ def mon_node_history(task_id, node_uuid, items, zhistory, result, items_search,
     """
     try:
         history = get_monitoring(DefaultDc()).node_history(node_uuid, items, zhistory, result['since'], result['until'],
-                                                           items_search=items_search)
+                                                           items_search=items_search,
+                                                           max_points=result.get('max_points', None))
     except MonitoringError as exc:
         raise MgmtTaskException(text_type(exc))
 
@@ -75,7 +76,8 @@ def mon_node_vm_history(task_id, node_uuid, items, zhistory, result, items_searc
 
     try:
         history = get_monitoring(DefaultDc()).vms_history(vm_uuids, items, zhistory, result['since'], result['until'],
-                                                          items_search=items_search, skip_nonexistent_items=True)
+                                                          items_search=items_search, skip_nonexistent_items=True,
+                                                          max_points=result.get('max_points', None))
     except MonitoringError as exc:
         raise MgmtTaskException(text_type(exc))
 
@@ -100,6 +100,9 @@ by each virtual machine on the compute node.
         :type data.since: integer
         :arg data.until: Return only values that have been received before the given UNIX timestamp (default: now)
         :type data.until: integer
+        :arg data.max_points: Maximum number of returned values per monitoring item; values are downsampled \
+if there are more of them (default: MON_ZABBIX_GRAPH_MAX_POINTS)
+        :type data.max_points: integer
         :arg data.nic: only used with *net-bandwidth* and *net-packets* graphs \
 to specify name of the NIC for which graph should be retrieved.
         :type data.nic: string
@@ -8,6 +8,7 @@ class MonHistorySerializer(s.Serializer):
     since = s.TimeStampField(required=False)
     until = s.TimeStampField(required=False)
     autorefresh = s.BooleanField(default=False)
+    max_points = s.IntegerField(required=False, min_value=10, max_value=100000)
     # item_id is used in child classes to store value of the zabbix item,
     # that is subsequently used to fill Zabbix item in GRAPH_ITEMS dict
     item_id = None
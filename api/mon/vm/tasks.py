@@ -54,7 +54,7 @@ def mon_vm_history(task_id, vm_uuid, items, zhistory, result, items_search, **kw
 
     try:
         history = get_monitoring(dc).vm_history(vm_uuid, items, zhistory, result['since'], result['until'],
-                                                items_search=items_search)
+                                                items_search=items_search, max_points=result.get('max_points', None))
     except MonitoringError as exc:
         raise MgmtTaskException(text_type(exc))
 
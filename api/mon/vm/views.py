@@ -167,6 +167,9 @@ the virtual hard drive. *requires data.disk_id*
         :type data.since: integer
         :arg data.until: Return only values that have been received before the given timestamp (default: now)
         :type data.until: integer
+        :arg data.max_points: Maximum number of returned values per monitoring item; values are downsampled \
+if there are more of them (default: MON_ZABBIX_GRAPH_MAX_POINTS)
+        :type data.max_points: integer
         :arg data.disk_id: used only with *disk-throughput*, \
 *disk-io*, *fs-throughput*, *fs-io* graphs to specify ID of the disk for which graph should be retrieved.
         :type data.disk_id: integer
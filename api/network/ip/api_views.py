@@ -140,6 +140,8 @@ class NetworkIPView(APIView):
 
         if self.many:
             IPAddress.objects.bulk_create(ser.object)  # INSERT into IPAddress
+            # bulk_create() does not send post_save signals
+            self.net.ip_pool.add([i.ip for i in ser.object if i.usage == IPAddress.VM])
         else:
             ser.object.save()  # INSERT into IPAddress
 
@@ -31,6 +31,13 @@ class NodeVmView(APIView):
             ser_class = VmSerializer
             extra = None
 
+        def serialize(vms):
+            if vms:
+                # noinspection PyUnresolvedReferences
+                return ser_class(self.request, vms, many=True).data
+            else:
+                return []
+
         if self.full or self.extended:
             vms = get_vms(self.request, sr=sr, order_by=self.order_by, node=self.node)
 
@@ -38,14 +45,10 @@ class NodeVmView(APIView):
                 # noinspection PyArgumentList
                 vms = vms.extra(**extra).prefetch_related('tags')
 
-            if vms:
-                # noinspection PyUnresolvedReferences
-                res = ser_class(self.request, vms, many=True).data
-            else:
-                res = []
+            res = self.get_many(vms, serialize)
         else:
-            res = list(get_vms(self.request, sr=(), order_by=self.order_by, node=self.node).values_list('hostname',
-                                                                                                        flat=True))
+            res = self.get_many(get_vms(self.request, sr=(), order_by=self.order_by, node=self.node)
+                                .values_list('hostname', flat=True))
 
         return SuccessTaskResponse(self.request, res, dc_bound=self.dc_bound)
 
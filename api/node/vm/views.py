@@ -30,6 +30,11 @@ def node_vm_list(request, hostname, data=None):
         :type data.extended: boolean
         :arg data.order_by: :ref:`Available fields for sorting <order_by>`: ``hostname`` (default: ``hostname``)
         :type data.order_by: string
+        :arg data.cursor: Fetch VMs by cursor (keyset) pagination (100 VMs per page). Use an empty value for \
+the first page; the cursor of the next page is part of the ``next`` link (default: null)
+        :type data.cursor: string
+        :arg data.stream: Stream the list of VMs in chunks (default: false)
+        :type data.stream: boolean
         :status 200: SUCCESS
         :status 403: Forbidden
     """
@@ -1,6 +1,11 @@
+from base64 import urlsafe_b64encode, urlsafe_b64decode
 from collections import OrderedDict
+from datetime import date, datetime
+import json
 
+from django.core.exceptions import FieldDoesNotExist
 from django.core.paginator import InvalidPage, Paginator as DjangoPaginator
+from django.db.models import Q
 
 from api.exceptions import NotFound
 from api.utils.urls import replace_query_param
@@ -66,3 +71,137 @@ def get_pager(request, qs, per_page=100, page=None):
         page = request.query_params.get('page', 1)
 
     return paginator.get_page(page)
+
+
+class KeysetPaginator(object):
+    """
+    Cursor (keyset) paginator. The next page is selected by a WHERE condition on the sort fields of the last row
+    instead of an OFFSET and the total number of rows is not counted. The cursor is an opaque token, which should be
+    taken from the next link.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def __init__(self, request, qs, order_by, per_page=100):
+        order_by = list(order_by)
+
+        if not self._is_unique(qs.model, order_by[-1].lstrip('-')):  # The last sort field must be unique
+            order_by.append('-pk' if order_by[-1].startswith('-') else 'pk')
+
+        self.request = request
+        self.order_by = order_by
+        self.qs = qs.order_by(*order_by)
+        self.per_page = per_page
+        self.object_list = []
+        self.next_cursor = None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @staticmethod
+    def _is_unique(model, field_name):
+        if field_name == 'pk':
+            return True
+
+        try:
+            return model._meta.get_field(field_name).unique
+        except FieldDoesNotExist:
+            return False
+
+    @staticmethod
+    def encode_cursor(values):
+        values = [i.isoformat() if isinstance(i, (datetime, date)) else i for i in values]
+        return urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, cursor):
+        try:
+            values = json.loads(urlsafe_b64decode(str(cursor)).decode('utf-8'))
+        except (TypeError, ValueError):
+            values = None
+
+        if not isinstance(values, list) or len(values) != len(self.order_by):
+            raise NotFound(self.invalid_cursor_message)
+
+        return values
+
+    def get_cursor_filter(self, values):
+        """(a > 1) OR (a = 1 AND b > 2) OR ... (descending fields use <)"""
+        query = Q()
+        equal = {}
+
+        for field, value in zip(self.order_by, values):
+            if field.startswith('-'):
+                field = field[1:]
+                lookup = '__lt'
+            else:
+                lookup = '__gt'
+
+            query |= Q(**dict(equal, **{field + lookup: value}))
+            equal[field] = value
+
+        return query
+
+    def get_row_values(self, row):
+        if isinstance(row, dict):
+            return [row[field.lstrip('-')] for field in self.order_by]
+        elif hasattr(row, '_meta'):
+            return [getattr(row, field.lstrip('-')) for field in self.order_by]
+        else:  # flat values_list()
+            return [row]
+
+    def get_page(self, cursor=None):
+        qs = self.qs
+
+        if cursor:
+            qs = qs.filter(self.get_cursor_filter(self.decode_cursor(cursor)))
+
+        rows = list(qs[:self.per_page + 1])
+
+        if len(rows) > self.per_page:
+            del rows[self.per_page:]
+            self.next_cursor = self.encode_cursor(self.get_row_values(rows[-1]))
+        else:
+            self.next_cursor = None
+
+        self.object_list = rows
+
+        return self
+
+    def iter_pages(self):
+        """Generate all pages (lists of rows), each one fetched by one small query"""
+        self.get_page()
+
+        while True:
+            yield self.object_list
+
+            if not self.next_cursor:
+                break
+
+            self.get_page(self.next_cursor)
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_response_results(self, results):
+        return OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', results),
+        ])
+
+
+def get_keyset_pager(request, qs, order_by, per_page=100, cursor=None):
+    """
+    Return our keyset paginator with one page loaded.
+    """
+    paginator = KeysetPaginator(request, qs, order_by, per_page=per_page)
+
+    if cursor is None:
+        cursor = request.query_params.get(paginator.cursor_query_param, None)
+
+    return paginator.get_page(cursor)
@@ -45,6 +45,44 @@ def zero_as_none(value):
     return None if value == 0 else value
 
 
+class JSONStream(object):
+    """
+    Lazy JSON array used in response data instead of a list. It wraps an iterable of chunks (lists of serialized
+    rows), which are rendered one by one by JSONRenderer.render_stream().
+    """
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+    @classmethod
+    def find(cls, data):
+        """Return tuple (path, stream) for the first JSONStream found in nested dicts or (None, None)"""
+        if isinstance(data, cls):
+            return (), data
+
+        if isinstance(data, dict):
+            for key, value in data.items():
+                path, stream = cls.find(value)
+
+                if stream is not None:
+                    return (key,) + path, stream
+
+        return None, None
+
+    @staticmethod
+    def replace(data, path, value):
+        """Return a copy of nested dicts with the value on path replaced"""
+        if not path:
+            return value
+
+        data = data.copy()
+        data[path[0]] = JSONStream.replace(data[path[0]], path[1:], value)
+
+        return data
+
+
 class BaseRenderer(object):
     """
     All renderers should extend this class, setting the `media_type`
@@ -125,3 +163,29 @@ class JSONRenderer(BaseRenderer):
             return bytes(ret.encode('utf-8'))
 
         return ret
+
+    def render_stream(self, data, accepted_media_type=None, renderer_context=None):
+        """
+        Generate JSON bytestrings from data containing one JSONStream. The data surrounding the stream are rendered
+        once and the stream is rendered chunk by chunk.
+        """
+        path, stream = JSONStream.find(data)
+        placeholder = '__json_stream__'
+        rendered_placeholder = self.render(placeholder, accepted_media_type, renderer_context)
+        prefix, suffix = self.render(JSONStream.replace(data, path, placeholder), accepted_media_type,
+                                     renderer_context).split(rendered_placeholder, 1)
+        yield prefix + b'['
+        first = True
+
+        for chunk in stream:
+            if not chunk:
+                continue
+
+            if first:
+                first = False
+            else:
+                yield b','
+
+            yield self.render(list(chunk), accepted_media_type, renderer_context)[1:-1]  # Strip [ and ]
+
+        yield b']' + suffix
@@ -35,14 +35,14 @@ Have a look in to api.task.response for more response classes and wider informat
 """
 from __future__ import unicode_literals
 
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.template.response import SimpleTemplateResponse
 from django.utils import six
 # noinspection PyUnresolvedReferences
 from django.utils.six.moves.http_client import responses
 
 from api import status
-from api.renderers import JSONRenderer
+from api.renderers import JSONRenderer, JSONStream
 from core.version import __version__
 
 
@@ -104,6 +104,26 @@ class Response(SimpleTemplateResponse):
 
         return ret
 
+    @property
+    def json_stream(self):
+        """JSONStream in response data or None"""
+        return JSONStream.find(self.data)[1]
+
+    def get_streaming_response(self):
+        """
+        Return a StreamingHttpResponse, which renders the JSONStream in response data chunk by chunk.
+        """
+        renderer = self.accepted_renderer
+        content = renderer.render_stream(self.data, self.accepted_media_type, self.renderer_context)
+        response = StreamingHttpResponse(content, status=self.status_code)
+
+        for name, value in self.items():
+            response[name] = value
+
+        response['Content-Type'] = renderer.media_type
+
+        return response
+
     @property
     def status_text(self):
         """
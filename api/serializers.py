@@ -242,6 +242,15 @@ def _get_declared_fields(bases, attrs):
     return OrderedDict(fields)
 
 
+def _get_func(cls, name):
+    """
+    Return plain function behind a class method (for checking whether the method was overridden).
+    """
+    method = getattr(cls, name)
+
+    return getattr(method, '__func__', method)
+
+
 class SerializerMetaclass(type):
     def __new__(mcs, name, bases, attrs):
         attrs['base_fields'] = _get_declared_fields(bases, attrs)
@@ -268,6 +277,7 @@ class BaseSerializer(WritableField):  # noqa: F405
 
     _options_class = SerializerOptions
     _dict_class = SortedDictWithMetadata
+    _native_plan_allowed = {}  # Cache: {serializer class: bool} - see native_plan_allowed()
 
     def __init__(self, instance=None, data=None, files=None, context=None, partial=False, many=False,
                  allow_add_remove=False, **kwargs):
@@ -452,6 +462,82 @@ class BaseSerializer(WritableField):  # noqa: F405
 
         return ret
 
+    @classmethod
+    def native_plan_allowed(cls):
+        """
+        Return True if the precompiled serialization plan can be used instead of to_native() for this class.
+        """
+        try:
+            return cls._native_plan_allowed[cls]
+        except KeyError:
+            allowed = _get_func(cls, 'to_native') is _get_func(BaseSerializer, 'to_native')
+            cls._native_plan_allowed[cls] = allowed
+            return allowed
+
+    @cached_property
+    def native_plan(self):
+        """
+        Precompiled read-only serialization plan - a list of (key, field, field_name, source components, transform)
+        tuples. Source components are set only for fields using the default field_to_native() implementation.
+        """
+        simple_field_to_native = (_get_func(Field, 'field_to_native'),  # noqa: F405
+                                  _get_func(WritableField, 'field_to_native'))  # noqa: F405
+        plan = []
+
+        for field_name, field in self.fields.items():
+            if getattr(field, 'write_only', False):
+                continue
+
+            field.initialize(parent=self, field_name=field_name)
+            source = field.source or field_name
+
+            if source != '*' and _get_func(field.__class__, 'field_to_native') in simple_field_to_native:
+                components = tuple(source.split('.'))
+            else:
+                components = None
+
+            transform = getattr(self, 'transform_%s' % field_name, None)
+
+            if not callable(transform):
+                transform = None
+
+            plan.append((self.get_field_key(field_name), field, field_name, components, transform))
+
+        return plan
+
+    def to_native_compiled(self, obj, plan=None):
+        """
+        Serialize object -> primitives by using the precompiled read-only serialization plan.
+        Same as to_native(), but without field metadata.
+        """
+        if obj is None:
+            return self.to_native(obj)
+
+        if plan is None:
+            plan = self.native_plan
+
+        ret = OrderedDict()
+
+        for key, field, field_name, components, transform in plan:
+            if components is None:
+                value = field.field_to_native(obj, field_name)
+            else:
+                value = obj
+
+                for component in components:
+                    value = get_component(value, component)
+                    if value is None:
+                        break
+
+                value = field.to_native(value)
+
+            if transform is not None:
+                value = transform(obj, value)
+
+            ret[key] = value
+
+        return ret
+
     def from_native(self, data, files=None):
         """
         Deserialize primitives -> objects.
@@ -664,7 +750,11 @@ class BaseSerializer(WritableField):  # noqa: F405
                                          'Use the `many=True` flag when instantiating the serializer.')
 
             if many:
-                self._data = [self.to_native(item) for item in obj]
+                if self.native_plan_allowed():
+                    plan = self.native_plan
+                    self._data = [self.to_native_compiled(item, plan) for item in obj]
+                else:
+                    self._data = [self.to_native(item) for item in obj]
             else:
                 self._data = self.to_native(obj)
 
@@ -1,7 +1,16 @@
-from django.core.cache import cache
+from contextlib import contextmanager
+from threading import local
+
+from django.core.cache import cache, caches
 from django.db.models import Q
 from django.conf import settings
 
+try:
+    # noinspection PyPep8Naming
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
 from vms.models import TaskLogEntry
 from gui.models import User
 from que import TT, TG, TG_DC_UNBOUND
@@ -13,22 +22,52 @@ MSG_DELETE = ('Remove', 'Delete', 'Invalid')
 MSG_REMOTE = 'Remote'
 
 
+class _LogBuffer(local):
+    """Task log entries waiting to be saved into DB (see log_bulk())"""
+    entries = None
+
+
+_log_buffer = _LogBuffer()
+
+
+def _redis():
+    return caches['redis'].master_client
+
+
 def _cache_log_key(owner_id, dc_id):
-    """Return the key for tasklog in cache"""
-    return settings.TASK_LOG_BASENAME + '.' + str(owner_id) + '.' + str(dc_id)
+    """Return the key for tasklog list in redis"""
+    return '%s:%s:%s:%s:%s' % (cache.key_prefix, cache.version, settings.TASK_LOG_BASENAME, owner_id, dc_id)
+
 
+def _cache_log(pipe, key, data):
+    """Prepend pickled msgdict to the capped tasklog list"""
+    pipe.lpush(key, data)
+    pipe.ltrim(key, 0, settings.TASK_LOG_LASTSIZE - 1)
 
-def _cache_log(key, msgdict):
-    """Save msgdict into owner_ids cache"""
-    lastlog = cache.get(key)
 
-    if lastlog is None or not isinstance(lastlog, list):
-        lastlog = []
-    elif len(lastlog) >= settings.TASK_LOG_LASTSIZE:
-        lastlog.pop(0)
+@contextmanager
+def log_bulk():
+    """
+    Collect all task log entries created by log() in this block and save them into DB with one INSERT.
+    The entries are saved only if the block exits normally - an exception raised inside a (broken) DB transaction
+    would be hidden by the failed INSERT.
+    """
+    if _log_buffer.entries is not None:  # Nested block
+        yield
+        return
+
+    _log_buffer.entries = []
+
+    try:
+        yield
+    except BaseException:  # Including gevent.Timeout; the buffer must not stay enabled in this thread
+        _log_buffer.entries = None
+        raise
+
+    entries, _log_buffer.entries = _log_buffer.entries, None
 
-    lastlog.append(msgdict)
-    cache.set(key, lastlog)
+    if entries:
+        TaskLogEntry.add_bulk(entries)
 
 
 def log(msgdict):
@@ -39,7 +78,10 @@ def log(msgdict):
     dct = msgdict.copy()
 
     # DB
-    TaskLogEntry.add(**msgdict)
+    if _log_buffer.entries is None:
+        TaskLogEntry.add(**msgdict)
+    else:
+        _log_buffer.entries.append(msgdict)
 
     # Do not store PKs in cache
     dc_id = dct.pop('dc_id')
@@ -48,13 +90,17 @@ def log(msgdict):
     del dct['object_pk']
     del dct['content_type']
     dct['time'] = dct['time'].isoformat()
+    data = pickle.dumps(dct)
+    pipe = _redis().pipeline()
 
     # Always store everything in staff cached task log
-    _cache_log(_cache_log_key(settings.TASK_LOG_STAFF_ID, dc_id), dct)
+    _cache_log(pipe, _cache_log_key(settings.TASK_LOG_STAFF_ID, dc_id), data)
 
     # Store owner relevant actions in owners cached task log
     if owner_id not in User.get_super_admin_ids():
-        _cache_log(_cache_log_key(owner_id, dc_id), dct)
+        _cache_log(pipe, _cache_log_key(owner_id, dc_id), data)
+
+    pipe.execute()
 
 
 def _get_task_type(tg, tt):
@@ -127,13 +173,7 @@ def get_tasklog_cached(request):
     else:
         key = _cache_log_key(request.user.id, request.dc.id)
 
-    res = cache.get(key)
-
-    if res is None or not isinstance(res, list):
-        return []
-
-    res.reverse()
-    return res
+    return [pickle.loads(i) for i in _redis().lrange(key, 0, settings.TASK_LOG_LASTSIZE - 1)]
 
 
 def delete_tasklog_cached(dc_id, user_id=None):
@@ -145,4 +185,4 @@ def delete_tasklog_cached(dc_id, user_id=None):
     else:
         key = _cache_log_key(settings.TASK_LOG_STAFF_ID, dc_id)
 
-    return cache.delete(key)
+    return _redis().delete(key)
@@ -6,7 +6,7 @@ from django.db.models import Count
 
 from api import status
 from api.api_views import APIView
-from api.paginator import get_pager
+from api.paginator import get_pager, get_keyset_pager
 from api.exceptions import InvalidInput
 from api.task.response import TaskSuccessResponse, SimpleTaskResponse
 from api.task.log import get_tasklog, get_tasklog_cached
@@ -24,7 +24,9 @@ class TaskLogView(APIView):
         """api.task.views.task_log"""
         request = self.request
 
-        if self.data.get('page', None):
+        cursor = self.data.get('cursor', None)
+
+        if self.data.get('page', None) or cursor is not None:
             ser = TaskLogFilterSerializer(data=self.data)
 
             if not ser.is_valid():
@@ -32,9 +34,15 @@ class TaskLogView(APIView):
 
             q = ser.get_filters(pending_tasks=get_user_tasks(request))
             tasklog_items = get_tasklog(request, q=q, order_by=self.order_by)
-            TaskLogEntry.prepare_queryset(tasklog_items)
-            pag = get_pager(request, tasklog_items, per_page=100)
-            res = pag.paginator.get_response_results(TaskLogEntrySerializer(pag, many=True).data)
+
+            if cursor is None:
+                TaskLogEntry.prepare_queryset(tasklog_items)
+                pag = get_pager(request, tasklog_items, per_page=100)
+                res = pag.paginator.get_response_results(TaskLogEntrySerializer(pag, many=True).data)
+            else:  # Keyset pagination ordered by time and id (no OFFSET and COUNT queries)
+                pag = get_keyset_pager(request, tasklog_items, self.order_by, per_page=100, cursor=cursor)
+                TaskLogEntry.prepare_queryset(pag.object_list)
+                res = pag.get_response_results(TaskLogEntrySerializer(pag.object_list, many=True).data)
         else:
             res = {'results': get_tasklog_cached(request)}
 
@@ -197,7 +197,7 @@ def task_log(request, data=None):
     .. http:get:: /task/log
 
         .. note:: Task log filters below are available only when displaying task log entries from DB \
-(using the **page** attribute).
+(using the **page** or **cursor** attribute).
 
         :DC-bound?:
             * |dc-yes|
@@ -207,6 +207,9 @@ def task_log(request, data=None):
         :arg data.page: Page number to fetch. Each page has 100 log entries \
 (default: null - last 10 log entries from cache)
         :type data.page: integer
+        :arg data.cursor: Fetch log entries by cursor (keyset) pagination without counting all log entries. \
+Use an empty value for the first page; the cursor of the next page is part of the ``next`` link (default: null)
+        :type data.cursor: string
         :arg data.status: Filter task log entries by status (default: "")
         :type data.status: string (one of: PENDING, SUCCESS, FAILURE, REVOKED)
         :arg data.object_type: Filter task log entries by object type (default: "")
@@ -30,6 +30,7 @@ Provides various throttling policies.
 from __future__ import unicode_literals
 
 import time
+import random
 
 from django.core.cache import cache as default_cache
 from django.core.exceptions import ImproperlyConfigured
@@ -279,3 +280,131 @@ class ScopedRateThrottle(SimpleRateThrottle):
             'scope': self.scope,
             'ident': ident
         }
+
+
+class RedisRateThrottle(SimpleRateThrottle):
+    """
+    Sliding window rate throttle stored in a redis sorted set. The whole check (trim old requests, count, insert
+    the new request and update accepted/rejected metrics) is performed by one Lua script => one round trip per
+    request and no race conditions between API workers. Use together with one of the throttle classes above, e.g.:
+    class RedisUserRateThrottle(UserRateThrottle, RedisRateThrottle).
+    """
+    METRICS_KEY = 'throttle-metrics'
+    SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local duration = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+local allowed = 0
+
+redis.call('ZREMRANGEBYSCORE', key, '-inf', now - duration)
+local count = redis.call('ZCARD', key)
+
+if count < limit then
+    redis.call('ZADD', key, now, ARGV[4])
+    redis.call('EXPIRE', key, math.ceil(duration))
+    count = count + 1
+    allowed = 1
+    redis.call('HINCRBY', KEYS[2], ARGV[5] .. ':accepted', 1)
+else
+    redis.call('HINCRBY', KEYS[2], ARGV[5] .. ':rejected', 1)
+end
+
+local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+
+return {allowed, count, oldest[2] or ''}
+"""
+    _script = None
+    _count = 0
+    _oldest = None
+
+    @classmethod
+    def _redis(cls):
+        from django.core.cache import caches
+
+        return caches['redis'].master_client
+
+    @classmethod
+    def _get_script(cls):
+        if RedisRateThrottle._script is None:
+            RedisRateThrottle._script = cls._redis().register_script(cls.SCRIPT)
+        return RedisRateThrottle._script
+
+    @classmethod
+    def _make_key(cls, key):
+        return '%s:%s:%s' % (cls.cache.key_prefix, cls.cache.version, key)
+
+    def allow_request(self, request, view):
+        if getattr(request, 'disable_throttling', False):
+            return True
+
+        if self.rate is None:
+            return True
+
+        # noinspection PyAttributeOutsideInit
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        # noinspection PyAttributeOutsideInit
+        self.now = now = self.timer()
+        member = '%.6f:%d' % (now, random.getrandbits(32))
+        allowed, self._count, oldest = self._get_script()(
+            keys=(self._make_key(self.key), self._make_key(self.METRICS_KEY)),
+            args=(repr(now), self.duration, self.num_requests, member, self.scope),
+        )
+        self._oldest = float(oldest) if oldest else None
+
+        if allowed:
+            return True
+        return self.throttle_failure()
+
+    def wait(self):
+        if self._oldest is None:
+            remaining_duration = self.duration
+        else:
+            remaining_duration = self.duration - (self.now - self._oldest)
+
+        available_requests = self.num_requests - self._count + 1
+        if available_requests <= 0:
+            return None
+
+        return remaining_duration / float(available_requests)
+
+    @classmethod
+    def get_metrics(cls):
+        """
+        Return dictionary with accepted and rejected request counters for each throttle scope.
+        """
+        metrics = {}
+
+        for field, value in cls._redis().hgetall(cls._make_key(cls.METRICS_KEY)).items():
+            scope, result = field.rsplit(':', 1)
+            metrics.setdefault(scope, {'accepted': 0, 'rejected': 0})[result] = int(value)
+
+        return metrics
+
+    @classmethod
+    def reset_metrics(cls):
+        return cls._redis().delete(cls._make_key(cls.METRICS_KEY))
+
+
+class RedisAnonRateThrottle(AnonRateThrottle, RedisRateThrottle):
+    """
+    AnonRateThrottle stored in redis.
+    """
+    pass
+
+
+class RedisUserRateThrottle(UserRateThrottle, RedisRateThrottle):
+    """
+    UserRateThrottle stored in redis.
+    """
+    pass
+
+
+class RedisScopedRateThrottle(ScopedRateThrottle, RedisRateThrottle):
+    """
+    ScopedRateThrottle stored in redis.
+    """
+    pass
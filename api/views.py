@@ -50,7 +50,7 @@ from api.parsers import JSONParser
 from api.renderers import JSONRenderer
 from api.request import Request
 from api.response import Response
-from api.throttling import AnonRateThrottle, UserRateThrottle
+from api.throttling import RedisAnonRateThrottle, RedisUserRateThrottle
 from api.utils import formatting
 from api.accounts.base.authentication import SessionAuthentication, ApiKeyAuthentication, ExpireTokenAuthentication
 
@@ -139,7 +139,7 @@ class View(DjangoView):
     renderer_classes = (JSONRenderer,)
     parser_classes = (JSONParser,)
     authentication_classes = (SessionAuthentication, ApiKeyAuthentication, ExpireTokenAuthentication)
-    throttle_classes = (AnonRateThrottle, UserRateThrottle)
+    throttle_classes = (RedisAnonRateThrottle, RedisUserRateThrottle)
     permission_classes = (IsAuthenticated, HasAPIAccessPermission)
     content_negotiation_class = DefaultContentNegotiation
     versioning_class = None
@@ -427,6 +427,9 @@ class View(DjangoView):
             response.accepted_media_type = request.accepted_media_type
             response.renderer_context = self.get_renderer_context()
 
+            if response.json_stream is not None and hasattr(response.accepted_renderer, 'render_stream'):
+                response = response.get_streaming_response()
+
         for key, value in self.headers.items():
             response[key] = value
 
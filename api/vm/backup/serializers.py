@@ -14,7 +14,8 @@ class BackupDefineSerializer(_HideNodeSerializer):
     vms.models.BackupDefine
     """
     _model_ = BackupDefine
-    _update_fields_ = ('type', 'desc', 'node', 'zpool', 'bwlimit', 'active', 'schedule', 'retention', 'compression')
+    _update_fields_ = ('type', 'desc', 'node', 'zpool', 'bwlimit', 'active', 'schedule', 'retention', 'compression',
+                       'compression_level', 'compression_threads')
     _default_fields_ = ('hostname', 'name', 'disk_id')
 
     hostname = s.CharField(source='vm.hostname', read_only=True)
@@ -32,6 +33,8 @@ class BackupDefineSerializer(_HideNodeSerializer):
     schedule = s.CronField()
     retention = s.IntegerField()  # limits set below
     compression = s.IntegerChoiceField(choices=BackupDefine.COMPRESSION)
+    compression_level = s.IntegerField(required=False, min_value=0, max_value=19)
+    compression_threads = s.IntegerField(required=False, min_value=0, max_value=256)
     fsfreeze = s.BooleanField(default=False)
 
     def __init__(self, request, instance, *args, **kwargs):
@@ -89,6 +92,17 @@ class BackupDefineSerializer(_HideNodeSerializer):
         except NodeStorage.DoesNotExist:
             self._errors['zpool'] = s.ErrorList([_('Zpool does not exist on node.')])
 
+        compression = attrs.get('compression', self.object.compression)
+        compression_level = attrs.get('compression_level', self.object.compression_level)
+
+        if compression_level is not None and compression in BackupDefine.COMPRESSION_LEVELS:
+            min_level, max_level = BackupDefine.COMPRESSION_LEVELS[compression]
+
+            if not min_level <= compression_level <= max_level:
+                self._errors['compression_level'] = s.ErrorList([
+                    _('Ensure this value is between %(min)s and %(max)s.') % {'min': min_level, 'max': max_level}
+                ])
+
         # Check total number of existing backup definitions - Issue #chili-447
         if self.request.method == 'POST':
             limit = self.request.dc.settings.VMS_VM_BACKUP_DEFINE_LIMIT
@@ -162,8 +162,14 @@ def vm_define_backup(request, hostname_or_uuid, bkpdef, data=None):
         :type data.retention: integer
         :arg data.active: Enable or disable backup schedule (default: true)
         :type data.active: boolean
-        :arg data.compression: Backup file compression algorithm (0 - none, 1 - gzip, 2 - bzip2, 3 - xz) (default: 0)
+        :arg data.compression: Backup file compression algorithm (0 - none, 1 - gzip, 2 - bzip2, 3 - xz, 4 - zstd) \
+(default: 0)
         :type data.compression: integer
+        :arg data.compression_level: Compression level (default: null => algorithm default)
+        :type data.compression_level: integer
+        :arg data.compression_threads: Number of compression threads; values greater than 1 use a parallel \
+compressor (0 - one thread per CPU) (default: null => single-threaded)
+        :type data.compression_threads: integer
         :arg data.bwlimit: Transfer rate limit in bytes (default: null => no limit)
         :type data.bwlimit: integer
         :arg data.desc: Backup definition description
@@ -199,8 +205,12 @@ creating backup snapshot (requires QEMU Guest Agent) (default: false)
         :type data.retention: integer
         :arg data.active: Enable or disable backup schedule
         :type data.active: boolean
-        :arg data.compression: Backup file compression algorithm (0 - none, 1 - gzip, 2 - bzip2, 3 - xz)
+        :arg data.compression: Backup file compression algorithm (0 - none, 1 - gzip, 2 - bzip2, 3 - xz, 4 - zstd)
         :type data.compression: integer
+        :arg data.compression_level: Compression level
+        :type data.compression_level: integer
+        :arg data.compression_threads: Number of compression threads (0 - one thread per CPU)
+        :type data.compression_threads: integer
         :arg data.bwlimit: Transfer rate limit in bytes
         :type data.bwlimit: integer
         :arg data.desc: Backup definition description
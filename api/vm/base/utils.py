@@ -1,6 +1,7 @@
 from core.celery.config import ERIGONES_TASK_USER
 from que.tasks import execute, get_task_logger
 from vms.models import SnapshotDefine, Snapshot, BackupDefine, Backup, IPAddress
+from vms.models.ippool import IPAddressPool
 
 logger = get_task_logger(__name__)
 
@@ -64,7 +65,12 @@ def vm_update_ipaddress_usage(vm):
     current_allowed_ips.update(vm.json_get_ips(primary_ips=False, allowed_ips=True))
 
     # Return old IPs back to IP pool, so they can be used again
-    vm.ipaddress_set.exclude(ip__in=current_ips).update(vm=None, usage=IPAddress.VM)
+    old_ips = vm.ipaddress_set.exclude(ip__in=current_ips)
+    released_ips = list(old_ips.select_related('subnet'))
+
+    if released_ips:
+        old_ips.update(vm=None, usage=IPAddress.VM)
+        IPAddressPool.add_released(released_ips)
 
     # Remove association of removed vm.allowed_ips
     for ip in vm.allowed_ips.exclude(ip__in=current_allowed_ips):
@@ -209,6 +209,15 @@ class VmManage(APIView):
             x.revert_active(revert_owner=False, revert_template=False)
             return x
 
+        def serialize(vms):
+            if active:
+                vms = [set_active(vm) for vm in vms]
+
+            if vms:
+                return ser_class(request, vms, many=True).data
+            else:
+                return []
+
         if many:
             if self.full or self.extended:
                 vms = get_vms(request, sr=sr, order_by=self.order_by)
@@ -217,15 +226,9 @@ class VmManage(APIView):
                     # noinspection PyArgumentList
                     vms = vms.extra(**extra).prefetch_related('tags')
 
-                if active:
-                    vms = [set_active(vm) for vm in vms]
-
-                if vms:
-                    res = ser_class(request, vms, many=True).data
-                else:
-                    res = []
+                res = self.get_many(vms, serialize)
             else:
-                res = list(get_vms(request, order_by=self.order_by).values_list('hostname', flat=True))
+                res = self.get_many(get_vms(request, order_by=self.order_by).values_list('hostname', flat=True))
 
         else:
             vm = get_vm(request, self.hostname_or_uuid, exists_ok=True, noexists_fail=True, sr=sr, extra=extra)
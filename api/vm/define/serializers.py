@@ -18,6 +18,7 @@ from api.vm.utils import get_nodes, get_templates, get_images, get_subnets, get_
 from api.vm.base.serializers import VmBaseSerializer
 from api.dns.record.api_views import RecordView
 from vms.models.base import _HVMType
+from pdns.models import RecordChangeSet
 
 PERMISSION_DENIED = _('Permission denied')
 INVALID_HOSTNAMES = frozenset(['define', 'status', 'backup', 'snapshot'])
@@ -1553,9 +1554,8 @@ class VmDefineNicSerializer(s.Serializer):
                 attrs['gateway'] = None
             else:
                 try:
-                    self._ip = IPAddress.objects.filter(subnet=net, vm__isnull=True, vms=None, usage=IPAddress.VM)\
-                                                .exclude(ip__in=allowed_ips).order_by('?')[0:1].get()
-                except IPAddress.DoesNotExist:
+                    self._ip = net.ip_pool.allocate(exclude=allowed_ips)[0]
+                except IndexError:
                     raise s.ValidationError(_('Cannot find free IP address for net %s.') % net.name)
                 else:
                     logger.info('IP address %s for NIC ID %s on VM %s was chosen automatically',
@@ -1730,7 +1730,12 @@ class VmDefineNicSerializer(s.Serializer):
         else:
             cls._create_vm_ip_association(vm, ip, many=many)
 
-    def save_ip(self, task_id, delete=False, update=False):  # noqa: R701
+    def save_ip(self, task_id, delete=False, update=False):
+        # PTR and A record changes of one NIC increment the SOA serial only once per DNS domain
+        with RecordChangeSet(atomic=False):
+            return self._save_ip(task_id, delete=delete, update=update)
+
+    def _save_ip(self, task_id, delete=False, update=False):  # noqa: R701
         vm = self.vm
         ip = self._ip
         ip_old = self._ip_old
@@ -5,6 +5,7 @@ from django.utils.six import iteritems
 from django.db.transaction import atomic
 
 from vms.models import Node
+from pdns.models import RecordChangeSet
 from api import status as scode
 from api.api_views import APIView
 from api.exceptions import VmIsNotOperational, ExpectationFailed, VmHasPendingTasks
@@ -189,14 +190,15 @@ class VmDefineView(VmDefineBaseView):
         task_id = SuccessTaskResponse.gen_task_id(self.request, vm=dead_vm, owner=owner)
 
         # Every VM NIC could have an association to other tables. Cleanup first:
-        for nic in vm.json_get_nics():
-            # noinspection PyBroadException
-            try:
-                nic_ser = VmDefineNicSerializer(self.request, vm, nic)
-                nic_ser.delete_ip(task_id)
-            except Exception as ex:
-                logger.exception(ex)
-                continue
+        with RecordChangeSet(atomic=False):  # One SOA serial increment per DNS domain
+            for nic in vm.json_get_nics():
+                # noinspection PyBroadException
+                try:
+                    nic_ser = VmDefineNicSerializer(self.request, vm, nic)
+                    nic_ser.delete_ip(task_id)
+                except Exception as ex:
+                    logger.exception(ex)
+                    continue
 
         # Finally delete VM
         logger.debug('Deleting VM %s from DB', vm)
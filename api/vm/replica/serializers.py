@@ -7,7 +7,7 @@ from api.node.image.api_views import NodeImageView
 from api.vm.define.vm_define_disk import DISK_ID_MIN, DISK_ID_MAX
 from api.vm.define.serializers import validate_nic_tags
 from api.vm.define.slave_vm_define import SlaveVmDefine
-from vms.models import Node, SlaveVm
+from vms.models import Node, SlaveVm, BackupDefine
 
 
 class DiskPoolDictField(s.BaseDictField):
@@ -20,7 +20,8 @@ class DiskPoolDictField(s.BaseDictField):
 class VmReplicaSerializer(s.InstanceSerializer):
     _model_ = SlaveVm
     _default_fields_ = ('repname',)
-    _update_fields_ = ('reserve_resources', 'sleep_time', 'enabled', 'bwlimit')
+    _update_fields_ = ('reserve_resources', 'sleep_time', 'enabled', 'bwlimit', 'compression', 'compression_level',
+                       'compression_threads')
 
     hostname = s.CharField(source='master_vm.hostname', read_only=True)
     repname = s.RegexField(r'^[A-Za-z0-9][A-Za-z0-9\._-]*$', source='name', max_length=24, min_length=1)
@@ -31,6 +32,11 @@ class VmReplicaSerializer(s.InstanceSerializer):
     sleep_time = s.IntegerField(source='rep_sleep_time', min_value=0, max_value=86400, default=60)
     enabled = s.BooleanField(source='rep_enabled', default=True)
     bwlimit = s.IntegerField(source='rep_bwlimit', required=False, min_value=0, max_value=2147483647)
+    compression = s.ChoiceField(source='rep_compression', choices=SlaveVm.REP_COMPRESSION, required=False)
+    compression_level = s.IntegerField(source='rep_compression_level', required=False, min_value=0,
+                                       max_value=19)  # Range of the compression algorithm is checked in validate()
+    compression_threads = s.IntegerField(source='rep_compression_threads', required=False, min_value=0,
+                                         max_value=256)
     last_sync = s.DateTimeField(read_only=True, required=False)
     reinit_required = s.BooleanField(source='rep_reinit_required', read_only=True, required=False)
     node_status = s.DisplayChoiceField(source='vm.node.status', choices=Node.STATUS_DB, read_only=True)
@@ -167,10 +173,30 @@ class VmReplicaSerializer(s.InstanceSerializer):
 
         return True
 
+    def _validate_compression_level(self, attrs):
+        """Compression level range depends on the compression algorithm (same as in backup definitions)"""
+        compression = attrs.get('rep_compression', self.object.rep_compression)
+        compression_level = attrs.get('rep_compression_level', self.object.rep_compression_level)
+
+        if compression_level is None:
+            return
+
+        compression = dict((name, value) for value, name in BackupDefine.COMPRESSION).get(compression, None)
+
+        if compression in BackupDefine.COMPRESSION_LEVELS:
+            min_level, max_level = BackupDefine.COMPRESSION_LEVELS[compression]
+
+            if not min_level <= compression_level <= max_level:
+                self._errors['compression_level'] = s.ErrorList([
+                    _('Ensure this value is between %(min)s and %(max)s.') % {'min': min_level, 'max': max_level}
+                ])
+
     def validate(self, attrs):
         if self.object.rep_reinit_required:
             raise s.ValidationError(_('Server replica requires re-initialization.'))
 
+        self._validate_compression_level(attrs)
+
         if self.request.method == 'POST':
             total = SlaveVm.objects.filter(master_vm=self.object.master_vm).exclude(name=u'').count()
             self.object.rep_id = total + 1
@@ -101,6 +101,14 @@ def vm_replica(request, hostname_or_uuid, repname=None, data=None):
         :type data.enabled: boolean
         :arg data.bwlimit: Transfer rate limit in bytes (default: null => no limit)
         :type data.bwlimit: integer
+        :arg data.compression: Replication stream compression algorithm (gzip, bzip2, xz, zstd) \
+(default: "" => no compression)
+        :type data.compression: string
+        :arg data.compression_level: Compression level (default: null => algorithm default)
+        :type data.compression_level: integer
+        :arg data.compression_threads: Number of compression threads; values greater than 1 use a parallel \
+compressor (0 - one thread per CPU) (default: null => single-threaded)
+        :type data.compression_threads: integer
         :status 200: SUCCESS
         :status 201: PENDING
         :status 400: FAILURE
@@ -136,6 +144,14 @@ def vm_replica(request, hostname_or_uuid, repname=None, data=None):
         :type data.enabled: boolean
         :arg data.bwlimit: Transfer rate limit in bytes
         :type data.bwlimit: integer
+        :arg data.compression: Replication stream compression algorithm (gzip, bzip2, xz, zstd) \
+(default: "" => no compression)
+        :type data.compression: string
+        :arg data.compression_level: Compression level (default: null => algorithm default)
+        :type data.compression_level: integer
+        :arg data.compression_threads: Number of compression threads; values greater than 1 use a parallel \
+compressor (0 - one thread per CPU) (default: null => single-threaded)
+        :type data.compression_threads: integer
         :status 200: SUCCESS
         :status 205: SUCCESS
         :status 201: PENDING
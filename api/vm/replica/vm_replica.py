@@ -72,6 +72,10 @@ class VmReplicaBaseView(APIView):
         if bwlimit:
             opts.append('-l %d' % bwlimit)
 
+        compression = slave_vm.rep_compression_spec
+        if compression:
+            opts.append('-C %s' % compression)
+
         return ' '.join(opts)
 
     def _check_master_vm(self):
@@ -143,12 +147,18 @@ class VmReplica(VmReplicaBaseView):
     @property
     def _esrep_init_opts(self):
         slave_vm = self.slave_vm
+        opts = []
         bwlimit = slave_vm.rep_bwlimit
 
         if bwlimit:
-            return '-l %d' % bwlimit
-        else:
-            return ''
+            opts.append('-l %d' % bwlimit)
+
+        compression = slave_vm.rep_compression_spec
+
+        if compression:
+            opts.append('-C %s' % compression)
+
+        return ' '.join(opts)
 
     def get(self, many=False):
         """Return slave server status and details"""
@@ -1,26 +1,43 @@
 import json
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
 from django.utils.six import iteritems
-from django.db.utils import DatabaseError
 
-from vms.models import Vm, Snapshot, SnapshotDefine
-from que.tasks import cq, get_task_logger
+from vms.models import Vm, Node, Snapshot, SnapshotDefine
+from que import Q_MGMT, TT_AUTO
+from que.tasks import cq, execute, get_task_logger
+from que.lock import TaskLock, KEY_PREFIX as LOCK_KEY_PREFIX
 from que.mgmt import MgmtCallbackTask
 from que.utils import task_id_from_task_id
 from que.exceptions import TaskException
 from api.status import HTTP_423_LOCKED
 from api.decorators import catch_exception
+from api.exceptions import NodeIsNotOperational, VmIsNotOperational, VmIsLocked, TaskIsAlreadyRunning
 from api.utils.request import get_dummy_request
 from api.utils.views import call_api_view
-from api.task.utils import callback, task_log_error, get_task_error_message
+from api.task.utils import callback, mgmt_lock, task_log_error, task_log_success, get_task_error_message
 from api.task.tasks import task_log_cb_success
 from api.task.response import to_string
 from api.vm.messages import LOG_SNAP_CREATE, LOG_SNAPS_DELETE
+from api.vm.snapshot.utils import (VM_STATUS_OPERATIONAL, get_disk_id, check_snap_limit, check_snap_size_limit,
+                                   check_snap_dc_size_limit, is_task_running, sync_status)
+from api.vm.snapshot.vm_snapshot import VmSnapshot
 from api.mon import MonitoringBackend
 
-__all__ = ('vm_snapshot_list_cb', 'vm_snapshot_cb', 'vm_snapshot_beat', 'vm_snapshot_sync_cb')
+__all__ = ('vm_snapshot_list_cb', 'vm_snapshot_cb', 'vm_snapshot_beat', 'vm_snapshot_batch', 'vm_snapshot_batch_cb',
+           'vm_snapshot_sync_cb')
 
 logger = get_task_logger(__name__)
 
+redis = caches['redis'].master_client
+
+KEY_PREFIX = '%s:%s:' % (cache.key_prefix, cache.version)
+SNAPSHOT_BATCH_KEY = KEY_PREFIX + 'vm-snapshot-batch:%s'  # %s = node.uuid
+SNAPSHOT_BATCH_SCHEDULED_KEY = KEY_PREFIX + 'vm-snapshot-batch-scheduled:%s'  # %s = node.uuid
+SNAPSHOT_BATCH_LOCK_TIMEOUT = 86400  # Locks are released by vm_snapshot_batch_cb; this is for a lost callback
+ERIGONES_TASK_USER = cq.conf.ERIGONES_TASK_USER
+
 try:
     t_long = long
 except NameError:
@@ -231,10 +248,20 @@ def vm_snapshot_cb(result, task_id, vm_uuid=None, snap_id=None):
 @cq.task(name='api.vm.snapshot.tasks.vm_snapshot_beat')
 def vm_snapshot_beat(snap_define_id):
     """
-    This is a periodic beat task. Run POST vm_snapshot according to snapshot definition.
+    This is a periodic beat task. Run POST vm_snapshot according to snapshot definition or add the snapshot
+    definition into a batch of automatic snapshots created on one compute node (see vm_snapshot_batch).
     """
     from api.vm.snapshot.views import vm_snapshot
 
+    window = settings.VMS_VM_SNAPSHOT_BATCH_WINDOW
+
+    if window:
+        node_uuid = SnapshotDefine.objects.filter(id=snap_define_id).values_list('vm__node_id', flat=True).get()
+
+        if node_uuid:
+            _vm_snapshot_batch_add(node_uuid, snap_define_id, window)
+            return
+
     snap_define = SnapshotDefine.objects.get(id=snap_define_id)
     snap_name = snap_define.generate_snapshot_name()
     vm = snap_define.vm
@@ -265,6 +292,317 @@ def vm_snapshot_beat(snap_define_id):
                 vm.hostname, disk_id, snap_define.name))
 
 
+def _vm_snapshot_batch_add(node_uuid, snap_define_id, window):
+    """Add snapshot definition into the batch of a compute node. The first definition schedules the batch task"""
+    pipe = redis.pipeline()
+    pipe.rpush(SNAPSHOT_BATCH_KEY % node_uuid, snap_define_id)
+    pipe.set(SNAPSHOT_BATCH_SCHEDULED_KEY % node_uuid, 1, nx=True, ex=int(window * 10))
+    scheduled = pipe.execute()[1]
+
+    if scheduled:
+        vm_snapshot_batch.apply_async(args=(node_uuid,), countdown=window, queue=Q_MGMT, expires=None)
+        logger.info('Scheduled snapshot batch on node %s in %s seconds', node_uuid, window)
+
+
+def _vm_snapshot_batch_lock(lock):
+    """The same task lock as used by snapshot tasks of a VM disk created by vm_snapshot and vm_snapshot_list"""
+    return TaskLock(LOCK_KEY_PREFIX + lock, desc='Task vm_snapshot_batch')
+
+
+def _vm_snapshot_batch_unlock(locks):
+    """Release snapshot task locks acquired by vm_snapshot_batch"""
+    for lock in locks or ():
+        _vm_snapshot_batch_lock(lock).delete(fail_silently=True, delete_reverse=False)
+
+
+def _vm_snapshot_batch_prepare(define, zpools):
+    """Check VM and snapshot limits (like POST vm_snapshot) and create a pending snapshot. Find the oldest snapshots,
+    which should be deleted after the new snapshot is created (retention). Return tuple (snap, old_snaps, line)"""
+    vm = define.vm
+
+    if vm.node.status not in vm.node.STATUS_OPERATIONAL:
+        raise NodeIsNotOperational
+
+    if vm.status not in VM_STATUS_OPERATIONAL:
+        raise VmIsNotOperational
+
+    if is_snapshot_task_running(vm):
+        raise VmIsLocked
+
+    disk_id, real_disk_id, zfs_filesystem = get_disk_id(None, vm, disk_id=define.array_disk_id)
+    check_snap_limit(vm, Snapshot.AUTO, 'snapshot_limit_auto')
+    check_snap_size_limit(vm)  # Issue #chili-848
+    check_snap_dc_size_limit(vm)  # Issue #chili-848
+
+    snap = Snapshot(vm=vm, disk_id=real_disk_id, define=define, name=define.generate_snapshot_name(),
+                    type=Snapshot.AUTO, status=Snapshot.PENDING, zpool=zpools[zfs_filesystem.split('/')[0]])
+    fsfreeze = ''
+
+    if vm.is_hvm() and define.fsfreeze:
+        qga_socket = vm.qga_socket_path
+
+        if qga_socket:
+            snap.fsfreeze = True
+            if vm.status != vm.STOPPED:
+                fsfreeze = qga_socket
+
+    old_snaps = []
+
+    if define.retention:
+        # TODO: check indexes
+        ok_snaps = Snapshot.objects.filter(vm=vm, disk_id=define.disk_id, define=define, status=Snapshot.OK)
+        to_delete = ok_snaps.count() + 1 - define.retention
+
+        if to_delete > 0:
+            old_snaps = list(ok_snaps.order_by('id')[:to_delete])
+
+    # The new snapshot must not stay PENDING if old snapshots cannot be marked for deletion
+    with transaction.atomic():
+        snap.save()
+
+        if old_snaps:
+            Snapshot.objects.filter(id__in=[i.id for i in old_snaps]).update(status=Snapshot.PENDING)
+
+    line = '|'.join(('%s@%s' % (zfs_filesystem, snap.zfs_name), 'es:snapname=%s' % snap.name,
+                     ' '.join('%s@%s' % (zfs_filesystem, i.zfs_name) for i in old_snaps), fsfreeze))
+
+    return snap, old_snaps, line
+
+
+def _vm_snapshot_batch_error(task_id, define, error, status_code=None):
+    """Log and alert failed automatic snapshot (there is no PENDING task)"""
+    vm = define.vm
+    detail = 'snapname=%s, disk_id=%s, type=%s. Error: %s' % (define.name, define.array_disk_id, Snapshot.AUTO, error)
+    task_log_error(task_id_from_task_id(task_id, dc_id=vm.dc_id), LOG_SNAP_CREATE, vm=vm, detail=detail,
+                   update_user_tasks=False)
+
+    if status_code == HTTP_423_LOCKED:
+        logger.warning('Automatic snapshot %s of VM %s was not created: %s', define, vm, error)
+    else:
+        logger.error('Automatic snapshot %s of VM %s was not created: %s', define, vm, error)
+        MonitoringBackend.vm_send_alert(vm, 'Automatic snapshot %s/disk-%s@%s failed to start.' % (
+            vm.hostname, define.array_disk_id, define.name))
+
+
+@cq.task(name='api.vm.snapshot.tasks.vm_snapshot_batch')
+def vm_snapshot_batch(node_uuid):
+    """
+    Create automatic snapshots of all snapshot definitions collected by vm_snapshot_beat for one compute node and
+    delete the oldest snapshots according to retention - all in one esnapshot create-batch job.
+    """
+    task_id = vm_snapshot_batch.request.id
+    pipe = redis.pipeline()  # MULTI/EXEC
+    pipe.lrange(SNAPSHOT_BATCH_KEY % node_uuid, 0, -1)
+    pipe.delete(SNAPSHOT_BATCH_KEY % node_uuid, SNAPSHOT_BATCH_SCHEDULED_KEY % node_uuid)
+    define_ids = set(int(i) for i in pipe.execute()[0])
+
+    if not define_ids:
+        return None
+
+    node = Node.objects.get(uuid=node_uuid)
+    zpools = {ns.zpool: ns for ns in node.nodestorage_set.all()}
+    defines = SnapshotDefine.objects.select_related('vm', 'vm__node').filter(id__in=define_ids, vm__node=node)
+    snaps = []
+    lines = []
+    locks = []
+
+    for define in defines.order_by('id'):
+        # The batch job must not run together with other snapshot tasks of the VM disk (same lock as vm_snapshot)
+        lock = VmSnapshot.LOCK % (define.vm.uuid, define.disk_id)
+
+        if not _vm_snapshot_batch_lock(lock).acquire(task_id, timeout=SNAPSHOT_BATCH_LOCK_TIMEOUT,
+                                                     save_reverse=False):
+            exc = TaskIsAlreadyRunning()
+            _vm_snapshot_batch_error(task_id, define, exc.detail, status_code=exc.status_code)
+            continue
+
+        # noinspection PyBroadException
+        try:
+            snap, old_snaps, line = _vm_snapshot_batch_prepare(define, zpools)
+        except Exception as exc:
+            _vm_snapshot_batch_unlock((lock,))
+            _vm_snapshot_batch_error(task_id, define, getattr(exc, 'detail', exc),
+                                     status_code=getattr(exc, 'status_code', None))
+        else:
+            snaps.append((snap, old_snaps))
+            lines.append(line)
+            locks.append(lock)
+
+    if not snaps:
+        return None
+
+    cb_snaps = [(snap.id, [i.id for i in old_snaps]) for snap, old_snaps in snaps]
+    tid, err = execute(ERIGONES_TASK_USER, None, 'esnapshot create-batch', stdin='\n'.join(lines) + '\n',
+                       callback=('api.vm.snapshot.tasks.vm_snapshot_batch_cb', {'node_uuid': node.uuid,
+                                                                                'snaps': cb_snaps, 'locks': locks}),
+                       queue=node.fast_queue, tt=TT_AUTO, nolog=True, ping_worker=False, check_user_tasks=False)
+
+    if err:
+        logger.error('Got error (%s) when running task execute[%s]("esnapshot create-batch") on %s',
+                     err, tid, node.hostname)
+        _vm_snapshot_batch_unlock(locks)
+
+        for snap, old_snaps in snaps:
+            snap.delete()
+            Snapshot.objects.filter(id__in=[i.id for i in old_snaps]).update(status=Snapshot.OK)
+            _vm_snapshot_batch_error(task_id, snap.define, err)
+    else:
+        logger.info('Created snapshot batch task %s for %d snapshots on node %s', tid, len(snaps), node.hostname)
+
+    return tid
+
+
+def _parse_snapshot_batch_output(stdout):
+    """Parse output from esnapshot create-batch. Return dict {(action, zfs_snapshot): (returncode, message)}"""
+    output = {}
+
+    for line in stdout.splitlines():
+        i = line.split('\t', 3)
+
+        if len(i) < 3:
+            continue
+
+        try:
+            output[(i[0], i[1])] = (int(i[2]), i[3].strip() if len(i) > 3 else '')
+        except ValueError:
+            continue
+
+    return output
+
+
+def _vm_snapshot_batch_result(task_id, snap, old_snaps, output):
+    """Update snapshot status according to esnapshot create-batch output and log the result per VM"""
+    vm = snap.vm
+    disk_id = snap.array_disk_id
+    zfs_filesystem = snap.zfs_filesystem
+    tid = task_id_from_task_id(task_id, dc_id=vm.dc_id)
+    rc, msg = output.get(('create', '%s@%s' % (zfs_filesystem, snap.zfs_name)), (None, 'Missing output'))
+    detail = 'snapname=%s, disk_id=%s, type=%s, fsfreeze=%s' % (snap.name, disk_id, snap.type,
+                                                                str(snap.fsfreeze).lower())
+
+    if rc != 0:
+        snap.delete()
+        Snapshot.objects.filter(id__in=[i.id for i in old_snaps]).update(status=Snapshot.OK)
+        task_log_error(tid, LOG_SNAP_CREATE, vm=vm, detail='%s, rc=%s. Error: %s' % (detail, rc, msg),
+                       update_user_tasks=False)
+        MonitoringBackend.vm_send_alert(vm, 'Automatic snapshot %s of server %s@disk-%s could not be created.' % (
+            snap.name, vm.hostname, disk_id))
+        return
+
+    snap.status = Snapshot.OK
+
+    if snap.fsfreeze and 'freeze failed' in msg:
+        snap.fsfreeze = False
+        detail += ' (filesystem freeze failed)'
+        MonitoringBackend.vm_send_alert(vm, 'Snapshot %s of server %s@disk-%s was created, but filesystem freeze '
+                                            'failed.' % (snap.name, vm.hostname, disk_id),
+                                        priority=MonitoringBackend.WARNING)
+
+    snap.save(update_fields=('status', 'fsfreeze'))
+    task_log_success(tid, LOG_SNAP_CREATE, vm=vm, detail=detail, update_user_tasks=False)
+
+    if not old_snaps:
+        return
+
+    deleted = []
+    failed = []
+
+    for old_snap in old_snaps:
+        if output.get(('destroy', '%s@%s' % (zfs_filesystem, old_snap.zfs_name)), (None,))[0] == 0:
+            deleted.append(old_snap)
+        else:
+            failed.append(old_snap)
+
+    if deleted:
+        Snapshot.objects.filter(id__in=[i.id for i in deleted]).delete()
+        task_log_success(tid, LOG_SNAPS_DELETE, vm=vm, update_user_tasks=False,
+                         detail='snapnames=%s, disk_id=%s' % (','.join(i.name for i in deleted), disk_id))
+
+    if failed:
+        Snapshot.objects.filter(id__in=[i.id for i in failed]).update(status=Snapshot.OK)
+        task_log_error(tid, LOG_SNAPS_DELETE, vm=vm, update_user_tasks=False,
+                       detail='snapnames=%s, disk_id=%s' % (','.join(i.name for i in failed), disk_id))
+        MonitoringBackend.vm_send_alert(vm, 'Automatic deletion of old snapshots %s/disk-%s failed.' % (
+            vm.hostname, disk_id))
+
+
+def _vm_snapshot_batch_revert(task_id, snap_ids, error):
+    """Remove pending snapshots and revert status of old snapshots marked for deletion after a failed batch"""
+    for snap in Snapshot.objects.select_related('vm').filter(id__in=snap_ids, status=Snapshot.PENDING):
+        vm = snap.vm
+        snap.delete()
+        task_log_error(task_id_from_task_id(task_id, dc_id=vm.dc_id), LOG_SNAP_CREATE, vm=vm, update_user_tasks=False,
+                       detail='snapname=%s, disk_id=%s, type=%s. Error: %s' % (snap.name, snap.array_disk_id,
+                                                                               snap.type, error))
+        MonitoringBackend.vm_send_alert(vm, 'Automatic snapshot %s of server %s@disk-%s could not be created.' % (
+            snap.name, vm.hostname, snap.array_disk_id))
+
+
+# noinspection PyUnusedLocal
+def _vm_snapshot_batch_cb_failed(result, task_id, node_uuid=None, snaps=None, locks=None, task_exception=None,
+                                 **kwargs):
+    """Callback helper for failed task - revert statuses of snapshots, which were not processed"""
+    Snapshot.objects.filter(id__in=[old_snap_id for _, old_snap_ids in snaps for old_snap_id in old_snap_ids],
+                            status=Snapshot.PENDING).update(status=Snapshot.OK)
+    _vm_snapshot_batch_revert(task_id, [snap_id for snap_id, _ in snaps], task_exception)
+    _vm_snapshot_batch_unlock(locks)
+
+
+@mgmt_lock(timeout=300, key_args=(1,), wait_for_release=True, base_name='vm_snapshot_batch_cb')
+def _vm_snapshot_batch_vm_cb(task_id, vm_uuid, snaps, output):
+    """Update snapshots of one VM according to esnapshot create-batch output. Snapshots are loaded inside the
+    per-VM lock and only pending snapshots are processed (the callback task may be retried)"""
+    snap_ids = [snap_id for snap_id, _ in snaps]
+    snap_ids.extend(old_snap_id for _, old_snap_ids in snaps for old_snap_id in old_snap_ids)
+    pending_snaps = Snapshot.objects.select_related('vm', 'vm__dc', 'define').filter(status=Snapshot.PENDING)
+    snap_objects = pending_snaps.in_bulk(snap_ids)
+
+    for snap_id, old_snap_ids in snaps:
+        try:
+            snap = snap_objects[snap_id]
+        except KeyError:
+            logger.warning('Pending snapshot %s of VM %s from task %s does not exist', snap_id, vm_uuid, task_id)
+            continue
+
+        old_snaps = [snap_objects[i] for i in old_snap_ids if i in snap_objects]
+        _vm_snapshot_batch_result(task_id, snap, old_snaps, output)
+
+    return True
+
+
+@cq.task(name='api.vm.snapshot.tasks.vm_snapshot_batch_cb', base=MgmtCallbackTask, bind=True)
+@callback(log_exception=False, update_user_tasks=False, error_fun=_vm_snapshot_batch_cb_failed)
+def vm_snapshot_batch_cb(result, task_id, node_uuid=None, snaps=None, locks=None):
+    """
+    A callback function for api.vm.snapshot.tasks.vm_snapshot_batch.
+    Releases the snapshot task locks of all VM disks in the batch.
+    """
+    output = _parse_snapshot_batch_output(result.get('stdout', ''))
+
+    if result.get('returncode') != 0:
+        logger.warn('Found nonzero returncode for task %s(%s): %s', 'vm_snapshot_batch', node_uuid,
+                    result.get('stderr', ''))
+
+    snap_vms = dict(Snapshot.objects.filter(id__in=[snap_id for snap_id, _ in snaps]).values_list('id', 'vm_id'))
+    vm_snaps = {}
+
+    for snap_id, old_snap_ids in snaps:
+        try:
+            vm_snaps.setdefault(snap_vms[snap_id], []).append((snap_id, old_snap_ids))
+        except KeyError:
+            logger.error('Snapshot %s from task %s(%s) does not exist', snap_id, 'vm_snapshot_batch', node_uuid)
+
+    for vm_uuid, vm_snap_ids in iteritems(vm_snaps):
+        if not _vm_snapshot_batch_vm_cb(task_id, vm_uuid, vm_snap_ids, output):
+            logger.error('Could not process snapshots of VM %s from task %s(%s)', vm_uuid, 'vm_snapshot_batch',
+                         node_uuid)
+            _vm_snapshot_batch_cb_failed(result, task_id, snaps=vm_snap_ids, task_exception='VM is locked')
+
+    _vm_snapshot_batch_unlock(locks)
+
+    return result
+
+
 def _parse_snapshot_list_line(line):
     line = line.split()
     return line[0].strip().split('@', 1)[1], line[1:]
@@ -277,60 +615,14 @@ def parse_node_snaps(data):
 
 def is_snapshot_task_running(vm):
     """Return True if a PUT/POST/DELETE snapshot task is running for a VM"""
-    snap_tasks = vm.get_tasks(match_dict={'view': 'vm_snapshot'})
-    snap_tasks.update(vm.get_tasks(match_dict={'view': 'vm_snapshot_list'}))
-
-    return any(t.get('method', '').upper() in ('POST', 'PUT', 'DELETE') for t in snap_tasks.values())
+    return is_task_running(vm, ('vm_snapshot', 'vm_snapshot_list'))
 
 
 def sync_snapshots(db_snaps, node_snaps):
     """Sync snapshot DB status and size with real information from compute node.
     Used by PUT vm_snapshot_list and PUT node_vm_snapshot_list."""
-    lost = 0
-
-    for snap in db_snaps:
-        snap_zfs_name = snap.zfs_name
-
-        try:
-            if snap_zfs_name in node_snaps:
-                if snap.status == snap.LOST:
-                    logger.warn('Snapshot %s (ID %s) found, changing status to OK', snap, snap.id)
-                    snap.status = snap.OK
-                    snap.size = t_long(node_snaps[snap_zfs_name][1])
-                    snap.save(update_fields=('status', 'status_change', 'size'), force_update=True)
-                else:
-                    logger.debug('Snapshot %s (ID %s) is OK', snap, snap.id)
-                    snap_size = t_long(node_snaps[snap_zfs_name][1])
-                    if snap.size != snap_size:
-                        snap.size = snap_size
-                        snap.save(update_fields=('size',), force_update=True)
-                    if snap.locked:  # PENDING or ROLLBACK status
-                        logger.warn('Snapshot %s (ID %s) is OK on compute node, but in %s status since %s',
-                                    snap, snap.id, snap.get_status_display(), snap.status_change)
-                        if is_snapshot_task_running(snap.vm):
-                            logger.warn('Ignoring snapshot %s (ID %s) because a snapshot task is running for VM %s',
-                                        snap, snap.id, snap.vm)
-                        else:
-                            logger.warn('Changing snapshot %s (ID %s) status to OK', snap, snap.id)
-                            snap.status = snap.OK
-                            snap.save(update_fields=('status', 'status_change'), force_update=True)
-            else:
-                logger.warn('Snapshot %s (ID %s) does not exist on compute node', snap, snap.id)
-                if is_snapshot_task_running(snap.vm):
-                    logger.warn('Ignoring snapshot %s (ID %s) because a snapshot task is running for VM %s',
-                                snap, snap.id, snap.vm)
-                    continue
-                if snap.status != snap.LOST:
-                    snap.status = snap.LOST
-                    snap.save(update_fields=('status', 'status_change', 'size'), force_update=True)
-                    lost += 1
-                continue
-        except DatabaseError:
-            logger.warn('Snapshot %s (ID %s) could not be updated (maybe it vanished)', snap, snap.id)
-
-        node_snaps.pop(snap_zfs_name, None)
-
-    return lost
+    return sync_status(Snapshot, db_snaps, node_snaps, lambda snap: snap.zfs_name, lambda snap: snap.vm,
+                       is_snapshot_task_running)
 
 
 @cq.task(name='api.vm.snapshot.tasks.vm_snapshot_sync_cb', base=MgmtCallbackTask, bind=True)
@@ -1,8 +1,20 @@
-from api.exceptions import ObjectNotFound, InvalidInput, VmIsNotOperational
+from django.db.models import BigIntegerField, Case, Value, When
+from django.db.utils import DatabaseError
+from django.utils import timezone
+
+from que.tasks import get_task_logger
+from api.exceptions import ObjectNotFound, InvalidInput, VmIsNotOperational, ExpectationFailed
 from vms.models import Vm, Snapshot
 
+logger = get_task_logger(__name__)
+
+try:
+    t_long = long
+except NameError:
+    t_long = int
 
 VM_STATUS_OPERATIONAL = frozenset([Vm.RUNNING, Vm.STOPPED, Vm.STOPPING])
+SYNC_UPDATE_BATCH_SIZE = 500
 
 
 def is_vm_operational(fun):
@@ -14,6 +26,40 @@ def is_vm_operational(fun):
     return wrap
 
 
+def check_snap_limit(vm, snaptype, limit_key):
+    """Raise ExpectationFailed if the VM snapshot count limit (snapshot_limit_auto/manual) is reached"""
+    try:
+        limit = int(vm.json_active['internal_metadata'][limit_key])
+    except (TypeError, KeyError, IndexError):
+        pass
+    else:
+        # TODO: check indexes
+        total = Snapshot.objects.filter(vm=vm, type=snaptype).count()
+        if total >= limit:
+            raise ExpectationFailed('VM snapshot limit reached')
+
+
+def check_snap_size_limit(vm):
+    """Issue #chili-848"""
+    limit = vm.snapshot_size_quota_value
+    if limit is not None:
+        total = Snapshot.get_total_vm_size(vm)
+        if total >= limit:
+            raise ExpectationFailed('VM snapshot size limit reached')
+
+
+def check_snap_dc_size_limit(vm):
+    """Issue #chili-848"""
+    limit = vm.dc.settings.VMS_VM_SNAPSHOT_DC_SIZE_LIMIT
+
+    if limit is not None:
+        limit = int(limit)
+        total = Snapshot.get_total_dc_size(vm.dc)
+
+        if total >= limit:
+            raise ExpectationFailed('DC snapshot size limit reached')
+
+
 def detail_dict(name, ser, data=None):
     """Return detail dict suitable for logging in response"""
     if data is None:
@@ -136,3 +182,91 @@ def snap_callback(vm, snap):
     """Return callback tuple for executing snapshot commands"""
     # noinspection PyRedundantParentheses
     return ('api.vm.snapshot.tasks.vm_snapshot_cb', {'vm_uuid': vm.uuid, 'snap_id': snap.pk})
+
+
+def is_task_running(obj, views):
+    """Return True if a PUT/POST/DELETE task of one of the api views is running for a VM or node"""
+    return any(t.get('view', None) in views and t.get('method', '').upper() in ('POST', 'PUT', 'DELETE')
+               for t in obj.get_tasks().values())
+
+
+def _sync_bulk_update(model, status_updates, size_updates):
+    """Save status and size changes computed by sync_status() with a few bulk UPDATE queries"""
+    now = timezone.now()
+    qs = model.objects.all()
+    batch = SYNC_UPDATE_BATCH_SIZE
+
+    for status, pks in status_updates.items():
+        for i in range(0, len(pks), batch):
+            qs.filter(pk__in=pks[i:i + batch]).update(status=status, status_change=now)
+
+    sizes = list(size_updates.items())
+
+    for i in range(0, len(sizes), batch):
+        chunk = sizes[i:i + batch]
+        qs.filter(pk__in=[pk for pk, _ in chunk]).update(size=Case(*[When(pk=pk, then=Value(size))
+                                                                     for pk, size in chunk],
+                                                                   output_field=BigIntegerField()))
+
+
+def sync_status(model, objects, node_snaps, get_snap_name, get_task_obj, task_running, update_size=True):
+    """Reconcile DB status (and size) of snapshots or dataset backups with the list of snapshots found on a compute
+    node (node_snaps; found snapshots are removed from it). Changes are computed in memory and saved by bulk
+    updates; running tasks are checked only once per VM (or node). Return number of lost objects."""
+    name = model.__name__
+    running = {}
+    status_updates = {}  # {new status: [pk, ...]}
+    size_updates = {}  # {pk: size}
+    lost = 0
+
+    def is_running(o):
+        task_obj = get_task_obj(o)
+        key = (task_obj.__class__, task_obj.pk)
+
+        if key not in running:
+            running[key] = task_running(task_obj)
+
+        if running[key]:
+            logger.warn('Ignoring %s %s (ID %s) because a task is running for %s', name, o, o.id, task_obj)
+
+        return running[key]
+
+    for obj in objects:
+        node_snap = node_snaps.pop(get_snap_name(obj), None)
+
+        if node_snap is None:
+            if obj.status != model.LOST:
+                logger.warn('%s %s (ID %s) does not exist on compute node', name, obj, obj.id)
+
+                if not is_running(obj):
+                    status_updates.setdefault(model.LOST, []).append(obj.pk)
+                    lost += 1
+            continue
+
+        size = t_long(node_snap[1])
+
+        if obj.status == model.LOST:
+            logger.warn('%s %s (ID %s) found, changing status to OK', name, obj, obj.id)
+            status_updates.setdefault(model.OK, []).append(obj.pk)
+
+            if obj.size != size:
+                size_updates[obj.pk] = size
+            continue
+
+        if update_size and obj.size != size:
+            size_updates[obj.pk] = size
+
+        if obj.locked:  # PENDING or ROLLBACK status
+            logger.warn('%s %s (ID %s) is OK on compute node, but in %s status since %s',
+                        name, obj, obj.id, obj.get_status_display(), obj.status_change)
+
+            if not is_running(obj):
+                logger.warn('Changing %s %s (ID %s) status to OK', name, obj, obj.id)
+                status_updates.setdefault(model.OK, []).append(obj.pk)
+
+    try:
+        _sync_bulk_update(model, status_updates, size_updates)
+    except DatabaseError as exc:
+        logger.error('%s objects could not be updated: %s', name, exc)
+
+    return lost
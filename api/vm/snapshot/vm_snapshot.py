@@ -9,7 +9,8 @@ from api.task.response import SuccessTaskResponse, TaskResponse, FailureTaskResp
 from api.vm.utils import get_vm
 from api.vm.messages import LOG_SNAP_CREATE, LOG_SNAP_UPDATE, LOG_SNAP_DELETE
 from api.vm.snapshot.serializers import SnapshotSerializer, SnapshotRestoreSerializer
-from api.vm.snapshot.utils import get_disk_id, snap_meta, snap_callback
+from api.vm.snapshot.utils import (get_disk_id, snap_meta, snap_callback, check_snap_limit, check_snap_size_limit,
+                                   check_snap_dc_size_limit)
 
 
 class VmSnapshot(APIView):
@@ -46,34 +47,15 @@ class VmSnapshot(APIView):
             raise ExpectationFailed('VM snapshot status is not OK')
 
     def _check_snap_limit(self):
-        try:
-            limit = int(self.vm.json_active['internal_metadata'][self.limit_key])
-        except (TypeError, KeyError, IndexError):
-            pass
-        else:
-            # TODO: check indexes
-            total = Snapshot.objects.filter(vm=self.vm, type=self.snaptype).count()
-            if total >= limit:
-                raise ExpectationFailed('VM snapshot limit reached')
+        check_snap_limit(self.vm, self.snaptype, self.limit_key)
 
     def _check_snap_size_limit(self):
         """Issue #chili-848"""
-        limit = self.vm.snapshot_size_quota_value
-        if limit is not None:
-            total = Snapshot.get_total_vm_size(self.vm)
-            if total >= limit:
-                raise ExpectationFailed('VM snapshot size limit reached')
+        check_snap_size_limit(self.vm)
 
     def _check_snap_dc_size_limit(self):
         """Issue #chili-848"""
-        limit = self.vm.dc.settings.VMS_VM_SNAPSHOT_DC_SIZE_LIMIT
-
-        if limit is not None:
-            limit = int(limit)
-            total = Snapshot.get_total_dc_size(self.vm.dc)
-
-            if total >= limit:
-                raise ExpectationFailed('DC snapshot size limit reached')
+        check_snap_dc_size_limit(self.vm)
 
     def _get_apiview_detail(self):
         apiview = {'view': 'vm_snapshot', 'method': self.request.method,
@@ -28,6 +28,7 @@ from vms.signals import (vm_running, vm_stopped, vm_json_active_changed,
 __all__ = (
     'vm_status_all_cb',
     'vm_status_event_cb',
+    'vm_status_event_batch_cb',
     'vm_status_current_cb',
     'vm_status_cb',
     'vm_uptime_all',
@@ -68,6 +69,13 @@ def _parse_timestamp(exit_or_boot_timestamp):
         return None
 
 
+def _parse_event_time(when):
+    """
+    Convert sysevent timestamp (when) to datetime object.
+    """
+    return datetime.utcfromtimestamp(float(when) / pow(10, int(log10(when)) - 9)).replace(tzinfo=utc)
+
+
 # noinspection PyUnusedLocal
 def vm_status_all(task_id, node, **kwargs):
     """
@@ -191,6 +199,7 @@ def _vm_status_check(task_id, node_uuid, uuid, state, state_cache=None, vm=None,
     """Helper function for checking VM's new/actual state used by following callbacks:
         - vm_status_all_cb
         - vm_status_event_cb
+        - vm_status_event_batch_cb
         - vm_status_current_cb
     """
     if state_cache is None:
@@ -378,10 +387,36 @@ def vm_status_event_cb(result, task_id):
     vm_uuid = result['zonename']
     state_cache = cache.get(Vm.status_key(vm_uuid))
     state = Vm.STATUS_DICT[result['state']]
-    when = result['when']
-    change_time = datetime.utcfromtimestamp(float(when) / pow(10, int(log10(when)) - 9)).replace(tzinfo=utc)
     # Check and eventually save VM's status
-    _vm_status_check(task_id, result['node_uuid'], vm_uuid, state, state_cache=state_cache, change_time=change_time)
+    _vm_status_check(task_id, result['node_uuid'], vm_uuid, state, state_cache=state_cache,
+                     change_time=_parse_event_time(result['when']))
+
+
+@cq.task(name='api.vm.status.tasks.vm_status_event_batch_cb', base=InternalTask, ignore_result=True)
+def vm_status_event_batch_cb(results, task_id):
+    """
+    Callback task run by erigonesd-vmon service after detecting status changes of multiple VMs in a short time window.
+    Cached VM states are read in one redis pipeline (like in vm_status_all_cb). VM objects are loaded from DB by
+    _vm_status_check() inside the per-VM lock and only if the status has changed.
+    """
+    r_states = redis.pipeline()
+
+    for result in results:
+        r_states.get(KEY_PREFIX + Vm.status_key(result['zonename']))
+
+    vm_states = r_states.execute()
+
+    for i, result in enumerate(results):
+        # One failed status event must not drop status updates of other VMs in the batch
+        # noinspection PyBroadException
+        try:
+            # Check and eventually save VM's status
+            _vm_status_check(task_id, result['node_uuid'], result['zonename'], Vm.STATUS_DICT[result['state']],
+                             state_cache=vm_states[i], change_time=_parse_event_time(result['when']))
+        except Exception as exc:
+            logger.exception(exc)
+            logger.error('Could not process status event of VM %s from task %s: %s', result.get('zonename'),
+                         task_id, result)
 
 
 @cq.task(name='api.vm.status.tasks.vm_status_current_cb', base=MgmtCallbackTask, bind=True)
@@ -6,6 +6,7 @@ from . import PY3
 
 RE_ASCII = re.compile(r'^[a-zA-Z0-9:_.-]+$')
 RE_UUID = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
+RE_COMPRESSION = re.compile(r'^(gzip|bzip2|xz|zstd)(:(\d+|null)(:(\d+|null))?)?$')
 
 
 if PY3:
@@ -38,6 +39,14 @@ def t_uuid(value):
     raise ArgumentTypeError('Invalid uuid: "%s"' % value)
 
 
+def t_compression(value):
+    """Compression validator (algorithm[:level[:threads]])"""
+    if RE_COMPRESSION.match(value):
+        return value
+
+    raise ArgumentTypeError('Invalid compression: "%s"' % value)
+
+
 def t_file(value):
     fp = filter(None, value.split('/'))
 
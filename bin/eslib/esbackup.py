@@ -1,13 +1,46 @@
-from hashlib import sha1
 from collections import defaultdict, namedtuple
+from functools import partial
+from subprocess import PIPE
+from tempfile import TemporaryFile
+from psutil import Popen
+import errno
+import hashlib
 import os
 import json
+import signal
 
 from . import ESLIB
 from .cmd import CmdError, cmd_output, get_timestamp
 from .zfs import ZFSCmd, get_snap_name, get_snap_dataset, build_snapshot, switch_snap_dataset
 from .cmd_args import long_int
 
+# BLAKE2 is available only in newer Python versions
+CHECKSUM_ALGORITHMS = tuple(i for i in ('sha1', 'sha256', 'sha512', 'blake2b') if hasattr(hashlib, i))
+CHECKSUM_DEFAULT = 'sha1'
+
+
+def get_hasher(algorithm):
+    if algorithm not in CHECKSUM_ALGORITHMS:
+        raise CmdError(Backup.ERR_FILE_CHECK, 'Unsupported checksum algorithm: %s' % algorithm)
+
+    return getattr(hashlib, algorithm)()
+
+
+def format_checksum(algorithm, hexdigest):
+    """SHA-1 checksums are stored without the algorithm prefix (compatible with older backups)"""
+    if algorithm == CHECKSUM_DEFAULT:
+        return hexdigest
+
+    return '%s:%s' % (algorithm, hexdigest)
+
+
+def parse_checksum(checksum):
+    """Return tuple (algorithm, hexdigest)"""
+    if ':' in checksum:
+        return tuple(checksum.split(':', 1))
+
+    return CHECKSUM_DEFAULT, checksum
+
 
 class Backup(ZFSCmd):
     """
@@ -44,7 +77,11 @@ class Backup(ZFSCmd):
 
     # Init flags
     compression = None
+    compression_level = None
+    compression_threads = None  # 0 = one thread per CPU
     limit = None
+    checksum_algorithm = CHECKSUM_DEFAULT
+    buffer_size = 1048576  # Block size used for reading and writing backup files
 
     @classmethod
     def _new_dataset_archive(cls, dataset):
@@ -60,22 +97,6 @@ class Backup(ZFSCmd):
     # File backup methods
     #
 
-    @staticmethod
-    def _get_file_checksum(filename, blocksize=65536):
-        with open(filename, 'rb') as f:
-            hasher = sha1()
-            buf = f.read(blocksize)
-
-            while len(buf) > 0:
-                hasher.update(buf)
-                buf = f.read(blocksize)
-
-        return hasher.hexdigest()
-
-    @staticmethod
-    def _get_file_size(filename):
-        return os.path.getsize(filename)
-
     @staticmethod
     def _delete_file(filename):
         return os.remove(filename)
@@ -102,27 +123,115 @@ class Backup(ZFSCmd):
         if not os.path.isdir(directory):
             raise CmdError(cls.ERR_FILE_CHECK, 'Backup directory is not available')
 
+    def _popen_local(self, cmd, stdin=None, stdout=None):
+        cmd = self.CMD + cmd
+        self.log('Running command: %s' % ' '.join(cmd))
+
+        stderr = TemporaryFile()
+
+        try:
+            return Popen(cmd, close_fds=True, stdin=stdin, stdout=stdout, stderr=stderr, preexec_fn=os.setsid), stderr
+        except Exception:
+            stderr.close()
+            raise
+
+    def _wait_stream(self, proc, stderr, terminate=False):
+        """Wait for a process started by _popen_local() and raise CmdError with its stderr output if it failed"""
+        try:
+            if terminate and proc.poll() is None:
+                try:
+                    os.killpg(proc.pid, signal.SIGTERM)
+                except OSError:
+                    pass
+
+            rc = proc.wait()
+            self.log('Return code: %d' % rc)
+
+            if rc != 0 and not terminate:
+                stderr.seek(0)
+                raise CmdError(rc, stderr.read().strip())
+        finally:
+            stderr.close()
+
+    def _get_compression(self):
+        """Return compression specification used by pack() in functions.sh"""
+        if not self.compression:
+            return 'null'
+
+        return '%s:%s:%s' % (self.compression, 'null' if self.compression_level is None else self.compression_level,
+                             'null' if self.compression_threads is None else self.compression_threads)
+
     def _backup_to_file(self, dataset, filename, fsfreeze=None):
-        compression = self.compression or 'null'
+        """Store the zfs send stream into a file. Return tuple (size, checksum) calculated while writing the file"""
+        compression = self._get_compression()
         limit = self.limit or 'null'
+        hasher = get_hasher(self.checksum_algorithm)
+        size = 0
 
         if self.host:
-            cmd = ['zfs_file_backup_remote', dataset, filename, self.host, compression, limit]
+            cmd = ('zfs_file_backup_remote', dataset, self.host, compression, limit)
         else:
-            cmd = ['zfs_file_backup_local', dataset, filename, compression, limit]
+            cmd = ('zfs_file_backup_local', dataset, compression, limit)
 
         if fsfreeze:
-            cmd.append(fsfreeze)
+            cmd += (fsfreeze,)
 
-        return self._run_cmd(*cmd)
+        proc, stderr = self._popen_local(cmd, stdout=PIPE)
+        terminate = True
+
+        try:
+            with open(filename, 'wb') as f:
+                for buf in iter(partial(proc.stdout.read, int(self.buffer_size)), b''):
+                    hasher.update(buf)
+                    f.write(buf)
+                    size += len(buf)
+
+            terminate = False
+        finally:
+            self._wait_stream(proc, stderr, terminate=terminate)
+
+        return size, format_checksum(self.checksum_algorithm, hasher.hexdigest())
+
+    def _restore_file(self, filename, dataset, checksum):
+        """Stream the backup file into zfs recv and verify the checksum on the fly. The last block is held back
+        until the checksum is known, so zfs recv receives an incomplete stream (and fails) on checksum mismatch"""
+        algorithm, expected = parse_checksum(checksum)
+        hasher = get_hasher(algorithm)
 
-    def _restore_file(self, filename, dataset):
         if self.host:
-            cmd = ['zfs_file_restore_remote', filename, dataset, self.host]
+            cmd = ('zfs_file_restore_remote', filename, dataset, self.host)
         else:
-            cmd = ['zfs_file_restore_local', filename, dataset]
+            cmd = ('zfs_file_restore_local', filename, dataset)
 
-        return self._run_cmd(*cmd, remote=False)
+        proc, stderr = self._popen_local(cmd, stdin=PIPE)
+        terminate = True
+
+        try:
+            with open(filename, 'rb') as f:
+                read = partial(f.read, int(self.buffer_size))
+                buf = read()
+
+                try:
+                    for next_buf in iter(read, b''):
+                        hasher.update(buf)
+                        proc.stdin.write(buf)
+                        buf = next_buf
+
+                    hasher.update(buf)
+
+                    if hasher.hexdigest() != expected:
+                        raise CmdError(self.ERR_FILE_CHECK, 'Checksum mismatch')
+
+                    proc.stdin.write(buf)
+                    proc.stdin.close()
+                except IOError as e:
+                    if e.errno != errno.EPIPE:
+                        raise
+                    # zfs recv failed -> the error is raised below
+
+            terminate = False
+        finally:
+            self._wait_stream(proc, stderr, terminate=terminate)
 
     #
     # Dataset backup methods
@@ -464,9 +573,7 @@ class Backup(ZFSCmd):
             self._store_json_metadata_to_file(metadata, json)
 
         try:
-            self._backup_to_file(source, filename, fsfreeze=fsfreeze)
-            size = self._get_file_size(filename)
-            checksum = self._get_file_checksum(filename)
+            size, checksum = self._backup_to_file(source, filename, fsfreeze=fsfreeze)
         except Exception:
             self._delete_file_silent(filename)
             if self.metadata_file:
@@ -505,14 +612,11 @@ class Backup(ZFSCmd):
     def file_restore(self, destination, filename, checksum):
         self._check_file(filename)
         self._check_host()
-
-        if checksum != self._get_file_checksum(filename):
-            raise CmdError(self.ERR_FILE_CHECK, 'Checksum mismatch')
-
+        get_hasher(parse_checksum(checksum)[0])  # Fail early if the checksum algorithm is not supported
         dest_backup = self._backup_and_create_empty_dataset(destination, remote=True)
 
         try:
-            self._restore_file(filename, destination)  # Send/recv
+            self._restore_file(filename, destination, checksum)  # Send/recv + checksum verification
             # Get all child datasets back to dest
             self._rename_dataset_children(dest_backup, destination, set_zoned=self.filesystem, remote=True)
         except CmdError:
@@ -21,6 +21,7 @@ SELF="${ERIGONES_HOME}/bin/eslib/esbackup.sh"
 
 # shellcheck disable=SC2034
 declare -ri OK=0
+# shellcheck disable=SC2034
 declare -ri ERR_INPUT=1
 declare -ri ERR_SNAPSHOT=2
 
@@ -29,52 +30,11 @@ declare -ri ERR_SNAPSHOT=2
 # helper functions
 ###############################################################
 
-_pack() {
-	local algorithm="$1"
-	local compressor
-
-	case "${algorithm}" in
-		gzip|gz)
-			compressor="${GZIP} -c"
-			;;
-		bzip2|bz2)
-			compressor="${BZIP2} -c"
-			;;
-		xz)
-			compressor="${XZ} -9 -c"
-			;;
-		*)
-			die ${ERR_INPUT} "Unsupported compression algorithm: ${algorithm}"
-			;;
-	esac
-
-	${compressor}
-}
-
 _unpack() {
 	local filename="$1"
-	local algorithm="${filename##*.}"
-	local uncompress
-
-	case "${algorithm}" in
-		gz)
-			uncompress="${GZIP} -dc"
-			;;
-		bz2)
-			uncompress="${BZIP2} -dc"
-			;;
-		xz)
-			uncompress="${XZ} -dc"
-			;;
-		zfs)
-			uncompress="${CAT}"
-			;;
-		*)
-			die ${ERR_INPUT} "Unsupported compression algorithm: ${algorithm}"
-			;;
-		esac
-
-		${uncompress} "${filename}"
+	local source="${2:-${filename}}"  # "-" = read from stdin
+
+	unpack "${filename##*.}" "${source}"
 }
 
 
@@ -169,12 +129,11 @@ _zfs_file_backup_send() {  # Used by zfs_file_backup_remote()
 	_zfs_send "${snapshot}"
 }
 
-zfs_file_backup_local() {
+zfs_file_backup_local() {  # The stream is written to stdout (esbackup writes it into a file)
 	local dataset="$1"
-	local file="$2"
-	local compression="${3:-"null"}"
-	local limit="${4:-"null"}"
-	local fsfreeze="${5:-}"
+	local compression="${2:-"null"}"
+	local limit="${3:-"null"}"
+	local fsfreeze="${4:-}"
 	local snapshot
 	snapshot="$(_zfs_file_backup_snapshot "${dataset}")"
 
@@ -185,42 +144,41 @@ zfs_file_backup_local() {
 	trap "_zfs_destroy ${snapshot}" EXIT
 
 	if [[ "${compression}" == "null" ]]; then
-		_zfs_send "${snapshot}" | run_mbuffer -f -o "${file}"
+		_zfs_send "${snapshot}" | run_mbuffer
 	else
-		_zfs_send "${snapshot}" | _pack "${compression}" | run_mbuffer -f -o "${file}"
+		_zfs_send "${snapshot}" | pack "${compression}" | run_mbuffer
 	fi
 }
 
-zfs_file_backup_remote() {
+zfs_file_backup_remote() {  # The stream is written to stdout (esbackup writes it into a file)
 	local dataset="$1"
-	local file="$2"
-	local host="$3"
-	local compression="${4:-"null"}"
-	local limit="${5:-"null"}"
-	local fsfreeze="${6:-}"
+	local host="$2"
+	local compression="${3:-"null"}"
+	local limit="${4:-"null"}"
+	local fsfreeze="${5:-}"
 
 	[[ "${limit}" != "null" ]] && MBUFFER_ARGS+="-r ${limit} "
 
 	if [[ "${compression}" == "null" ]]; then
-		run_ssh "root@${host}" "${SELF} _zfs_file_backup_send ${dataset} ${fsfreeze}" | run_mbuffer -f -o "${file}"
+		run_ssh "root@${host}" "${SELF} _zfs_file_backup_send ${dataset} ${fsfreeze}" | run_mbuffer
 	else
-		run_ssh "root@${host}" "${SELF} _zfs_file_backup_send ${dataset} ${fsfreeze}" | _pack "${compression}" | run_mbuffer -f -o "${file}"
+		run_ssh "root@${host}" "${SELF} _zfs_file_backup_send ${dataset} ${fsfreeze}" | pack "${compression}" | run_mbuffer
 	fi
 }
 
-zfs_file_restore_local() {
+zfs_file_restore_local() {  # The file is read from stdin (esbackup verifies its checksum)
 	local file="$1"
 	local dataset="$2"
 
-	_unpack "${file}" | _zfs_recv "${dataset}" "true"
+	_unpack "${file}" - | _zfs_recv "${dataset}" "true"
 }
 
-zfs_file_restore_remote() {
+zfs_file_restore_remote() {  # The file is read from stdin (esbackup verifies its checksum)
 	local file="$1"
 	local dataset="$2"
 	local host="$3"
 
-	_unpack "${file}" | run_mbuffer | run_ssh "root@${host}" "${SELF} _zfs_dataset_restore_remote_recv ${dataset}"
+	_unpack "${file}" - | run_mbuffer | run_ssh "root@${host}" "${SELF} _zfs_dataset_restore_remote_recv ${dataset}"
 }
 
 
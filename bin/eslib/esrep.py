@@ -48,7 +48,8 @@ class Replication(ZFSCmd, SMFCmd):
         </method_context>
 
         <exec_method type='method' name='start' exec='{esrep_bin} sync -q -m %{{esrep/master}} -s %{{esrep/slave}} \
--H %{{esrep/master_host}} -i %{{esrep/id}} -t %{{esrep/sleep_time}} %{{esrep/opt_callback}} %{{esrep/opt_limit}}' \
+-H %{{esrep/master_host}} -i %{{esrep/id}} -t %{{esrep/sleep_time}} %{{esrep/opt_callback}} %{{esrep/opt_limit}} \
+%{{esrep/opt_compression}}' \
 timeout_seconds='60'>
         </exec_method>
 
@@ -59,6 +60,10 @@ timeout_seconds='60'>
              <propval name='duration' type='astring' value='child' />
         </property_group>
 
+        <property_group name='esrep' type='application'> <!-- defaults for older service instances -->
+             <propval name='opt_compression' type='astring' value='' />
+        </property_group>
+
         <stability value='Evolving' />
     </service>
 </service_bundle>
@@ -77,6 +82,7 @@ timeout_seconds='60'>
                 <propval name='sleep_time' type='astring' value='{sleep_time}' />
                 <propval name='opt_callback' type='astring' value='{opt_callback}' />
                 <propval name='opt_limit' type='astring' value='{opt_limit}' />
+                <propval name='opt_compression' type='astring' value='{opt_compression}' />
             </property_group>
         </instance>
     </service>
@@ -96,6 +102,7 @@ timeout_seconds='60'>
     force = False
     quiet = False
     limit = None
+    compression = None  # algorithm[:level[:threads]] - see pack() in functions.sh
     pickle = False
     sleep_time = None
     callback = None
@@ -252,8 +259,8 @@ timeout_seconds='60'>
         else:
             cmd.append('null')
 
-        if self.limit:
-            cmd.append(self.limit)
+        cmd.append(self.limit or 'null')
+        cmd.append(self.compression or 'null')
 
         return self._run_cmd(*cmd)
 
@@ -926,6 +933,11 @@ timeout_seconds='60'>
         else:
             opt_limit = ''
 
+        if self.compression:
+            opt_compression = '-C%s' % self.compression
+        else:
+            opt_compression = ''
+
         return self.SERVICE_INSTANCE_MANIFEST.format(name=self.SERVICE_NAME,
                                                      base_name=self.SERVICE_BASE_NAME,
                                                      instance_name=self._svc_instance_name,
@@ -936,7 +948,8 @@ timeout_seconds='60'>
                                                      id=self.id,
                                                      sleep_time=self.sleep_time,
                                                      opt_callback=opt_callback,
-                                                     opt_limit=opt_limit)
+                                                     opt_limit=opt_limit,
+                                                     opt_compression=opt_compression)
 
     def _svc_status(self):
         """Return service status"""
@@ -989,8 +1002,9 @@ timeout_seconds='60'>
         for src_disk, dst_disk in zip(src_disks, dst_disks):
             self._vm_check_disk_sync(src_disk, dst_disk)
 
-        # Check if service bundle exists
-        if not self._service_exists(self.SERVICE_NAME):
+        # Check if service bundle exists and is up-to-date (older bundles do not pass the compression option)
+        if not self._service_exists(self.SERVICE_NAME) or \
+                'opt_compression' not in self._service_export(self.SERVICE_NAME):
             # Define service bundle without any instance
             with TmpFile(self._svc_bundle_manifest, text=True) as f:
                 self._service_import(self.SERVICE_NAME, f.name)
@@ -1004,6 +1018,7 @@ timeout_seconds='60'>
             'sleep_time': self.sleep_time,
             'enabled': self.enabled,
             'bwlimit': self.limit,
+            'compression': self.compression,
             'callback': self.callback.orig_name if self.callback else None,
         })
 
@@ -28,11 +28,30 @@ SELF="${ERIGONES_HOME}/bin/eslib/esrep.sh"
 _zfs_snapshot_send() {  # Used by zfs_send_recv()
 	local snapshot="$1"
 	local incr_snapshot="${2:-}"
+	local compression="${3:-"null"}"
+	local -a send_cmd
 
-	if [[ -n "${incr_snapshot}" ]]; then
-		${ZFS} send -R -I "${incr_snapshot}" "${snapshot}"
+	if [[ -n "${incr_snapshot}" && "${incr_snapshot}" != "null" ]]; then
+		send_cmd=(${ZFS} send -R -I "${incr_snapshot}" "${snapshot}")
+	else
+		send_cmd=(${ZFS} send -R -p "${snapshot}")
+	fi
+
+	if [[ "${compression}" == "null" ]]; then
+		"${send_cmd[@]}"
+	else
+		"${send_cmd[@]}" | pack "${compression}"
+	fi
+}
+
+_zfs_recv_stream() {  # Used by zfs_send_recv()
+	local compression="$1"
+	shift
+
+	if [[ "${compression}" == "null" ]]; then
+		_zfs_recv "$@"
 	else
-		${ZFS} send -R -p "${snapshot}"
+		unpack "${compression}" | _zfs_recv "$@"
 	fi
 }
 
@@ -40,15 +59,27 @@ zfs_send_recv() {
 	local dataset="$1"
 	local snapshot="$2"
 	local host="$3"
-	local incr_snapshot="${4:-}"
-	local limit="${5:-}"
+	local incr_snapshot="${4:-"null"}"
+	local limit="${5:-"null"}"
+	local compression="${6:-"null"}"
 
-	[[ -n "${limit}" ]] && MBUFFER_ARGS+="-r ${limit} "
+	[[ "${limit}" != "null" ]] && MBUFFER_ARGS+="-r ${limit} "
 
-	if [[ -n "${incr_snapshot}" && "${incr_snapshot}" != "null" ]]; then
-		run_ssh "root@${host}" "${SELF} _zfs_snapshot_send ${snapshot} ${incr_snapshot}" | run_mbuffer | _zfs_recv "${dataset}" "true"
+	local send_args="${snapshot}"
+
+	if [[ "${incr_snapshot}" != "null" ]]; then
+		send_args+=" ${incr_snapshot}"
+	elif [[ "${compression}" != "null" ]]; then
+		send_args+=" null"  # Full send
+	fi
+
+	# The compression argument is not supported by older versions of _zfs_snapshot_send on the master node
+	[[ "${compression}" != "null" ]] && send_args+=" ${compression}"
+
+	if [[ "${incr_snapshot}" != "null" ]]; then
+		run_ssh "root@${host}" "${SELF} _zfs_snapshot_send ${send_args}" | run_mbuffer | _zfs_recv_stream "${compression}" "${dataset}" "true"
 	else
-		run_ssh "root@${host}" "${SELF} _zfs_snapshot_send ${snapshot}" | run_mbuffer | _zfs_recv "${dataset}"
+		run_ssh "root@${host}" "${SELF} _zfs_snapshot_send ${send_args}" | run_mbuffer | _zfs_recv_stream "${compression}" "${dataset}"
 	fi
 }
 
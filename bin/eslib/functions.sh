@@ -34,6 +34,9 @@ SSH=${SSH:-"/usr/bin/ssh"}
 GZIP=${GZIP:-"/usr/bin/gzip"}
 BZIP2=${BZIP2:-"/usr/bin/bzip2"}
 XZ=${XZ:-"/usr/bin/xz"}
+PIGZ=${PIGZ:-"/opt/local/bin/pigz"}
+PBZIP2=${PBZIP2:-"/opt/local/bin/pbzip2"}
+ZSTD=${ZSTD:-"/opt/local/bin/zstd"}
 DIGEST=${DIGEST:-"/usr/bin/digest -a sha1"}
 DATE=${DATE:-"/usr/bin/date"}
 STAT=${STAT:-"/usr/bin/stat"}
@@ -199,6 +202,90 @@ run_mbuffer() {
 	${MBUFFER} ${MBUFFER_ARGS} "$@"
 }
 
+# Compress stdin to stdout. The compression is specified as "algorithm[:level[:threads]]".
+# Threads > 1 use the parallel compressor (pigz, pbzip2, xz -T, zstd -T); 0 = one thread per CPU.
+pack() {
+	local algorithm level threads
+	local opts=""
+	local compressor
+
+	IFS=":" read -r algorithm level threads <<< "$1"
+
+	[[ -n "${level}" && "${level}" != "null" ]] && opts+="-${level} "
+	[[ "${threads}" == "null" ]] && threads=""
+
+	case "${algorithm}" in
+		gzip|gz)
+			if [[ -n "${threads}" && "${threads}" != "1" && -x "${PIGZ}" ]]; then
+				[[ "${threads}" != "0" ]] && opts+="-p ${threads} "
+				compressor="${PIGZ} ${opts}-c"
+			else
+				compressor="${GZIP} ${opts}-c"
+			fi
+			;;
+		bzip2|bz2)
+			if [[ -n "${threads}" && "${threads}" != "1" && -x "${PBZIP2}" ]]; then
+				[[ "${threads}" != "0" ]] && opts+="-p${threads} "
+				compressor="${PBZIP2} ${opts}-c"
+			else
+				compressor="${BZIP2} ${opts}-c"
+			fi
+			;;
+		xz)
+			[[ -z "${opts}" ]] && opts="-9 "
+			[[ -n "${threads}" ]] && opts+="-T ${threads} "
+			compressor="${XZ} ${opts}-c"
+			;;
+		zstd|zst)
+			[[ -n "${threads}" ]] && opts+="-T${threads} "
+			compressor="${ZSTD} ${opts}-q -c"
+			;;
+		*)
+			die ${_ERR_INPUT} "Unsupported compression algorithm: ${algorithm}"
+			;;
+	esac
+
+	${compressor}
+}
+
+# Decompress stdin (or file) to stdout
+unpack() {
+	local algorithm="${1%%:*}"
+	local source="${2:--}"
+	local uncompress
+
+	case "${algorithm}" in
+		gzip|gz)
+			if [[ -x "${PIGZ}" ]]; then
+				uncompress="${PIGZ} -dc"
+			else
+				uncompress="${GZIP} -dc"
+			fi
+			;;
+		bzip2|bz2)
+			if [[ -x "${PBZIP2}" ]]; then
+				uncompress="${PBZIP2} -dc"
+			else
+				uncompress="${BZIP2} -dc"
+			fi
+			;;
+		xz)
+			uncompress="${XZ} -dc"
+			;;
+		zstd|zst)
+			uncompress="${ZSTD} -dc -q"
+			;;
+		zfs|null)
+			uncompress="${CAT}"
+			;;
+		*)
+			die ${_ERR_INPUT} "Unsupported compression algorithm: ${algorithm}"
+			;;
+	esac
+
+	${uncompress} "${source}"
+}
+
 calculate() {
 	local math_expr="${1}"
 
@@ -0,0 +1,64 @@
+from unittest import TestCase
+import hashlib
+import os
+import tempfile
+
+from .cmd import CmdError
+from .esbackup import Backup
+
+
+class FailingBackup(Backup):
+    CMD = ('sh', '-c', 'cat >/dev/null; echo "zfs: dataset does not exist" >&2; exit 3', 'sh')
+
+
+class BackupStreamTest(TestCase):
+    def setUp(self):
+        fd, self.filename = tempfile.mkstemp()
+        os.write(fd, b'x' * 4096)
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def test_wait_stream_error(self):
+        bkp = FailingBackup()
+        proc, stderr = bkp._popen_local(())
+
+        with self.assertRaises(CmdError) as ctx:
+            bkp._wait_stream(proc, stderr)
+
+        self.assertEqual(ctx.exception.rc, 3)
+        self.assertEqual(ctx.exception.msg, b'zfs: dataset does not exist')
+        self.assertTrue(stderr.closed)
+
+    def test_wait_stream_terminate(self):
+        bkp = FailingBackup()
+        proc, stderr = bkp._popen_local(())
+        bkp._wait_stream(proc, stderr, terminate=True)  # Must not raise CmdError
+        self.assertTrue(stderr.closed)
+
+    def test_backup_to_file_error(self):
+        with self.assertRaises(CmdError) as ctx:
+            FailingBackup()._backup_to_file('zones/test', self.filename)
+
+        self.assertEqual(ctx.exception.rc, 3)
+
+    def test_restore_file_error(self):
+        checksum = 'sha256:' + hashlib.sha256(b'x' * 4096).hexdigest()
+
+        with self.assertRaises(CmdError) as ctx:
+            FailingBackup()._restore_file(self.filename, 'zones/test', checksum)
+
+        self.assertEqual(ctx.exception.rc, 3)
+
+
+class BackupCompressionTest(TestCase):
+    def test_no_compression(self):
+        self.assertEqual(Backup(compression_level=9)._get_compression(), 'null')
+
+    def test_default_level(self):
+        self.assertEqual(Backup(compression='gzip')._get_compression(), 'gzip:null:null')
+
+    def test_level_zero(self):
+        self.assertEqual(Backup(compression='xz', compression_level=0, compression_threads=0)._get_compression(),
+                         'xz:0:0')
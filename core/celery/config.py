@@ -34,10 +34,14 @@ ERIGONES_MGMT_STARTUP_TASK = 'api.system.tasks.mgmt_worker_startup'
 ERIGONES_NODE_SYSINFO_TASK = 'api.node.sysinfo.tasks.node_sysinfo_cb'
 ERIGONES_NODE_STATUS_CHECK_TASK = 'api.node.status.tasks.node_worker_status_check_all'
 ERIGONES_VM_STATUS_TASK = 'api.vm.status.tasks.vm_status_event_cb'
+ERIGONES_VM_STATUS_BATCH_TASK = 'api.vm.status.tasks.vm_status_event_batch_cb'
+ERIGONES_VM_STATUS_COALESCE_WINDOW = 0.5  # Seconds; VM status events received within this window are sent together
+ERIGONES_VM_STATUS_BATCH_SIZE = 200  # Max. number of VM status events sent in one task
 ERIGONES_MGMT_WORKERS = ('mgmt@mgmt01.local',)
 ERIGONES_MGMT_DAEMON_ENABLED = True
 ERIGONES_FAST_DAEMON_ENABLED = True
 ERIGONES_PING_TIMEOUT = 0.5
+ERIGONES_WORKER_LIVENESS_TTL = 10  # Worker is considered alive this many seconds after its last heartbeat event
 ERIGONES_CHECK_USER_TASK_TIMEOUT = 30
 ERIGONES_DEFAULT_RETRY_DELAY = 60
 ERIGONES_MAX_RETRIES = None
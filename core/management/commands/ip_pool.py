@@ -0,0 +1,69 @@
+from ._base import DanubeCloudCommand, CommandOption
+
+
+class Command(DanubeCloudCommand):
+    help = 'Compare free IP address pools (free IP addresses of subnets stored in redis) with a full scan of ' \
+           'IP addresses in the DB and report any drift.'
+
+    options = (
+        CommandOption('-n', '--net', action='append', dest='nets', default=None,
+                      help='Check only selected network(s) (name or uuid).'),
+        CommandOption('--fix', action='store_true', dest='fix', default=False,
+                      help='Rebuild pools with a drift.'),
+    )
+
+    @staticmethod
+    def _get_nets(names):
+        from django.db.models import Q
+        from vms.models import Subnet
+
+        qs = Subnet.objects.all().order_by('name')
+
+        if names:
+            query = Q()
+            for name in names:
+                query |= Q(name=name) | Q(uuid=name)
+            qs = qs.filter(query)
+
+        return qs
+
+    def check(self, net):
+        """Return tuple of sets (missing IPs, stale IPs) and the full scan"""
+        pool = net.ip_pool
+        stored = pool.load() | pool.get_reserved()
+        scanned = pool.scan()
+        missing = scanned - stored
+        stale = pool.load() - scanned
+
+        if missing:
+            self.display('%s: free IP addresses missing in pool: %s' % (net.name, ', '.join(sorted(missing))),
+                         stderr=True, color='yellow')
+
+        if stale:
+            self.display('%s: used or deleted IP addresses in pool: %s' % (net.name, ', '.join(sorted(stale))),
+                         stderr=True, color='yellow')
+
+        return missing, stale, scanned
+
+    def handle(self, *args, **options):
+        drifted = 0
+
+        for net in self._get_nets(options['nets']):
+            missing, stale, scanned = self.check(net)
+
+            if not (missing or stale):
+                self.display('%s: OK (%d free IP addresses)' % (net.name, len(scanned)), color='green')
+                continue
+
+            drifted += 1
+
+            if options['fix']:
+                net.ip_pool.rebuild(scanned)
+                self.display('%s: pool rebuilt (%d IP addresses differ)' % (net.name, len(missing) + len(stale)),
+                             color='green')
+            else:
+                self.display('%s: drift detected (%d IP addresses differ)' % (net.name, len(missing) + len(stale)),
+                             color='red')
+
+        self.display('Done (%d network(s) with drift).' % drifted,
+                     color='red' if drifted and not options['fix'] else 'green')
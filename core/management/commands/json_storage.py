@@ -0,0 +1,187 @@
+from time import sleep
+
+from django.utils.six import integer_types, string_types
+
+from ._base import DanubeCloudCommand, CommandOption, CommandError
+
+
+class Command(DanubeCloudCommand):
+    help = 'Convert pickled json objects of Vm, Node and Dc models into native jsonb columns (and back). ' \
+           'The conversion runs in small batches and can be performed while the API is online ' \
+           '(VMS_JSON_STORAGE should be set to "dual" during the conversion).'
+    args = '<convert|verify|clear>'
+    actions = frozenset(['convert', 'verify', 'clear'])
+    models = ('dc', 'node', 'vm')
+
+    options = (
+        CommandOption('-m', '--model', action='append', dest='models', default=None,
+                      help='Process only selected model(s): dc, node, vm (default: all).'),
+        CommandOption('-b', '--batch-size', action='store', dest='batch_size', type='int', default=200,
+                      help='Number of rows processed in one DB transaction (default: 200).'),
+        CommandOption('-s', '--sleep', action='store', dest='sleep', type='float', default=0.1,
+                      help='Pause between batches in seconds (default: 0.1).'),
+    )
+
+    @staticmethod
+    def _get_model(name):
+        from vms.models import Dc, Node, Vm
+
+        return {'dc': Dc, 'node': Node, 'vm': Vm}[name]
+
+    @staticmethod
+    def _iterate(model, only, batch_size, pause, **filters):
+        """Yield batches (lists of value dicts) of rows ordered by primary key"""
+        qs = model.objects.filter(**filters).order_by('pk')
+        last_pk = None
+
+        while True:
+            batch_qs = qs if last_pk is None else qs.filter(pk__gt=last_pk)
+            batch = list(batch_qs.values('pk', *only)[:batch_size])
+
+            if not batch:
+                break
+
+            last_pk = batch[-1]['pk']
+            yield batch
+
+            if pause:
+                sleep(pause)
+
+    @staticmethod
+    def _type(value):
+        """Return JSON type of a python value (str and unicode are the same strings in python 2)"""
+        if isinstance(value, bool):
+            return 'boolean'
+        elif isinstance(value, integer_types):
+            return 'integer'
+        elif isinstance(value, string_types):
+            return 'string'
+        elif isinstance(value, dict):
+            return 'object'
+        else:
+            return type(value).__name__
+
+    @classmethod
+    def _diff(cls, value1, value2, path='json'):
+        """Return description of the first difference (in value or type) between two decoded objects or None"""
+        type1, type2 = cls._type(value1), cls._type(value2)
+
+        if type1 != type2:
+            return '%s type %s != %s' % (path, type1, type2)
+
+        if isinstance(value1, dict):
+            for key in set(value1) | set(value2):
+                if key not in value1 or key not in value2:
+                    return '%s[%r] is missing' % (path, key)
+
+                diff = cls._diff(value1[key], value2[key], '%s[%r]' % (path, key))
+
+                if diff:
+                    return diff
+        elif isinstance(value1, list):
+            if len(value1) != len(value2):
+                return '%s length %d != %d' % (path, len(value1), len(value2))
+
+            for i, (val1, val2) in enumerate(zip(value1, value2)):
+                diff = cls._diff(val1, val2, '%s[%d]' % (path, i))
+
+                if diff:
+                    return diff
+        elif value1 != value2:
+            return '%s value %r != %r' % (path, value1, value2)
+
+        return None
+
+    def convert(self, model, batch_size, pause):
+        """Fill empty jsonb columns from encoded fields. The UPDATE is conditional (compare-and-set) on the encoded
+        value, so rows modified by the API during the conversion are not overwritten with old data."""
+        from django.db import transaction
+
+        converted = failed = 0
+
+        for enc_field, jsonb_field in model._jsonb_fields.items():
+            filters = {jsonb_field + '__isnull': True}
+
+            for batch in self._iterate(model, (enc_field,), batch_size, pause, **filters):
+                with transaction.atomic():
+                    for row in batch:
+                        enc_value = row[enc_field]
+
+                        try:
+                            # noinspection PyProtectedMember
+                            value = model._encode_jsonb(model._decode(enc_value))
+                        except (TypeError, ValueError) as exc:
+                            failed += 1
+                            self.display('%s %s: cannot convert %s (%s)' % (model.__name__, row['pk'], enc_field, exc),
+                                         stderr=True, color='yellow')
+                            continue
+
+                        converted += model.objects.filter(**dict(filters, pk=row['pk'], **{enc_field: enc_value}))\
+                                                  .update(**{jsonb_field: value})
+
+        return converted, failed
+
+    def verify(self, model, batch_size, pause):
+        """Compare jsonb columns with encoded fields (including the types of values)"""
+        only = tuple(model._jsonb_fields.keys()) + tuple(model._jsonb_fields.values())
+        converted = mismatched = 0
+
+        for batch in self._iterate(model, only, batch_size, pause):
+            for row in batch:
+                for enc_field, jsonb_field in model._jsonb_fields.items():
+                    jsonb_value = row[jsonb_field]
+
+                    if jsonb_value is None:
+                        continue
+
+                    converted += 1
+
+                    # noinspection PyProtectedMember
+                    diff = self._diff(model._decode(row[enc_field]), jsonb_value)
+
+                    if diff:
+                        mismatched += 1
+                        self.display('%s %s: %s does not match %s (%s)' % (model.__name__, row['pk'], jsonb_field,
+                                                                           enc_field, diff),
+                                     stderr=True, color='yellow')
+
+        return converted, mismatched
+
+    @staticmethod
+    def clear(model, batch_size, pause):
+        """Remove data from jsonb columns (rollback to pickle storage)"""
+        # noinspection PyProtectedMember
+        return model.objects.all().update(**{i: None for i in model._jsonb_fields.values()}), 0
+
+    def handle(self, action=None, *args, **options):
+        from django.conf import settings
+        from vms.models import Vm
+
+        if action not in self.actions:
+            raise CommandError('Missing or invalid action (use one of: %s)' % ', '.join(sorted(self.actions)))
+
+        storage = settings.VMS_JSON_STORAGE
+
+        if action == 'convert' and storage == Vm.STORAGE_PICKLE:
+            self.display('WARNING: VMS_JSON_STORAGE is set to "%s"; jsonb columns are cleared when objects are '
+                         'updated in this mode' % storage, stderr=True, color='yellow')
+        elif action == 'verify' and storage == Vm.STORAGE_JSONB:
+            raise CommandError('Encoded fields are not updated when VMS_JSON_STORAGE is set to "%s"' % storage)
+        elif action == 'clear' and storage != Vm.STORAGE_PICKLE:
+            raise CommandError('VMS_JSON_STORAGE must be set to "%s" before clearing the jsonb columns' %
+                               Vm.STORAGE_PICKLE)
+
+        model_names = options['models'] or self.models
+        fun = getattr(self, action)
+
+        for name in model_names:
+            try:
+                model = self._get_model(name)
+            except KeyError:
+                raise CommandError('Invalid model "%s"' % name)
+
+            ok, failed = fun(model, options['batch_size'], options['sleep'])
+            self.display('%s: %s %d, failed %d' % (model.__name__, action, ok, failed),
+                         color='red' if failed else 'green')
+
+        self.display('Done.', color='green')
@@ -0,0 +1,76 @@
+from random import Random
+from time import time
+
+from ._base import DanubeCloudCommand, CommandOption
+
+
+class Command(DanubeCloudCommand):
+    help = 'Benchmark the automatic node chooser (vms.models.placement) on a synthetic capacity matrix. ' \
+           'No data is read from or written to the database.'
+
+    options = (
+        CommandOption('-n', '--nodes', action='store', dest='nodes', type='int', default=500,
+                      help='Number of compute nodes (default: 500).'),
+        CommandOption('-m', '--vms', action='store', dest='vms', type='int', default=5000,
+                      help='Number of VMs placed in one batch (default: 5000).'),
+        CommandOption('-p', '--policy', action='append', dest='policies', default=None,
+                      help='Placement policy: priority, pack, spread (default: all).'),
+        CommandOption('--seed', action='store', dest='seed', type='int', default=42,
+                      help='Random seed (default: 42).'),
+    )
+
+    @staticmethod
+    def _get_candidates(rnd, count, zpool):
+        from vms.models.placement import PlacementCandidate
+
+        candidates = []
+
+        for i in range(count):
+            cpu = rnd.choice((32, 48, 64, 96))
+            ram = cpu * 8192
+            disk = rnd.choice((2, 4, 8)) * 1048576
+            candidates.append(PlacementCandidate('node%03d' % i, rnd.choice((100, 100, 100, 200)), cpu, ram, disk,
+                                                 cpu, ram, disk, storages={zpool: disk, 'data': disk * 2},
+                                                 bhyve=(True, 32)))
+
+        return candidates
+
+    @staticmethod
+    def _get_requests(rnd, count, zpool):
+        from vms.models.placement import PlacementRequest
+
+        reqs = []
+
+        for _ in range(count):
+            disks = {zpool: rnd.choice((10240, 20480, 51200))}
+
+            if rnd.random() < 0.3:
+                disks['data'] = rnd.choice((102400, 204800))
+
+            reqs.append(PlacementRequest(rnd.choice((1, 2, 4, 8)), rnd.choice((1024, 2048, 4096, 8192)), disks=disks,
+                                         bhyve=rnd.random() < 0.1))
+
+        return reqs
+
+    def handle(self, *args, **options):
+        from vms.models.node import Node
+        from vms.models.placement import PlacementEngine
+
+        zpool = Node.ZPOOL
+        policies = options['policies'] or sorted(PlacementEngine.POLICIES)
+
+        for policy in policies:
+            rnd = Random(options['seed'])
+            candidates = self._get_candidates(rnd, options['nodes'], zpool)
+            reqs = self._get_requests(rnd, options['vms'], zpool)
+            engine = PlacementEngine(None, policy=policy, candidates=candidates, zpool_default=zpool)
+
+            start = time()
+            nodes = engine.place(reqs)
+            elapsed = time() - start
+
+            placed = len([i for i in nodes if i is not None])
+            used = len(set(nodes) - {None})
+            self.display('%s: placed %d/%d VMs on %d/%d nodes in %.3f s (%.3f ms per VM)' % (
+                policy, placed, len(reqs), used, len(candidates), elapsed, elapsed * 1000 / max(len(reqs), 1)),
+                color='green')
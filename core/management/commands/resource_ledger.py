@@ -0,0 +1,83 @@
+from ._base import DanubeCloudCommand, CommandOption
+
+
+class Command(DanubeCloudCommand):
+    help = 'Compare node resource ledgers (resources used by VMs stored in redis) with a full scan of all VMs ' \
+           'and report any drift.'
+
+    options = (
+        CommandOption('-n', '--node', action='append', dest='nodes', default=None,
+                      help='Check only selected compute node(s) (hostname or uuid).'),
+        CommandOption('--fix', action='store_true', dest='fix', default=False,
+                      help='Rebuild ledgers with a drift and update node resource counters.'),
+    )
+
+    @staticmethod
+    def _get_nodes(names):
+        from django.db.models import Q
+        from vms.models import Node
+
+        qs = Node.objects.all().order_by('hostname')
+
+        if names:
+            query = Q()
+            for name in names:
+                query |= Q(hostname=name) | Q(uuid=name)
+            qs = qs.filter(query)
+
+        return qs
+
+    @staticmethod
+    def _sum(entries):
+        cpu = ram = disk = 0
+
+        for _, vm_cpu, vm_ram, vm_disks in entries.values():
+            cpu += vm_cpu
+            ram += vm_ram
+            disk += sum(vm_disks.values())
+
+        return cpu, ram, disk
+
+    def check(self, node):
+        """Return list of VM uuids with a ledger entry different from the full scan"""
+        ledger = node.resource_ledger
+        stored = ledger.load()
+        scanned = ledger.scan()
+        drift = []
+
+        for vm_uuid in sorted(set(stored) | set(scanned)):
+            stored_entry = stored.get(vm_uuid)
+            scanned_entry = scanned.get(vm_uuid)
+
+            if stored_entry != scanned_entry:
+                drift.append(vm_uuid)
+                self.display('%s: VM %s: ledger=%s scan=%s' % (node.hostname, vm_uuid, stored_entry, scanned_entry),
+                             stderr=True, color='yellow')
+
+        if drift:
+            self.display('%s: ledger (cpu, ram, disk) = %s, scan (cpu, ram, disk) = %s' %
+                         (node.hostname, self._sum(stored), self._sum(scanned)), stderr=True, color='yellow')
+
+        return drift, scanned
+
+    def handle(self, *args, **options):
+        drifted = 0
+
+        for node in self._get_nodes(options['nodes']):
+            drift, scanned = self.check(node)
+
+            if not drift:
+                self.display('%s: OK (%d VMs)' % (node.hostname, len(scanned)), color='green')
+                continue
+
+            drifted += 1
+
+            if options['fix']:
+                node.resource_ledger.rebuild(scanned)
+                node.update_resources(save=True)
+                self.display('%s: ledger rebuilt (%d VMs differ)' % (node.hostname, len(drift)), color='green')
+            else:
+                self.display('%s: drift detected (%d VMs differ)' % (node.hostname, len(drift)), color='red')
+
+        self.display('Done (%d node(s) with drift).' % drifted,
+                     color='red' if drifted and not options['fix'] else 'green')
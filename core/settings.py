@@ -415,6 +415,8 @@ TASK_LOG_LASTSIZE = 10
 TASK_LOG_STAFF_ID = 0
 
 AUTHTOKEN_DURATION = 3600  # Seconds
+AUTHTOKEN_CACHE_TIMEOUT = 60  # Seconds; how long can a valid token lookup be cached
+AUTHTOKEN_CACHE_INVALID_TIMEOUT = 10  # Seconds; how long can an invalid (unknown or revoked) token be cached
 
 SOCKETIO_URL = '/'
 SOCKETIO_HTTP_ORIGIN = '*'
@@ -532,6 +534,8 @@ MON_ZABBIX_HOST_VM_PROXY = ''  # local, external
 
 MON_ZABBIX_GRAPH_MAX_HISTORY = 518400  # 6 days; global, internal+external
 MON_ZABBIX_GRAPH_MAX_PERIOD = 14400  # 4 hours; global, internal+external
+MON_ZABBIX_GRAPH_MAX_POINTS = 1000  # Default maximum number of graph values per item (0 = no downsampling); global
+MON_ZABBIX_HISTORY_CACHE_TIMEOUT = 86400  # Cache timeout of closed history/trend time buckets (0 = no cache); global
 
 MON_ZABBIX_MEDIA_TYPE_EMAIL = 'E-mail'
 MON_ZABBIX_MEDIA_TYPE_PHONE = 'SMS'
@@ -545,6 +549,8 @@ FAQ_ENABLED = False  # Module
 
 VMS_SDC_VERSION = '7.0'
 
+VMS_JSON_STORAGE = 'pickle'  # Storage of Vm/Node/Dc json objects: pickle, dual or jsonb (see vms.models.base)
+
 VMS_VM_JSON_DEFAULTS = {
     'internal_metadata': {
         'author': 'Erigones',
@@ -582,6 +588,7 @@ VMS_NODE_DC_DEFAULT = VMS_DC_DEFAULT  # DC ID - Must be equal to VMS_DC_DEFAULT
 VMS_NODE_USER_DEFAULT = ADMIN_USER
 VMS_NODE_SSH_KEYS_SYNC = True
 VMS_NODE_SSH_KEYS_DEFAULT = []
+VMS_NODE_PLACEMENT_POLICY = 'priority'  # Automatic node chooser policy: priority, pack or spread
 VMS_NET_DEFAULT = 'lan'
 VMS_NET_ADMIN = 'admin'
 VMS_NET_ADMIN_OVERLAY = 'adminoverlay'
@@ -661,6 +668,8 @@ VMS_VM_SNAPSHOT_SIZE_PERCENT_LIMIT_DEFAULT = None  # Default % size snapshot lim
 VMS_VM_SNAPSHOT_SIZE_LIMIT = None  # Maximum total size of all (automatic and manual) VM snapshots (None - unlimited)
 VMS_VM_SNAPSHOT_SIZE_LIMIT_DEFAULT = None  # Default size limit in forms/serializers
 VMS_VM_SNAPSHOT_DC_SIZE_LIMIT = None  # Maximum total size of snapshots in one DC (None - unlimited)
+VMS_VM_SNAPSHOT_BATCH_WINDOW = 10  # Seconds; automatic snapshots of VMs on one compute node started within this
+# time window are created (and old snapshots are deleted) by one esnapshot job (0 - one job per snapshot definition)
 
 VMS_VM_BACKUP_ENABLED = True  # Module
 VMS_VM_BACKUP_FILE_DIR = 'backups/file'  # Backup directory name created on zpool
@@ -668,6 +677,8 @@ VMS_VM_BACKUP_DS_DIR = 'backups/ds'  # Backup dataset created on zpool
 VMS_VM_BACKUP_MANIFESTS_FILE_DIR = 'backups/manifests/file'  # Manifest directory name created on zpool
 VMS_VM_BACKUP_MANIFESTS_DS_DIR = 'backups/manifests/ds'  # Manifest directory name created on zpool
 VMS_VM_BACKUP_COMPRESSION_DEFAULT = 0  # None
+VMS_VM_BACKUP_FILE_CHECKSUM = None  # File backup checksum algorithm: sha1, sha256, sha512, blake2b (None - sha1)
+VMS_VM_BACKUP_FILE_BUFFER_SIZE = None  # File backup read/write block size in bytes (None - esbackup default)
 VMS_VM_BACKUP_DEFINE_LIMIT = None  # Maximum number of backup definitions (None - unlimited)
 VMS_VM_BACKUP_LIMIT = None  # Maximum number of backups (retention limit) (None - unlimited)
 VMS_VM_BACKUP_DC_SIZE_LIMIT = None  # Maximum total size of backups in one DC (None - unlimited)
@@ -1,3 +1,5 @@
+from logging import getLogger
+
 from django.conf import settings
 from django.utils import timezone
 from django.http import HttpResponseRedirect
@@ -5,6 +7,9 @@ from django.http import HttpResponseRedirect
 from gui.models import User
 from gui.context_processors import print_sql_debug
 from gui.exceptions import HttpRedirectException
+from vms.models.base import decode_counter
+
+logger = getLogger(__name__)
 
 
 class ExceptionMiddleware(object):
@@ -21,10 +26,16 @@ class DebugMiddleware(object):
     """
     Print some debugging info to stderr.
     """
+    # noinspection PyMethodMayBeStatic,PyUnusedLocal
+    def process_request(self, request):
+        decode_counter.reset()
+
     # noinspection PyMethodMayBeStatic,PyUnusedLocal
     def process_response(self, request, response):
         # Print sql debug to stderr if SQL_DEBUG is True
         print_sql_debug()
+        # Number of json/json_active/info pickle decodes performed during this request
+        logger.debug('%s %s performed %d pickle decodes', request.method, request.path, decode_counter.reset())
         return response
 
 
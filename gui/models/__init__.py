@@ -1,12 +1,20 @@
-from django.db.models.signals import pre_delete, pre_save, post_save
+from django.db.models.signals import pre_delete, pre_save, post_save, post_delete, m2m_changed
 
 from gui.models.user import User  # noqa: F401
 from gui.models.userprofile import UserProfile  # noqa: F401
 from gui.models.usersshkey import UserSSHKey  # noqa: F401
 from gui.models.permission import Permission, AdminPermission, SuperAdminPermission  # noqa: F401
 from gui.models.role import Role  # noqa: F401
+from gui.models.permission_matrix import PermissionMatrix
 
 
 post_save.connect(User.post_save, sender=User, dispatch_uid='post_save_user')
 pre_save.connect(User.pre_save, sender=User, dispatch_uid='pre_save_user')
 pre_delete.connect(User.pre_delete, sender=User, dispatch_uid='pre_delete_user')
+
+# Invalidate cached user permissions in DCs
+m2m_changed.connect(PermissionMatrix.m2m_changed, sender=User.roles.through, dispatch_uid='m2m_changed_user_roles')
+m2m_changed.connect(PermissionMatrix.m2m_changed, sender=Role.permissions.through,
+                    dispatch_uid='m2m_changed_role_permissions')
+post_delete.connect(PermissionMatrix.post_delete, sender=Role, dispatch_uid='post_delete_role_permissions')
+post_delete.connect(PermissionMatrix.post_delete, sender=Permission, dispatch_uid='post_delete_permission')
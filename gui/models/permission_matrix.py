@@ -0,0 +1,107 @@
+from collections import OrderedDict
+from logging import getLogger
+from time import time
+
+from django.core.cache import cache
+
+logger = getLogger(__name__)
+
+CACHE_PERMISSIONS_VERSION_KEY = 'permissions:version'
+
+
+class PermissionMatrix(object):
+    """
+    Process-local LRU cache of user permissions in datacenters: (user, dc) -> frozenset of permission names
+    (see User.get_dc_permissions()).
+
+    All entries are dropped when the global permissions version stored in cache changes. The version is bumped when
+    user groups, DC groups or group permissions are changed (see the m2m_changed signal handlers connected in
+    gui.models) and by User.clear_dc_admin_ids() and User.clear_super_admin_ids(), which are called by the API after
+    the changes are committed. The version is checked at most once per check_interval seconds and every entry
+    expires after ttl seconds regardless of the version.
+    """
+    maxsize = 4096
+    check_interval = 1
+    ttl = 300
+
+    def __init__(self):
+        self._data = OrderedDict()  # {key: (expires, permissions)}
+        self._version = None
+        self._next_check = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    @staticmethod
+    def get_version():
+        return cache.get(CACHE_PERMISSIONS_VERSION_KEY, 0)
+
+    @staticmethod
+    def bump_version():
+        """Invalidate cached permissions in all processes"""
+        permission_matrix.clear()
+
+        try:
+            return cache.incr(CACHE_PERMISSIONS_VERSION_KEY)
+        except ValueError:
+            cache.set(CACHE_PERMISSIONS_VERSION_KEY, 1, None)
+            return 1
+
+    def clear(self):
+        self._data.clear()
+        self._next_check = 0
+
+    def _check(self, now):
+        if now < self._next_check:
+            return
+
+        version = self.get_version()
+        self._next_check = now + self.check_interval
+
+        if version != self._version:
+            if self._data:
+                logger.debug('Permissions version changed (%s -> %s), dropping %d cached entries',
+                             self._version, version, len(self._data))
+            self._data.clear()
+            self._version = version
+
+    def get(self, user, dc, loader):
+        """Return cached permissions or call loader() and cache its result"""
+        # The owner and is_staff attributes change the permissions, but they are not covered by the version
+        key = (user.id, user.is_staff, dc.id, dc.owner_id)
+        now = time()
+        self._check(now)
+        data = self._data
+
+        try:
+            expires, perms = data.pop(key)
+        except KeyError:
+            pass
+        else:
+            if now < expires:
+                data[key] = (expires, perms)  # Move to the end (most recently used)
+                return perms
+
+        perms = frozenset(loader())
+        data[key] = (now + self.ttl, perms)
+
+        while len(data) > self.maxsize:
+            data.popitem(last=False)
+
+        return perms
+
+    # noinspection PyUnusedLocal
+    @classmethod
+    def m2m_changed(cls, sender, action, **kwargs):
+        """Signal handler for user.roles, dc.roles and role.permissions changes"""
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            cls.bump_version()
+
+    # noinspection PyUnusedLocal
+    @classmethod
+    def post_delete(cls, sender, instance, **kwargs):
+        """Signal handler for Role and Permission deletion (related m2m rows are deleted without m2m_changed)"""
+        cls.bump_version()
+
+
+permission_matrix = PermissionMatrix()
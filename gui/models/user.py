@@ -17,6 +17,7 @@ from gui.mixins import _AclMixin
 # noinspection PyProtectedMember
 from gui.models.permission import (Permission, SuperAdminPermission, AdminPermission, AnyDcPermissionSet,
                                    UserAdminPermission)
+from gui.models.permission_matrix import PermissionMatrix, permission_matrix
 # noinspection PyProtectedMember
 from api.permissions import generate_random_security_hash
 
@@ -24,6 +25,7 @@ logger = getLogger(__name__)
 
 CACHE_SUPER_ADMINS_KEY = 'super_admin_ids'
 CACHE_DC_ADMINS_KEY = 'admin_ids:dc:%s'  # dc.id required
+CACHE_ADMINS_VERSION_KEY = 'admin_ids:version'
 
 
 class User(AbstractBaseUser, PermissionsMixin, _AclMixin, _DcBoundMixin):
@@ -131,8 +133,12 @@ class User(AbstractBaseUser, PermissionsMixin, _AclMixin, _DcBoundMixin):
         if self.is_staff:
             perms = {SuperAdminPermission.name, AdminPermission.name}
             perms.update(AnyDcPermissionSet)
-            return perms
+            return frozenset(perms)
 
+        return permission_matrix.get(self, dc, lambda: self._load_dc_permissions(dc))
+
+    def _load_dc_permissions(self, dc):
+        """Return set of this user's permissions in DC from DB"""
         if self.is_dc_owner(dc):
             perms = {AdminPermission.name}
         else:
@@ -224,6 +230,8 @@ class User(AbstractBaseUser, PermissionsMixin, _AclMixin, _DcBoundMixin):
     def clear_super_admin_ids():
         """Clear cached super admin IDs. Do this after changing is_staff attribute on a user."""
         logger.info('Clearing SuperAdmin IDs from cache.')
+        User.bump_admin_ids_version()
+        PermissionMatrix.bump_version()
         return cache.delete(CACHE_SUPER_ADMINS_KEY)
 
     @classmethod
@@ -262,8 +270,24 @@ class User(AbstractBaseUser, PermissionsMixin, _AclMixin, _DcBoundMixin):
             dc = Dc.objects.get_by_id(dc_id)
 
         logger.info('Clearing Admin IDs for DC "%s" from cache.', dc.name)
+        User.bump_admin_ids_version()
+        PermissionMatrix.bump_version()
         return cache.delete(CACHE_DC_ADMINS_KEY % dc.id)
 
+    @staticmethod
+    def get_admin_ids_version():
+        """Return version of cached admin IDs; used for invalidating process-local copies (e.g. in sio.monitor)"""
+        return cache.get(CACHE_ADMINS_VERSION_KEY, 0)
+
+    @staticmethod
+    def bump_admin_ids_version():
+        """Change version of cached admin IDs"""
+        try:
+            return cache.incr(CACHE_ADMINS_VERSION_KEY)
+        except ValueError:
+            cache.set(CACHE_ADMINS_VERSION_KEY, 1, None)
+            return 1
+
     # noinspection PyUnusedLocal
     @staticmethod
     def post_save(sender, instance, created, **kwargs):
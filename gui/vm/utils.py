@@ -6,7 +6,7 @@ from frozendict import frozendict
 from logging import getLogger
 import json
 
-from vms.models import Vm, Image, SnapshotDefine, Snapshot, BackupDefine, Backup, TagVm, Subnet
+from vms.models import Vm, DcNode, Image, SnapshotDefine, Snapshot, BackupDefine, Backup, TagVm, Subnet
 from gui.utils import get_order_by, get_pager
 from gui.exceptions import HttpRedirectException
 from gui.dc.views import dc_switch
@@ -294,6 +294,35 @@ def vm_define_all(request, vm_details, method='POST'):
         return 400, vm_details
 
 
+def vm_place_all(request, vms_details):
+    """
+    Choose compute nodes for all imported VMs without a node in one batch, so that every placement sees
+    resources reserved by previously placed VMs. VMs which cannot be placed will get a node just before deploy.
+    Return number of VMs with a node assigned.
+    """
+    hostnames = [json.loads(vm_details['json'])['hostname'] for vm_details in vms_details]
+    vms = Vm.objects.filter(dc=request.dc, hostname__in=hostnames, node__isnull=True)
+    vms = sorted(vms, key=lambda x: hostnames.index(x.hostname))
+    placed = 0
+
+    for vm, node in zip(vms, DcNode.choose_nodes(request.dc, vms)):
+        if not node:
+            continue
+
+        logger.info('Calling API view PUT vm_define(%s, data={"node": "%s"}) by user %s in DC %s',
+                    vm.hostname, node.hostname, request.user, request.dc)
+        res = call_api_view(request, 'PUT', vm_define, vm.hostname, data={'node': node.hostname},
+                            disable_throttling=True)
+
+        if res.status_code == 200:
+            placed += 1
+        else:
+            logger.warning('vm_define: "%s" node: "%s" status_code: "%s" data: %s', vm.hostname, node.hostname,
+                           res.status_code, res.data)
+
+    return placed
+
+
 class ImportExportBase(object):
     # Sheets will be created either in export or in import
     sheet_dc_name = 'Datacenter'
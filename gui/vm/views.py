@@ -22,7 +22,7 @@ from gui.vm.forms import (
 )
 from gui.vm.utils import (
     get_vm, get_vms, get_vm_snapshots, get_vm_define_disk, get_vm_define_nic, get_vms_tags, get_vm_snapdefs,
-    get_vm_backups, get_vm_bkpdefs, vm_define_all, ImportExportBase, get_ptr_domain_by_ip
+    get_vm_backups, get_vm_bkpdefs, vm_define_all, vm_place_all, ImportExportBase, get_ptr_domain_by_ip
 )
 from gui.decorators import ajax_required, profile_required, admin_required, permission_required
 from gui.fields import SIZE_FIELD_MB_ADDON, SIZE_FIELD_PERCENT_ADDON
@@ -414,6 +414,7 @@ def add_import_form(request):
                     defined_vms[vm] = html_table[vm]
 
         if redirect_to_vm_list:
+            vm_place_all(request, html_table.values())
             return redirect('vm_list')
 
         # Some server creation has failed, remove all created server definitions
@@ -7,6 +7,7 @@ from django.db.models.signals import post_delete, post_save
 
 from pdns.models.record import Record
 from pdns.models.record import Domain
+from pdns.models.changeset import RecordChangeSet
 from pdns.models.pdns_config import PdnsCfg
 from pdns.models.pdns_config import PdnsRecursorCfg
 from pdns.models.pdns_config import RecurseNetworks
@@ -0,0 +1,87 @@
+import sys
+from logging import getLogger
+from threading import local
+
+from django.db import router, transaction
+
+logger = getLogger(__name__)
+
+
+class _ActiveChangeSet(local):
+    """Currently active (innermost) RecordChangeSet"""
+    changeset = None
+
+
+_active = _ActiveChangeSet()
+
+
+class RecordChangeSet(object):
+    """
+    Group many DNS record changes (create/update/delete of Record objects) into one change-set:
+
+        with RecordChangeSet():
+            record1.save()
+            record2.delete()
+
+    Record changes inside the change-set do not touch the SOA record (see Record.increment_SOA_serial()). The SOA
+    serial of every modified domain is incremented only once when the outermost change-set exits successfully, so
+    PowerDNS sends only one NOTIFY per zone to its secondaries. With atomic=True (default) all changes are made in one
+    transaction of the pdns DB. Nested change-sets are merged into the outer one.
+    """
+    def __init__(self, atomic=True):
+        self.atomic = atomic
+        self.domains = set()
+        self._outer = None
+        self._atomic = None
+
+    def __repr__(self):
+        return '<RecordChangeSet: domains=%s>' % sorted(self.domains)
+
+    @staticmethod
+    def get_active():
+        return _active.changeset
+
+    def add_domain(self, domain_id):
+        if domain_id:
+            self.domains.add(domain_id)
+
+    def _commit(self):
+        from pdns.models.record import Record  # circular imports
+
+        for domain_id in sorted(self.domains):
+            Record.increment_domain_SOA_serial(domain_id)
+
+        logger.info('DNS record change-set finished: SOA serial incremented in %d domain(s)', len(self.domains))
+        self.domains.clear()
+
+    def __enter__(self):
+        from pdns.models.record import Record  # circular imports
+
+        if self.atomic:
+            self._atomic = transaction.atomic(using=router.db_for_write(Record))
+            self._atomic.__enter__()
+
+        self._outer = _active.changeset
+        _active.changeset = self
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _active.changeset = self._outer
+
+        # Changes made inside an atomic block were rolled back if an exception occurred
+        if exc_type is None or not self.atomic:
+            try:
+                if self._outer:
+                    self._outer.domains.update(self.domains)
+                else:
+                    self._commit()
+            except Exception:
+                if self._atomic:
+                    self._atomic.__exit__(*sys.exc_info())
+                raise
+
+        if self._atomic:
+            return self._atomic.__exit__(exc_type, exc_val, exc_tb)
+
+        return False
@@ -9,6 +9,7 @@ from django.utils.six import text_type
 from dns import reversename, exception
 
 from pdns.models.domain import Domain
+from pdns.models.changeset import RecordChangeSet
 
 logger = getLogger(__name__)
 
@@ -297,19 +298,13 @@ class Record(models.Model):
 
     # noinspection PyPep8Naming
     @classmethod
-    def increment_SOA_serial(cls, instance):
-        """Method called in post_save and post_delete to increment SOA after record updates"""
-        if instance.type == cls.SOA:
-            return
-
+    def increment_domain_SOA_serial(cls, domain_id):
+        """Increment serial in SOA record of a domain"""
         try:
-            soa_rec = cls.objects.get(type=cls.SOA, domain_id=instance.domain.id)
+            soa_rec = cls.objects.get(type=cls.SOA, domain_id=domain_id)
         except cls.DoesNotExist:
             logger.warning('SOA record does not exist! Not doing SOA increment.')
             return
-        except Domain.DoesNotExist:
-            logger.info('increment_SOA_serial: Domain does not exist. Ignoring SOA increment.')
-            return
 
         soa_rec_content = soa_rec.content.split()
         soa_serial = int(soa_rec_content[2])  # get serial from SOA record
@@ -324,6 +319,28 @@ class Record(models.Model):
         soa_rec.content = ' '.join(soa_rec_content)
         soa_rec.save(update_fields=('content', 'change_date'))
 
+    # noinspection PyPep8Naming
+    @classmethod
+    def increment_SOA_serial(cls, instance):
+        """Method called in post_save and post_delete to increment SOA after record updates.
+        Inside a RecordChangeSet the SOA is incremented only once per domain when the change-set is finished."""
+        if instance.type == cls.SOA:
+            return
+
+        changeset = RecordChangeSet.get_active()
+
+        if changeset:
+            changeset.add_domain(instance.domain_id)
+            return
+
+        try:
+            domain_id = instance.domain.id
+        except Domain.DoesNotExist:
+            logger.info('increment_SOA_serial: Domain does not exist. Ignoring SOA increment.')
+            return
+
+        cls.increment_domain_SOA_serial(domain_id)
+
     # noinspection PyUnusedLocal
     @classmethod
     def post_save_record(cls, sender, instance, **kwargs):
@@ -5,14 +5,16 @@ import json
 from subprocess import PIPE, STDOUT
 from threading import Thread
 from logging import getLogger
-from time import sleep
+from time import sleep, time
+
+from collections import OrderedDict
 
 try:
     # noinspection PyCompatibility
-    from Queue import Queue
+    from Queue import Queue, Empty
 except ImportError:
     # noinspection PyUnresolvedReferences,PyCompatibility
-    from queue import Queue
+    from queue import Queue, Empty
 
 from psutil import Popen, NoSuchProcess
 from celery.bootsteps import StartStopStep
@@ -98,22 +100,67 @@ class FastDaemon(_PeriodicTaskDaemon):
         if self.enabled:
             self._periodic_tasks.append(self._vm_status_thread_check)
 
+    def _vm_status_coalesce(self, event, window, batch_size):
+        """Collect events from queue for a short time window after receiving the first event.
+        Only the last event for every VM (zonename) is kept - intermediate states are dropped."""
+        queue = self.vm_status_queue
+        events = OrderedDict([(event['zonename'], event)])
+        deadline = time() + window
+        received = 1
+
+        while len(events) < batch_size:
+            timeout = deadline - time()
+
+            if timeout <= 0:
+                break
+
+            try:
+                event = queue.get(timeout=timeout)
+            except Empty:
+                break
+
+            received += 1
+            events.pop(event['zonename'], None)
+            events[event['zonename']] = event
+
+        if received > len(events):
+            logger.info('Dropped %d intermediate VM status event(s)', received - len(events))
+
+        return list(events.values())
+
     def _vm_status_dispatcher(self):
-        """THREAD: Reads VM status changes from queue and creates a vm_status_event_cb task for every status change"""
+        """THREAD: Reads VM status changes from queue and creates a vm_status_event_cb task for every status change
+        or a vm_status_event_batch_cb task for multiple status changes received within the coalescing window"""
         from que.utils import task_id_from_string, send_task_forever  # Circular imports
 
         vm_status_task = self._conf.ERIGONES_VM_STATUS_TASK
+        vm_status_batch_task = self._conf.ERIGONES_VM_STATUS_BATCH_TASK
+        window = self._conf.ERIGONES_VM_STATUS_COALESCE_WINDOW
+        batch_size = self._conf.ERIGONES_VM_STATUS_BATCH_SIZE
         task_user = self._conf.ERIGONES_TASK_USER
         queue = self.vm_status_queue
         logger.info('Emitting VM status changes on node %s via %s', self.node_uuid, vm_status_task)
 
         while True:
             event = queue.get()
+
+            if window > 0:
+                events = self._vm_status_coalesce(event, window, batch_size)
+            else:
+                events = [event]
+
             task_id = task_id_from_string(task_user)
-            logger.info('Creating task %s for event: "%s"', task_id, event)
-            # Create VM status task
-            send_task_forever(self.label, vm_status_task, args=(event, task_id), queue=Q_MGMT, expires=None,
-                              task_id=task_id)
+
+            if len(events) == 1:
+                logger.info('Creating task %s for event: "%s"', task_id, events[0])
+                # Create VM status task
+                send_task_forever(self.label, vm_status_task, args=(events[0], task_id), queue=Q_MGMT, expires=None,
+                                  task_id=task_id)
+            else:
+                logger.info('Creating task %s for %d events: "%s"', task_id, len(events), events)
+                # Create one VM status task for a batch of events
+                send_task_forever(self.label, vm_status_batch_task, args=(events, task_id), queue=Q_MGMT,
+                                  expires=None, task_id=task_id)
 
     def _vm_status_monitor(self, sysevent_stdout):
         """THREAD: Reads line by line from sysevent process and puts relevant VM status changes into queue"""
@@ -225,9 +272,26 @@ class MgmtDaemon(_PeriodicTaskDaemon):
     def __worker_status_monitor(self):
         # noinspection PyProtectedMember
         from api.node.status.tasks import node_worker_status_change
+        from que.utils import worker_alive, worker_dead  # Circular imports
+
+        liveness_ttl = self.app.conf.ERIGONES_WORKER_LIVENESS_TTL
+        liveness_refresh = liveness_ttl / 3.0
+        last_heartbeats = {}
+
+        def _worker_liveness(hostname, alive):
+            try:
+                if alive:
+                    worker_alive(hostname, timeout=liveness_ttl)
+                    last_heartbeats[hostname] = time()
+                else:
+                    worker_dead(hostname)
+                    last_heartbeats.pop(hostname, None)
+            except Exception as exc:
+                logger.error('Could not update worker liveness registry for worker %s: %s', hostname, exc)
 
         def _worker_state(hostname, status, event):
             logger.info('Received %s node worker status: %s', hostname, status)
+            _worker_liveness(hostname, status == 'online')
             queue, node_hostname = hostname.split('@')
 
             if queue != Q_MGMT:
@@ -242,12 +306,20 @@ class MgmtDaemon(_PeriodicTaskDaemon):
         def worker_lost(event):
             _worker_state(event['worker_hostname'], 'offline', event)
 
+        def worker_heartbeat(event):
+            hostname = event['hostname']
+
+            # Heartbeats are frequent -> refresh the liveness registry entry only a few times per TTL period
+            if time() - last_heartbeats.get(hostname, 0) >= liveness_refresh:
+                _worker_liveness(hostname, True)
+
         # Here we go
         with self.app.connection() as conn:
             recv = self.app.events.Receiver(conn, handlers={
                 'worker-online': worker_online,
                 'worker-offline': worker_offline,
                 'worker-lost': worker_lost,
+                'worker-heartbeat': worker_heartbeat,
             })
             recv.capture(limit=None, timeout=None, wakeup=False)
 
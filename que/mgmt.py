@@ -15,7 +15,7 @@ except ImportError:
 from que import Q_MGMT, TT_MGMT, TG_DC_BOUND
 from que.erigonesd import cq
 from que.lock import redis_set, NoLock, TaskLock
-from que.utils import task_id_from_request, queue_to_hostnames, ping
+from que.utils import task_id_from_request, queue_to_hostnames, ping_cached, task_done_notify
 from que.user_tasks import UserTasks
 
 
@@ -50,6 +50,11 @@ class MgmtCallbackTask(Task):
             self.logger.warning('Execution of mgmt callback task failed because of an operational error: %s', exc)
             self.retry(exc=exc)  # Will raise special exception
 
+    def after_return(self, status, retval, task_id, args, kwargs, einfo):
+        if status in states.READY_STATES:
+            # Callback tasks are called with (result, caller_task_id, ...) => the caller task is finished now, too
+            task_done_notify(task_id, *args[1:2])
+
 
 # noinspection PyAbstractClass
 class MgmtTask(Task):
@@ -99,6 +104,8 @@ class MgmtTask(Task):
             else:
                 self.logger.error('MgmtTask %s did not saved result in cache "%s"', task, cache_result)
 
+        task_done_notify(task_id)
+
     def call(self, request, owner_id, args, kwargs=None, meta=None, tt=TT_MGMT, tg=TG_DC_BOUND,
              tidlock=None, tidlock_timeout=None, cache_result=None, cache_timeout=None, expires=EXPIRES,
              nolog=False, ping_worker=True, check_user_tasks=True):
@@ -129,7 +136,7 @@ class MgmtTask(Task):
                     return None, None, res
 
         if ping_worker:
-            if not ping(Q_MGMT, timeout=ping_worker, count=2):
+            if not ping_cached(Q_MGMT, timeout=ping_worker, count=2):
                 return None, 'Task queue worker (%s) is not responding!' % queue_to_hostnames(Q_MGMT), None
 
         try:
@@ -20,7 +20,8 @@ from que.erigonesd import cq
 from que.lock import NoLock, TaskLock
 from que.exceptions import TaskRetry
 from que.user_tasks import UserTasks
-from que.utils import task_id_from_request, task_id_from_task_id, send_task_forever, queue_to_hostnames, ping
+from que.utils import (task_id_from_request, task_id_from_task_id, send_task_forever, queue_to_hostnames, ping_cached,
+                       task_done_notify)
 
 
 LOGTASK = cq.conf.ERIGONES_LOGTASK
@@ -92,6 +93,7 @@ class MetaTask(Task):
 
     def after_return(self, status, retval, task_id, args, kwargs, einfo):
         self.logger.debug('Task %s("%s") returned %s. Result: """%s"""', self.name, args, status, retval)
+        task_done_notify(task_id)
         meta = kwargs.get('meta', {})
         nolog = meta.get('nolog', False)
 
@@ -275,7 +277,7 @@ def execute(request, owner_id, cmd, stdin=None, meta=None, callback=None, lock=N
             queues = [queue]
 
         for q in queues:
-            if not ping(q, timeout=ping_worker, count=2):
+            if not ping_cached(q, timeout=ping_worker, count=2):
                 return None, 'Task queue worker (%s) is not responding!' % queue_to_hostnames(q)
 
     try:
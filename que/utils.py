@@ -14,7 +14,7 @@ from celery.app.control import flatten_reply
 
 from que import IMPORTANT, E_SHUTDOWN, Q_MGMT, TT_EXEC, TT_MGMT, TT_INTERNAL, TG_DC_BOUND, TT, TG
 from que.erigonesd import cq
-from que.lock import TaskLock
+from que.lock import KEY_PREFIX, TaskLock, redis, redis_set
 from que.user_tasks import UserTasks
 from que.exceptions import PingFailed, NodeError
 
@@ -24,6 +24,9 @@ TASK_USER = cq.conf.ERIGONES_TASK_USER
 DEFAULT_DC = cq.conf.ERIGONES_DEFAULT_DC
 DEFAULT_TASK_PREFIX = [None, TT_EXEC, '1', TG_DC_BOUND, DEFAULT_DC]
 
+WORKER_LIVENESS_KEY = KEY_PREFIX + 'worker-alive:%s'  # %s = worker hostname
+TASK_DONE_CHANNEL = KEY_PREFIX + 'task-done:%s'  # %s = task_id
+
 RE_TASK_PREFIX = re.compile(r'([a-zA-Z]+)')
 DEFAULT_FILE_READ_SIZE = 102400
 
@@ -489,6 +492,66 @@ def ping(queue, timeout=True, count=1, retry_wait=0.5):
     return pong
 
 
+def worker_alive(hostname, timeout=None):
+    """
+    Mark erigonesd worker as alive in the worker liveness registry (called for every worker heartbeat event).
+    """
+    if timeout is None:
+        timeout = cq.conf.ERIGONES_WORKER_LIVENESS_TTL
+
+    return redis_set(WORKER_LIVENESS_KEY % hostname, 1, timeout=timeout)
+
+
+def worker_dead(hostname):
+    """
+    Remove erigonesd worker from the worker liveness registry (called for worker offline/lost events).
+    """
+    return redis.delete(WORKER_LIVENESS_KEY % hostname)
+
+
+def ping_cached(queue, timeout=True, count=1, retry_wait=0.5):
+    """
+    Return list of alive erigonesd worker(s) according to queue. Use the worker liveness registry fed by worker
+    heartbeat events (que.bootsteps.MgmtDaemon) and fall back to ping() only if there is no fresh heartbeat.
+    """
+    workers = queue_to_hostnames(queue)
+
+    try:
+        alive = redis.mget([WORKER_LIVENESS_KEY % worker for worker in workers])
+    except Exception as ex:
+        logger.warning('Could not read worker liveness registry for task queue "%s": %s', queue, ex)
+    else:
+        pong = [worker for worker, last in zip(workers, alive) if last]
+
+        if pong:
+            return pong
+
+    pong = ping(queue, timeout=timeout, count=count, retry_wait=retry_wait)
+
+    for worker in pong:
+        try:
+            worker_alive(worker)
+        except Exception as ex:
+            logger.warning('Could not update worker liveness registry for worker "%s": %s', worker, ex)
+
+    return pong
+
+
+def task_done_notify(*task_ids):
+    """
+    Publish task completion notification (used by APISyncMiddleware to wake up waiting requests).
+    """
+    try:
+        pipe = redis.pipeline(transaction=False)
+
+        for task_id in task_ids:
+            pipe.publish(TASK_DONE_CHANNEL % task_id, 1)
+
+        pipe.execute()
+    except Exception as ex:
+        logger.warning('Could not publish task completion notification for tasks %s: %s', task_ids, ex)
+
+
 def worker_command(command, destination, **kwargs):
     """
     Synchronous node (celery panel) command.
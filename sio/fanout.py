@@ -0,0 +1,129 @@
+from logging import getLogger
+from time import time
+
+from django.core.cache import cache
+from django.utils.six import text_type
+from django.utils.translation import ugettext_lazy as _
+
+from que.tasks import cq
+from que.utils import get_callback, is_callback, is_logtask
+from api.status import HTTP_403_FORBIDDEN
+from api.task.permissions import IsUserTask
+from api.task.utils import get_task_status, get_task_result
+from gui.models import User
+
+logger = getLogger(__name__)
+
+
+class AdminRecipients(object):
+    """
+    Process-local cache of SuperAdmin + DcAdmin user IDs (recipients of all task events in a DC).
+    The cache is invalidated when the admin IDs version changes (see User.clear_dc_admin_ids() and
+    User.clear_super_admin_ids()) or after ttl seconds (cached admin IDs expire in the django cache too).
+    """
+    ttl = 60
+
+    def __init__(self):
+        self._version = None
+        self._expires = 0
+        self._admins = {}
+
+    def _check(self):
+        version = User.get_admin_ids_version()
+        now = time()
+
+        if version != self._version or now > self._expires:
+            self._version = version
+            self._expires = now + self.ttl
+            self._admins = {}
+
+    def get(self, dc_id):
+        """Return frozenset of SuperAdmin and DcAdmin user IDs"""
+        self._check()
+
+        try:
+            return self._admins[dc_id]
+        except KeyError:
+            admins = frozenset(User.get_super_admin_ids() | User.get_dc_admin_ids(dc_id=dc_id))
+            self._admins[dc_id] = admins
+            logger.debug('Loaded admin IDs for DC %s into process cache: %s', dc_id, admins)
+            return admins
+
+
+class TaskEventPayload(object):
+    """
+    Task information shared by all socket.io sessions receiving one que event. Everything is resolved lazily by the
+    first session, which needs it, so a task event causes at most one result backend read per task and one apiview
+    cache read regardless of the number of connected sessions. Task permissions are checked for every session.
+    """
+    __slots__ = ('task_id', '_target', '_apiview', '_status')
+
+    def __init__(self, task_id):
+        self.task_id = task_id
+        self._target = None
+        self._apiview = None
+        self._status = {}
+
+    def __repr__(self):
+        return '<TaskEventPayload: %s>' % self.task_id
+
+    def _resolve_target(self):
+        task = cq.AsyncResult(self.task_id)
+
+        if get_callback(task):
+            return None, 'it has a callback'
+
+        parent_task_id = is_callback(task)
+
+        if parent_task_id:
+            return parent_task_id, None
+        elif is_logtask(task):
+            return None, 'it is a logtask without caller'
+
+        return self.task_id, None
+
+    @property
+    def target(self):
+        """Tuple of (task ID used for task status or None if the event should be ignored, reason of ignoring)"""
+        if self._target is None:
+            self._target = self._resolve_target()
+
+        return self._target
+
+    @property
+    def apiview(self):
+        """The apiview information of the target task stored in cache by the API"""
+        if self._apiview is None:
+            apiview = None
+            task_id = self.target[0]
+
+            if task_id:
+                # noinspection PyBroadException
+                try:
+                    apiview = cache.get('sio-' + task_id)
+                except Exception:
+                    pass
+
+            self._apiview = apiview or {}
+
+        return self._apiview
+
+    @staticmethod
+    def has_permission(request, task_id):
+        """The IsUserTask permission check of api.task.views.task_status done for one socket.io session request"""
+        request.dc_user_permissions = request.dc.get_user_permissions(request.user)
+
+        return bool(IsUserTask(request, None, (), {'task_id': task_id}))
+
+    def get_status(self, request, task_id):
+        """Return tuple (result, status_code) - same as the data and status code of api.task.views.task_status.
+        The task status is shared by all sessions, but the permission check is done for every session request"""
+        if not self.has_permission(request, task_id):
+            logger.warning('User "%s" is not allowed to get status of task %s', request.user, task_id)
+            return {'detail': text_type(_('Permission denied'))}, HTTP_403_FORBIDDEN
+
+        try:
+            return self._status[task_id]
+        except KeyError:
+            self._status[task_id] = res = get_task_status(task_id, get_task_result)
+            return res
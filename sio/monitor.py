@@ -6,7 +6,7 @@ from django.utils.six import itervalues
 
 from que.erigonesd import cq
 from que.utils import user_owner_dc_ids_from_task_id
-from gui.models import User
+from sio.fanout import AdminRecipients, TaskEventPayload
 from api.exceptions import OPERATIONAL_ERRORS
 
 
@@ -25,6 +25,7 @@ def que_monitor(app, _info=print, _debug=print):
 
     log('Starting dedicated que event monitor')
     internal_id = app.conf.ERIGONES_TASK_USER
+    admin_recipients = AdminRecipients()
 
     def _announce_task(event, event_status):
         task_id = event['uuid']
@@ -45,17 +46,18 @@ def que_monitor(app, _info=print, _debug=print):
             users = set(session[0] for session in itervalues(ACTIVE_USERS))
         else:
             # Send signal to all affected users
-            users = User.get_super_admin_ids()  # SuperAdmins
-            users.update(User.get_dc_admin_ids(dc_id=dc_id))  # DcAdmins
+            users = set(admin_recipients.get(dc_id))  # SuperAdmins + DcAdmins
             users.add(int(user_id))  # TaskCreator
             users.add(int(owner_id))  # ObjectOwner
 
         debug('Sending signal for %s task %s to %s', event_status, task_id, users)
+        # Task status is resolved only once and shared by all sessions
+        payload = TaskEventPayload(task_id)
 
         # Signal!
         for i in users:
             new_task = signal('task-for-%s' % i)
-            new_task.send(event, task_id=task_id, event_status=event_status)
+            new_task.send(event, task_id=task_id, event_status=event_status, payload=payload)
 
     def announce_fail_tasks(event):
         _announce_task(event, 'failed')
@@ -1,6 +1,5 @@
 from socketio.namespace import BaseNamespace
 from logging import getLogger, DEBUG, INFO, ERROR, WARNING
-from django.core.cache import cache
 from blinker import signal
 from gevent import sleep
 from collections import deque
@@ -9,10 +8,10 @@ from django.db import close_old_connections
 from django.utils.six import iteritems
 
 from que import TT_MGMT, TT_INTERNAL, TG_DC_UNBOUND
-from que.utils import task_prefix_from_task_id, task_id_from_request, get_callback, is_callback, is_logtask
-from que.tasks import cq
+from que.utils import task_prefix_from_task_id, task_id_from_request
 from api.utils.views import INTERNAL_API_KWARGS, call_api_view
 from gui.accounts.utils import get_client_ip
+from sio.fanout import TaskEventPayload
 
 import api.task.views
 import api.vm.views
@@ -110,9 +109,6 @@ class APINamespace(BaseNamespace):
         request.method = method
         return request
 
-    def _api_task_status(self, task_id):
-        return call_api_view(self.get_request('GET'), None, api.task.views.task_status, task_id=task_id)
-
     def _call_api_view(self, method, viewspace, view, args, kwargs):
         kwargs = dict(kwargs)
         args = list(args)
@@ -218,7 +214,7 @@ class APINamespace(BaseNamespace):
             self.log('Running internal method %s(%s, %s) ', sender, task_id, kwargs)
             fun(task_id, **kwargs)
 
-    def _task_sent(self, task_id, event_status, event, tt):
+    def _task_sent(self, task_id, event_status, event, tt, payload):
         if task_id in self.last_tasks:
             self.log('Ignoring new task %s, because we already know (2)', task_id, level=DEBUG)
             return
@@ -227,45 +223,29 @@ class APINamespace(BaseNamespace):
             return
 
         self.last_tasks.append(task_id)
-        r = self._api_task_status(task_id)
+        result, status_code = payload.get_status(self.get_request('GET'), task_id)
         self.log('Task %s %s', task_id, event_status)
-        self.emit('message', event['view'], event['method'], r.status_code, r.data, event['args'], event['kwargs'],
+        self.emit('message', event['view'], event['method'], status_code, result, event['args'], event['kwargs'],
                   event['apiview'], event['apidata'])
 
-    def _task_status(self, task_id, event_status, tt):
+    def _task_status(self, task_id, event_status, tt, payload):
         if tt == TT_MGMT and task_id not in self.last_tasks:
             self.log('Ignoring mgmt task %s, because we never called it', task_id, level=DEBUG)
             return
 
-        task = cq.AsyncResult(task_id)
-
-        if get_callback(task):
-            self.log('Ignoring task %s, because it has a callback', task_id, level=DEBUG)
-            return
-
-        parent_task_id = is_callback(task)
+        target_task_id, reason = payload.target
 
-        if parent_task_id:
-            _task_id = task_id
-            task_id = parent_task_id
-            self.log('Changing task %s to %s, because it is a callback', _task_id, task_id, level=DEBUG)
-        elif is_logtask(task):
-            self.log('Ignoring task %s, because it is a logtask without caller', task_id)
+        if not target_task_id:
+            self.log('Ignoring task %s, because %s', task_id, reason, level=DEBUG)
             return
 
-        # Try to get the apiview information from cache
-        apiview = None
-        # noinspection PyBroadException
-        try:
-            apiview = cache.get('sio-' + task_id)
-        except Exception:
-            pass
-        if not apiview:
-            apiview = {}
+        if target_task_id != task_id:
+            self.log('Changing task %s to %s, because it is a callback', task_id, target_task_id, level=DEBUG)
+            task_id = target_task_id
 
-        res = self._api_task_status(task_id)
+        result, _ = payload.get_status(self.get_request('GET'), task_id)
         self.log('Task %s %s', task_id, event_status)
-        self.emit('task_status', res.data, apiview)
+        self.emit('task_status', result, payload.apiview)
 
     def _task_event(self, task_id, event_result):
         # Rename node_hostname or vm_hostname to hostname (because worker hostname is not needed)
@@ -290,7 +270,7 @@ class APINamespace(BaseNamespace):
 
         # noinspection PyUnusedLocal
         @new_task.connect
-        def process_task(sender, task_id=None, event_status=None, **kwargs):
+        def process_task(sender, task_id=None, event_status=None, payload=None, **kwargs):
             self.log('Got signal for %s task %s', event_status, task_id, level=DEBUG)
             task_prefix = task_prefix_from_task_id(task_id)
 
@@ -298,14 +278,18 @@ class APINamespace(BaseNamespace):
                 self.log('Ignoring dc-bound task %s, because user works in DC %s', task_id, self.dc_id)
                 return
 
-            if event_status == 'sent':
-                self._task_sent(task_id, event_status, sender, task_prefix[1])
-            elif event_status == 'event':
+            if event_status == 'event':
                 self._task_event(task_id, sender)
             elif event_status == 'internal':
                 self._task_internal(task_id, sender, **kwargs)
             else:
-                self._task_status(task_id, event_status, task_prefix[1])
+                if payload is None:
+                    payload = TaskEventPayload(task_id)
+
+                if event_status == 'sent':
+                    self._task_sent(task_id, event_status, sender, task_prefix[1], payload)
+                else:
+                    self._task_status(task_id, event_status, task_prefix[1], payload)
 
         self.log('Ready')
         self.set_active_user()
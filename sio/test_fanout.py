@@ -0,0 +1,56 @@
+from unittest import TestCase
+
+from que.utils import task_id_from_string
+from sio.fanout import TaskEventPayload
+from vms.models import DefaultDc
+
+
+class FakeUser(object):
+    def __init__(self, user_id, admin=False):
+        self.id = user_id
+        self.admin = admin
+
+    def __str__(self):
+        return 'user%s' % self.id
+
+    def is_authenticated(self):
+        return True
+
+    def get_dc_permissions(self, dc):
+        return frozenset()
+
+    def is_admin(self, request, dc=None):
+        return self.admin
+
+
+class FakeRequest(object):
+    def __init__(self, user):
+        self.user = user
+        self.dc = DefaultDc()
+
+
+class TaskEventPayloadTests(TestCase):
+    status = ({'status': 'SUCCESS', 'result': {'message': 'ok'}}, 200)
+
+    def setUp(self):
+        self.task_id = task_id_from_string(100001, dc_id=DefaultDc().id)
+        self.payload = TaskEventPayload(self.task_id)
+        self.payload._status[self.task_id] = self.status  # Do not touch the result backend
+
+    def test_get_status_task_creator(self):
+        self.assertEqual(self.payload.get_status(FakeRequest(FakeUser(100001)), self.task_id), self.status)
+
+    def test_get_status_admin(self):
+        self.assertEqual(self.payload.get_status(FakeRequest(FakeUser(100002, admin=True)), self.task_id), self.status)
+
+    def test_get_status_permission_denied(self):
+        result, status_code = self.payload.get_status(FakeRequest(FakeUser(100002)), self.task_id)
+        self.assertEqual(status_code, 403)
+        self.assertNotIn('result', result)
+        # The shared status is still available for other sessions
+        self.assertEqual(self.payload.get_status(FakeRequest(FakeUser(100001)), self.task_id), self.status)
+
+    def test_get_status_invalid_task_id(self):
+        task_id = 'invalid-task-id'
+        self.payload._status[task_id] = self.status
+        self.assertEqual(self.payload.get_status(FakeRequest(FakeUser(100001)), task_id)[1], 403)
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+import vms.models.fields
+
+
+# The jsonb columns are nullable, so adding them does not rewrite the tables.
+# Existing rows are converted online by the "json_storage convert" management command.
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vms', '0008_vm_hvm_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dc',
+            name='json_data',
+            field=vms.models.fields.JSONBField(default=None, null=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='node',
+            name='json_data',
+            field=vms.models.fields.JSONBField(default=None, null=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='vm',
+            name='json_data',
+            field=vms.models.fields.JSONBField(default=None, null=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='vm',
+            name='json_active_data',
+            field=vms.models.fields.JSONBField(default=None, null=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='vm',
+            name='info_data',
+            field=vms.models.fields.JSONBField(default=None, null=True, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('vms', '0009_jsonb_data'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='backup',
+            name='checksum',
+            field=models.CharField(max_length=160, verbose_name='Checksum', blank=True),
+        ),
+    ]
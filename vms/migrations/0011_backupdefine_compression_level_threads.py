@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('vms', '0010_backup_checksum'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backupdefine',
+            name='compression_level',
+            field=models.SmallIntegerField(null=True, verbose_name='Compression level', blank=True),
+        ),
+        migrations.AddField(
+            model_name='backupdefine',
+            name='compression_threads',
+            field=models.SmallIntegerField(null=True, verbose_name='Compression threads', blank=True),
+        ),
+        migrations.AlterField(
+            model_name='backupdefine',
+            name='compression',
+            field=models.SmallIntegerField(default=0, verbose_name='Compression',
+                                           choices=[(0, 'None'), (1, 'gzip'), (2, 'bzip2'), (3, 'xz'), (4, 'zstd')]),
+        ),
+    ]
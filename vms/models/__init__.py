@@ -1,5 +1,5 @@
 from __future__ import absolute_import
-from django.db.models.signals import post_delete, post_save
+from django.db.models.signals import pre_delete, post_delete, post_save, m2m_changed
 
 from vms.models.dc import Dc, DummyDc, DefaultDc, DomainDc  # noqa: F401
 from vms.models.storage import Storage, NodeStorage  # noqa: F401
@@ -16,6 +16,7 @@ from vms.models.ipaddress import IPAddress  # noqa: F401
 from vms.models.tasklog import TaskLogEntry  # noqa: F401
 from vms.models.backup import BackupDefine, Backup  # noqa: F401
 from pdns.models import Domain  # noqa: F401
+from gui.models.permission_matrix import PermissionMatrix
 
 TASK_MODELS = (Image, Vm, Node, NodeStorage, Dc)  # The order here is important!
 STATUS_MODELS = (Node, Vm, Snapshot, Backup)
@@ -35,3 +36,9 @@ post_delete.connect(DomainDc.domain_post_delete, sender=Domain, dispatch_uid='po
 
 post_save.connect(Subnet.post_save_subnet, sender=Subnet, dispatch_uid='post_save_subnet')
 post_delete.connect(Subnet.post_delete_subnet, sender=Subnet, dispatch_uid='post_delete_subnet')
+
+post_save.connect(IPAddress.post_save, sender=IPAddress, dispatch_uid='post_save_ipaddress')
+m2m_changed.connect(IPAddress.vms_changed, sender=IPAddress.vms.through, dispatch_uid='m2m_changed_ipaddress_vms')
+pre_delete.connect(IPAddress.pre_delete_vm, sender=Vm, dispatch_uid='pre_delete_vm_ipaddress')
+post_delete.connect(IPAddress.post_delete_vm, sender=Vm, dispatch_uid='post_delete_vm_ipaddress')
+m2m_changed.connect(PermissionMatrix.m2m_changed, sender=Dc.roles.through, dispatch_uid='m2m_changed_dc_roles')
@@ -28,11 +28,13 @@ class BackupDefine(_VmDiskModel, _ScheduleModel):
     GZIP = 1
     BZIP2 = 2
     XZ = 3
+    ZSTD = 4
     COMPRESSION = (
         (NONE, _('None')),
         (GZIP, 'gzip'),
         (BZIP2, 'bzip2'),
         (XZ, 'xz'),
+        (ZSTD, 'zstd'),
     )
 
     FILE_SUFFIX = frozendict({
@@ -40,6 +42,14 @@ class BackupDefine(_VmDiskModel, _ScheduleModel):
         GZIP: 'zfs.gz',
         BZIP2: 'zfs.bz2',
         XZ: 'zfs.xz',
+        ZSTD: 'zfs.zst',
+    })
+
+    COMPRESSION_LEVELS = frozendict({  # (min, max)
+        GZIP: (1, 9),
+        BZIP2: (1, 9),
+        XZ: (0, 9),
+        ZSTD: (1, 19),
     })
 
     # id (implicit), Inherited: disk_id, schedule (property), active (property)
@@ -52,6 +62,8 @@ class BackupDefine(_VmDiskModel, _ScheduleModel):
     bwlimit = models.IntegerField(_('Bandwidth limit'), blank=True, null=True)  # bytes
     retention = models.IntegerField(_('Retention'))  # max count
     compression = models.SmallIntegerField(_('Compression'), choices=COMPRESSION, default=NONE)
+    compression_level = models.SmallIntegerField(_('Compression level'), blank=True, null=True)
+    compression_threads = models.SmallIntegerField(_('Compression threads'), blank=True, null=True)  # 0 = all CPUs
     fsfreeze = models.BooleanField(_('Application-Consistent?'), default=False)
 
     class Meta:
@@ -74,6 +86,8 @@ class BackupDefine(_VmDiskModel, _ScheduleModel):
             'type': self.type,
             'bwlimit': self.bwlimit,
             'compression': self.compression,
+            'compression_level': self.compression_level,
+            'compression_threads': self.compression_threads,
             'schedule': self.schedule,
             'retention': self.retention,
             'active': self.active,
@@ -132,7 +146,7 @@ class Backup(_VmDiskModel, _StatusModel, _JsonPickleModel):
     status = models.SmallIntegerField(_('Status'), choices=STATUS)
     file_path = models.CharField(_('File path'), max_length=255, blank=True)
     manifest_path = models.CharField(_('Manifest path'), max_length=255, blank=True)
-    checksum = models.CharField(_('Checksum'), max_length=40, blank=True)
+    checksum = models.CharField(_('Checksum'), max_length=160, blank=True)  # [algorithm:]hexdigest
     node = models.ForeignKey(Node, verbose_name=_('Node'))
     zpool = models.ForeignKey(NodeStorage, verbose_name=_('Zpool'))
     type = models.SmallIntegerField(_('Type'), choices=TYPE)
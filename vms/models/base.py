@@ -1,16 +1,19 @@
 import re
 
+from django.conf import settings
 from django.db import models, transaction
 from django.utils import timezone
-from django.utils.six import iteritems, with_metaclass
+from django.utils.six import iteritems, with_metaclass, integer_types, string_types, binary_type
 from django.utils.translation import ugettext_lazy as _
 from django.core.cache import cache
 from django.core.exceptions import SuspiciousOperation
 from django.contrib.contenttypes.models import ContentType
 from djcelery.models import PeriodicTask, CrontabSchedule
 
+from threading import local
 import base64
 import copy
+import math
 
 try:
     # noinspection PyPep8Naming
@@ -104,17 +107,61 @@ class _DummyDataModel(with_metaclass(_DummyModelBase)):
         self._data.update(data)
 
 
+class _DecodeCounter(local):
+    """
+    Number of pickle decodes performed in current thread (request). Reset by gui.middleware.DebugMiddleware.
+    """
+    count = 0
+
+    def reset(self):
+        count, self.count = self.count, 0
+        return count
+
+
+decode_counter = _DecodeCounter()
+
+
 class _PickleModel(models.Model):
     """
     Abstract class with pickle encoding and decoding of field attributes.
+
+    Decoded objects are cached per model instance (see _decode_field()) and the cache entry is valid as long as the
+    encoded field value does not change. The cache stores a binary pickle of the decoded object, so every caller gets
+    its own copy, which can be modified in place (changes are saved only when assigned back through the setter).
+
+    Descendant models can store the same data in native PostgreSQL jsonb columns (see _jsonb_fields). The storage
+    mode is controlled by the VMS_JSON_STORAGE setting:
+        - pickle: read and write only the encoded (pickled) fields; jsonb columns are cleared on write,
+        - dual: read the jsonb column (fallback to the encoded field if not converted yet) and write both,
+        - jsonb: read the jsonb column (fallback to the encoded field if not converted yet) and write only jsonb.
+    Objects written into jsonb columns may contain only JSON types (see _jsonb_copy()); other values (e.g. tuples)
+    are rejected instead of being silently converted, so switching the storage mode does not change the data.
     """
+    STORAGE_PICKLE = 'pickle'
+    STORAGE_DUAL = 'dual'
+    STORAGE_JSONB = 'jsonb'
+
+    _jsonb_fields = {}  # {encoded_field_name: jsonb_field_name}
+    _pickle_cache = None  # {field_name: (encoded_data, binary pickle of decoded_data)}
+
     class Meta:
         app_label = 'vms'
         abstract = True
 
+    def __reduce__(self):
+        """Do not store the decoded objects cache when pickling the model instance"""
+        model_unpickle, args, data = super(_PickleModel, self).__reduce__()
+
+        if '_pickle_cache' in data:
+            data = data.copy()
+            del data['_pickle_cache']
+
+        return model_unpickle, args, data
+
     @staticmethod
     def _decode(xdata):
         """Unpickle data from DB and return a PickleDict object"""
+        decode_counter.count += 1
         data = pickle.loads(base64.decodestring(xdata))
         if not isinstance(data, PickleDict):
             data = PickleDict(data)
@@ -127,6 +174,126 @@ class _PickleModel(models.Model):
             raise ValueError('json is not a dict')
         return base64.encodestring(pickle.dumps(copy.copy(dict(xdata))))
 
+    @staticmethod
+    def _jsonb_text(value, path):
+        """Return unicode string (as returned from the jsonb column)"""
+        if isinstance(value, binary_type):
+            try:
+                return value.decode('utf-8')
+            except UnicodeDecodeError:
+                raise ValueError('%s contains a non UTF-8 string' % path)
+        return value
+
+    @classmethod
+    def _jsonb_copy(cls, value, path='json'):
+        """Return a deep copy of a JSON value. Raise ValueError for values, which would be changed or rejected by the
+        JSON encoder (tuples, non-string dict keys, non-finite floats and other non-JSON types)"""
+        if isinstance(value, dict):
+            data = {}
+
+            for key, val in iteritems(value):
+                if not isinstance(key, string_types):
+                    raise ValueError('%s contains a non-string key %r' % (path, key))
+                data[cls._jsonb_text(key, path)] = cls._jsonb_copy(val, '%s[%r]' % (path, key))
+
+            return data
+        elif isinstance(value, list):
+            return [cls._jsonb_copy(val, '%s[%d]' % (path, i)) for i, val in enumerate(value)]
+        elif isinstance(value, string_types):
+            return cls._jsonb_text(value, path)
+        elif value is None or isinstance(value, integer_types):  # bool is a subclass of int
+            return value
+        elif isinstance(value, float) and not (math.isnan(value) or math.isinf(value)):
+            return value
+
+        raise ValueError('%s contains a non-JSON value %r (%s)' % (path, value, type(value).__name__))
+
+    @classmethod
+    def _encode_jsonb(cls, xdata):
+        """Return a (deep) copy of a dict object, which can be saved in a jsonb DB column"""
+        if not isinstance(xdata, dict):
+            raise ValueError('json is not a dict')
+        return PickleDict(cls._jsonb_copy(xdata))
+
+    def _decode_field(self, field):
+        """Return decoded object from encoded field (or from its jsonb field). Every call returns a new object.
+        Use a copy of the cached object if the stored field value has not changed"""
+        jsonb_field = self._jsonb_fields.get(field, None)
+        xdata = None
+
+        if jsonb_field and settings.VMS_JSON_STORAGE != self.STORAGE_PICKLE:
+            xdata = getattr(self, jsonb_field)
+
+        if xdata is None:  # Not converted rows are read from the encoded field
+            xdata = getattr(self, field)
+            decode = self._decode
+        else:
+            decode = None  # jsonb column data are already decoded, but must not be shared
+
+        if self._pickle_cache is None:
+            self._pickle_cache = {}
+        else:
+            try:
+                cached_xdata, bdata = self._pickle_cache[field]
+            except KeyError:
+                pass
+            else:
+                if cached_xdata is xdata:  # The field value is replaced (never modified in place) by the setter
+                    return pickle.loads(bdata)
+
+        if decode:
+            data = decode(xdata)
+            bdata = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+        else:
+            bdata = pickle.dumps(xdata, pickle.HIGHEST_PROTOCOL)
+            data = pickle.loads(bdata)
+
+        self._pickle_cache[field] = (xdata, bdata)
+
+        return data
+
+    def _encode_field(self, field, data):
+        """Encode data into field (and/or jsonb field) and invalidate the decoded object cache"""
+        jsonb_field = self._jsonb_fields.get(field, None)
+        storage = settings.VMS_JSON_STORAGE
+
+        if jsonb_field:
+            if storage == self.STORAGE_PICKLE:
+                setattr(self, jsonb_field, None)  # Do not leave outdated data in the jsonb column
+            else:
+                setattr(self, jsonb_field, self._encode_jsonb(data))
+
+                if storage == self.STORAGE_JSONB:
+                    data = {}
+
+        setattr(self, field, self._encode(data))
+        self._clear_pickle_cache(field)
+
+    @classmethod
+    def _get_update_fields(cls, update_fields):
+        """Add jsonb fields to update_fields if their encoded fields are being saved"""
+        return list(update_fields) + [cls._jsonb_fields[i] for i in update_fields if i in cls._jsonb_fields]
+
+    def save(self, *args, **kwargs):
+        """Save jsonb fields together with encoded fields"""
+        if self._jsonb_fields and kwargs.get('update_fields', None):
+            kwargs['update_fields'] = self._get_update_fields(kwargs['update_fields'])
+
+        return super(_PickleModel, self).save(*args, **kwargs)
+
+    def _clear_pickle_cache(self, *fields):
+        """Remove decoded objects of fields (or all decoded objects) from cache"""
+        if self._pickle_cache:
+            if fields:
+                for field in fields:
+                    self._pickle_cache.pop(field, None)
+            else:
+                self._pickle_cache.clear()
+
+    def refresh_from_db(self, *args, **kwargs):
+        self._clear_pickle_cache()
+        return super(_PickleModel, self).refresh_from_db(*args, **kwargs)
+
 
 class _JsonPickleModel(_PickleModel):
     """
@@ -146,15 +313,24 @@ class _JsonPickleModel(_PickleModel):
     # json is the dict which will be used for creating/updating the VM on SmartOS
     @property
     def json(self):
-        return self._decode(self.enc_json)
+        return self._decode_field('enc_json')
 
     @json.setter
     def json(self, data):
-        self.enc_json = self._encode(data)
+        self._encode_field('enc_json', data)
+
+    def _json_copy(self, metadata=None):
+        """Return shallow copy of json (and a copy of json[metadata] object), which can be updated in place"""
+        _json = PickleDict(self.json)
+
+        if metadata and metadata in _json:
+            _json[metadata] = dict(_json[metadata])
+
+        return _json
 
     def save_item(self, key, value, save=True, metadata=None, **kwargs):
         """Set one item in json"""
-        _json = self.json
+        _json = self._json_copy(metadata=metadata)
 
         if metadata:
             if metadata not in _json:
@@ -172,7 +348,7 @@ class _JsonPickleModel(_PickleModel):
 
     def save_items(self, save=True, metadata=None, **key_value):
         """Save multiple items in json"""
-        _json = self.json
+        _json = self._json_copy(metadata=metadata)
 
         if metadata:
             if metadata not in _json:
@@ -190,7 +366,7 @@ class _JsonPickleModel(_PickleModel):
 
     def delete_item(self, key, save=True, metadata=None, **kwargs):
         """Set one item in json"""
-        _json = self.json
+        _json = self._json_copy(metadata=metadata)
 
         try:
             if metadata:
@@ -1,15 +1,178 @@
+import os
+import copy
+from collections import OrderedDict
+from logging import getLogger
+from threading import Thread, Lock
+from time import time, sleep
+
 from django.db import models
-from django.core.cache import cache
+from django.core.cache import cache, caches
 from django.utils.functional import curry
 
+logger = getLogger(__name__)
 
 CACHE_MODEL_TIMEOUT = None  # None means never
+CACHE_MODEL_FLUSH_CHANNEL = 'cache-model-flush'
+
+
+class LocalModelCache(object):
+    """
+    Process-local (L1) cache of model objects in front of the django cache (L2) used by CacheManager.get_by_*().
+
+    Objects are stored by their cache key for at most ttl seconds and the number of objects is bounded (LRU).
+    _CacheModel.flush_cache() publishes the flushed cache keys into a redis pub/sub channel, which is read by a
+    listener thread (greenlet when running under gevent) in every process. Callers get a shallow copy of the cached
+    object, so changing object attributes does not affect the cached object (json attributes are never shared,
+    because _PickleModel returns a new decoded object on every access). The OrderedDict is shared by request
+    threads and the listener thread and is therefore modified only while holding _lock.
+    """
+    maxsize = 512
+    ttl = 60
+
+    def __init__(self):
+        self._data = OrderedDict()  # {key: (expires, obj)}
+        self._stats = {}  # {model name: [hits, misses]}
+        self._lock = Lock()
+        self._pid = None
+        self._listener = None
+
+    @property
+    def redis(self):
+        return caches['redis'].master_client
+
+    @property
+    def channel(self):
+        return '%s:%s:%s' % (cache.key_prefix, cache.version, CACHE_MODEL_FLUSH_CHANNEL)
+
+    def _listen(self):
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+
+        try:
+            pubsub.subscribe(self.channel)
+            self.clear()  # Objects could have been flushed before we subscribed
+
+            for msg in pubsub.listen():
+                if msg['type'] == 'message':
+                    self.delete(msg['data'])
+        finally:
+            pubsub.close()
+
+    def _run(self):
+        while True:
+            try:
+                self._listen()
+            except Exception as exc:
+                logger.error('Model cache flush listener failed (%s). Restarting in 5 seconds...', exc)
+                self.clear()
+                sleep(5)
+
+    def _ensure_listener(self):
+        """Start the flush listener (once per process - the cache is not valid in a forked process)"""
+        pid = os.getpid()
+
+        if self._pid == pid:
+            return
+
+        with self._lock:
+            if self._pid != pid:
+                self._data.clear()
+                self._listener = Thread(target=self._run, name='LocalModelCache')
+                self._listener.daemon = True
+                self._listener.start()
+                self._pid = pid
+
+    @staticmethod
+    def _copy(obj):
+        obj = copy.copy(obj)
+        # noinspection PyProtectedMember
+        obj._state = copy.copy(obj._state)
+
+        if getattr(obj, '_pickle_cache', None) is not None:  # Cached binary pickles can be reused (see _PickleModel)
+            obj._pickle_cache = obj._pickle_cache.copy()
+
+        return obj
+
+    def _count(self, model, hit):
+        try:
+            stats = self._stats[model]
+        except KeyError:
+            stats = self._stats[model] = [0, 0]
+
+        if hit:
+            stats[0] += 1
+        else:
+            stats[1] += 1
+
+    def get(self, key, model):
+        """Return copy of cached object or None"""
+        self._ensure_listener()
+
+        with self._lock:
+            try:
+                expires, obj = self._data.pop(key)
+            except KeyError:
+                obj = None
+            else:
+                if time() < expires:
+                    self._data[key] = (expires, obj)  # Move to the end (most recently used)
+                else:
+                    obj = None
+
+        self._count(model, obj is not None)
+
+        if obj is None:
+            return None
+
+        return self._copy(obj)
+
+    def set(self, key, obj):
+        item = (time() + self.ttl, self._copy(obj))
+
+        with self._lock:
+            self._data[key] = item
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def publish_flush(self, keys):
+        """Remove keys from L1 caches in all processes"""
+        for key in keys:
+            self.delete(key)
+
+        try:
+            pipe = self.redis.pipeline()
+
+            for key in keys:
+                pipe.publish(self.channel, key)
+
+            pipe.execute()
+        except Exception as exc:
+            logger.error('Could not publish model cache flush of %s (%s)', keys, exc)
+
+    def get_stats(self):
+        """Return dict of hit/miss counters per model and the current number of cached objects"""
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'models': {model: {'hits': hits, 'misses': misses} for model, (hits, misses) in self._stats.items()},
+        }
+
+
+local_model_cache = LocalModelCache()
 
 
 class CacheManager(models.Manager):
     """
     Like the classic Manager but with get_by_FOO() method(s), which try
-    to retrieve the object primary from cache and secondary from DB.
+    to retrieve the object primary from process-local cache, secondary from cache and then from DB.
     """
     def __init__(self, cache_fields=()):
         super(CacheManager, self).__init__()
@@ -21,6 +184,10 @@ class CacheManager(models.Manager):
 
     def _get_by(self, field, value, timeout=CACHE_MODEL_TIMEOUT):
         key = self.model.cache_key(field, value)
+        res = local_model_cache.get(key, self.model.__name__)
+
+        if res is not None:
+            return res
 
         try:
             res = cache.get(key)
@@ -31,6 +198,8 @@ class CacheManager(models.Manager):
             res = self.get(**{field: value})
             cache.set(key, res, timeout)
 
+        local_model_cache.set(key, res)
+
         return res
 
 
@@ -50,8 +219,12 @@ class _CacheModel(models.Model):
         return cls.__name__ + '_' + field + ':' + str(value)
 
     def flush_cache(self):
-        for i in self.cache_fields:
-            cache.delete(self.cache_key(i, getattr(self, i)))
+        keys = [self.cache_key(i, getattr(self, i)) for i in self.cache_fields]
+
+        for key in keys:
+            cache.delete(key)
+
+        local_model_cache.publish_flush(keys)
 
     def save(self, *args, **kwargs):
         self.flush_cache()
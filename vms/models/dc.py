@@ -1,16 +1,85 @@
+from logging import getLogger
+from time import time
+
 from django.utils.translation import ugettext_lazy as _
 from django.conf import settings
-from django.db import models
+from django.db import models, connection
 from django.core.cache import cache
 
 # noinspection PyProtectedMember
 from gui.mixins import _AclMixin
-from vms.utils import DefAttrDict
+from vms.utils import DefAttrDict, FrozenDefAttrDict
 # noinspection PyProtectedMember
 from vms.models.base import _VirtModel, _JsonPickleModel, _UserTasksModel
+from vms.models.fields import JSONBField
 # noinspection PyProtectedMember
 from vms.models.cache import _CacheModel, CacheManager
 
+logger = getLogger(__name__)
+
+
+class DcSettings(object):
+    """
+    Process-local immutable snapshots of datacenter settings keyed by DC ID, so that reading dc.settings does not
+    decode the Dc.json blob on every access. A snapshot is valid while the DC settings version stored in cache is
+    unchanged (the version is bumped when a Dc.save() with modified json is committed). The version is checked at most
+    once per check_interval seconds and a snapshot is reloaded from DB after ttl seconds regardless of the version.
+    """
+    VERSION_KEY = 'dc-settings-version:%s'  # %s = dc.id
+    check_interval = 1
+    ttl = 300
+    _snapshots = {}  # {dc_id: (version, expires, snapshot)}
+    _checked = {}  # {dc_id: time of next version check}
+
+    @classmethod
+    def get_version(cls, dc_id):
+        return cache.get(cls.VERSION_KEY % dc_id, 0)
+
+    @classmethod
+    def bump_version(cls, dc_id):
+        """Invalidate settings snapshots of a DC in all processes"""
+        cls.invalidate(dc_id)
+        key = cls.VERSION_KEY % dc_id
+
+        try:
+            return cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+            return 1
+
+    @classmethod
+    def invalidate(cls, dc_id):
+        """Drop the local settings snapshot of a DC"""
+        cls._snapshots.pop(dc_id, None)
+        cls._checked.pop(dc_id, None)
+
+    @classmethod
+    def _load(cls, dc_id):
+        custom_settings = Dc.objects.get(pk=dc_id).custom_settings
+        logger.debug('Loaded settings snapshot for DC %s', dc_id)
+
+        return FrozenDefAttrDict(custom_settings, defaults=settings)
+
+    @classmethod
+    def get(cls, dc_id):
+        """Return immutable settings snapshot of a DC"""
+        now = time()
+        entry = cls._snapshots.get(dc_id, None)
+
+        if entry and now < cls._checked.get(dc_id, 0):
+            return entry[2]
+
+        version = cls.get_version(dc_id)
+        cls._checked[dc_id] = now + cls.check_interval
+
+        if entry and entry[0] == version and now < entry[1]:
+            return entry[2]
+
+        snapshot = cls._load(dc_id)
+        cls._snapshots[dc_id] = (version, now + cls.ttl, snapshot)
+
+        return snapshot
+
 
 class Dc(_AclMixin, _VirtModel, _JsonPickleModel, _CacheModel, _UserTasksModel):
     """
@@ -25,12 +94,15 @@ class Dc(_AclMixin, _VirtModel, _JsonPickleModel, _CacheModel, _UserTasksModel):
 
     # Inherited: id, name, alias, owner, desc, access, created, changed, json
     site = models.CharField(_('Site hostname'), max_length=260, unique=True)
+    json_data = JSONBField(null=True, default=None, editable=False)  # native jsonb storage of json
 
     _pk_key = 'dc_id'  # _UserTasksModel
+    _jsonb_fields = {'enc_json': 'json_data'}  # _PickleModel
     # _CacheModel
     cache_fields = ('id', 'name', 'site')
     objects = CacheManager(cache_fields)
     is_dummy = False
+    _json_changed = False  # json was modified and not committed -> settings are not read from the DcSettings snapshot
 
     class Meta:
         app_label = 'vms'
@@ -54,6 +126,30 @@ class Dc(_AclMixin, _VirtModel, _JsonPickleModel, _CacheModel, _UserTasksModel):
             'site': self.site,
         }
 
+    def _encode_field(self, field, data):
+        super(Dc, self)._encode_field(field, data)
+        self._json_changed = True
+
+    def save(self, *args, **kwargs):
+        ret = super(Dc, self).save(*args, **kwargs)
+
+        if self._json_changed:
+            connection.on_commit(self._json_saved)
+
+        return ret
+
+    def _json_saved(self):
+        """Called after the transaction with saved json was committed"""
+        self._json_changed = False
+        DcSettings.bump_version(self.pk)
+
+    def delete(self, *args, **kwargs):
+        dc_id = self.pk
+        ret = super(Dc, self).delete(*args, **kwargs)
+        DcSettings.invalidate(dc_id)
+
+        return ret
+
     def save_setting(self, key, value, save=True):
         """Set item in json['settings'] object"""
         return self.save_item(key, value, save=save, metadata='settings')
@@ -75,7 +171,10 @@ class Dc(_AclMixin, _VirtModel, _JsonPickleModel, _CacheModel, _UserTasksModel):
     @property
     def settings(self):
         """Return a settings dictionary with defaults pointing to settings.py"""
-        return DefAttrDict(self.custom_settings, defaults=settings)
+        if self._json_changed or self.pk is None:
+            return DefAttrDict(self.custom_settings, defaults=settings)
+
+        return DcSettings.get(self.pk)
 
     @property
     def domain(self):  # Needed in vm.available_domains
@@ -3,6 +3,7 @@ Incompatible with Django 1.8.
 Support for database lookups is missing.
 """
 
+import json
 import uuid
 
 from django.core.exceptions import ValidationError
@@ -12,8 +13,9 @@ from django.utils.translation import ugettext_lazy as _
 from django.utils.six import text_type, string_types, with_metaclass
 
 from vms.forms import fields as form_fields
+from vms.utils import PickleDict
 
-__all__ = ('UUIDField', 'CommaSeparatedUUIDField')
+__all__ = ('UUIDField', 'CommaSeparatedUUIDField', 'JSONBField')
 
 
 class UUIDField(with_metaclass(SubfieldBase, Field)):
@@ -92,3 +94,36 @@ class CommaSeparatedUUIDField(with_metaclass(SubfieldBase, TextField)):
         }
         defaults.update(kwargs)
         return super(CommaSeparatedUUIDField, self).formfield(**defaults)
+
+
+class JSONBField(Field):
+    """
+    PostgreSQL jsonb DB field storing a dictionary (PickleDict object).
+    """
+    description = _('JSON object')
+    empty_strings_allowed = False
+
+    def db_type(self, connection):
+        return 'jsonb'
+
+    # noinspection PyUnusedLocal
+    def from_db_value(self, value, expression, connection, context):
+        return self.to_python(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, PickleDict):
+            return value
+        if isinstance(value, string_types):  # psycopg2 < 2.5.4 does not decode jsonb columns
+            value = json.loads(value)
+        return PickleDict(value)
+
+    def get_prep_value(self, value):
+        if value is None:
+            return None
+        return json.dumps(value)
+
+    def value_to_string(self, obj):
+        val = self._get_val_from_obj(obj)
+        if val is None:
+            return ''
+        return json.dumps(val)
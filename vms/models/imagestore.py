@@ -1,11 +1,12 @@
 import hashlib
-from operator import itemgetter
+from calendar import timegm
+from uuid import uuid4
 from frozendict import frozendict
 from collections import OrderedDict
 from django.utils.translation import ugettext_lazy as _
 from django.utils.text import Truncator
 from django.utils.dateparse import parse_datetime
-from django.core.cache import cache
+from django.core.cache import cache, caches
 from django.utils.six import iteritems
 # noinspection PyUnresolvedReferences
 from django.utils.six.moves.urllib.parse import urljoin
@@ -15,6 +16,12 @@ from vms.models.base import _DummyDataModel
 from vms.models.dc import DefaultDc
 from vms.models.image import Image
 
+try:
+    # noinspection PyPep8Naming
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
 
 class ImageStoreObject(dict):
     """
@@ -64,6 +71,250 @@ class ImageStoreObject(dict):
         }
 
 
+class ImageStoreQuery(object):
+    """
+    Lazy list of images from ImageStoreCatalog ordered by created time (newest first). Supports len() and slicing,
+    so it can be used by django paginators (api.paginator.get_pager). Only the requested slice is loaded from redis.
+    """
+    def __init__(self, catalog, gen=None, index=None, min_score='-inf'):
+        self.catalog = catalog
+        self.gen = gen
+        self.index = index
+        self.min_score = min_score
+        self._count = None
+
+    def __repr__(self):
+        return '<ImageStoreQuery: %s (%s)>' % (self.catalog.name, self.index)
+
+    def count(self):
+        if self._count is None:
+            if self.index:
+                self._count = self.catalog.redis.zcount(self.index, self.min_score, '+inf')
+            else:
+                self._count = 0
+
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def _get_range(self, start, stop):
+        if not self.index or (stop is not None and stop <= start):
+            return []
+
+        if stop is None:
+            num = -1
+        else:
+            num = stop - start
+
+        uuids = self.catalog.redis.zrevrangebyscore(self.index, '+inf', self.min_score, start=start, num=num)
+
+        return self.catalog.get_many(uuids, gen=self.gen)
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            assert k.step is None, 'Slice step is not supported'
+            assert (k.start or 0) >= 0 and (k.stop is None or k.stop >= 0), 'Negative indexing is not supported'
+            return self._get_range(k.start or 0, k.stop)
+
+        res = self._get_range(k, k + 1)
+
+        if not res:
+            raise IndexError('Image index out of range')
+
+        return res[0]
+
+    def __iter__(self):
+        batch_size = self.catalog.BATCH_SIZE
+        start = 0
+
+        while True:
+            images = self._get_range(start, start + batch_size)
+
+            for img in images:
+                yield img
+
+            if len(images) < batch_size:
+                break
+
+            start += batch_size
+
+
+class ImageStoreCatalog(object):
+    """
+    Images (ImageStoreObject) of one image repository stored in redis and indexed by created time, ostype and name.
+    Every index is a sorted set of image UUIDs scored by the created timestamp.
+
+    A refresh builds a new generation of all keys and then switches the catalog metadata to it. Keys of the old
+    generation expire after QUERY_TIMEOUT seconds, so running queries are not affected by the switch. The metadata
+    also hold the ETag and Last-Modified headers of the repository response used for conditional refresh requests.
+    """
+    KEY = 'imagestore-catalog:%s'  # %s = repository name
+    QUERY_TIMEOUT = 60  # Lifetime of temporary query keys and of keys from replaced generations
+    BATCH_SIZE = 1000
+
+    def __init__(self, name):
+        self.name = name
+        self.key = u'%s:%s:%s' % (cache.key_prefix, cache.version, self.KEY % name)
+        self._meta = None
+
+    def __repr__(self):
+        return '<ImageStoreCatalog: %s>' % self.name
+
+    @property
+    def redis(self):
+        return caches['redis'].master_client
+
+    @property
+    def meta(self):
+        if self._meta is None:
+            self._meta = self.redis.hgetall(self.key)
+
+        return self._meta
+
+    @property
+    def gen(self):
+        return self.meta.get('gen', None)
+
+    @property
+    def etag(self):
+        return self.meta.get('etag', None) or None
+
+    @property
+    def last_modified(self):
+        return self.meta.get('last_modified', None) or None
+
+    def _get_key(self, gen, *parts):
+        return u':'.join((self.key, gen) + parts)
+
+    @staticmethod
+    def _get_score(created):
+        if not created:
+            return 0
+
+        return timegm(created.utctimetuple())
+
+    def _expire_gen(self, pipe, gen):
+        keys_key = self._get_key(gen, 'keys')
+
+        for key in self.redis.smembers(keys_key):
+            pipe.expire(key, self.QUERY_TIMEOUT)
+
+        pipe.expire(keys_key, self.QUERY_TIMEOUT)
+
+    def save(self, images, etag=None, last_modified=None):
+        """Build a new catalog generation from ImageStoreObjects and switch to it. Return number of images"""
+        gen = uuid4().hex
+        images_key = self._get_key(gen, 'images')
+        created_key = self._get_key(gen, 'created')
+        keys = {images_key, created_key}
+        pipe = self.redis.pipeline(transaction=False)
+        count = 0
+
+        for img in images:
+            uuid = img['uuid']
+            score = self._get_score(img['created'])
+            ostype_key = self._get_key(gen, 'ostype', str(img['ostype']))
+            name_key = self._get_key(gen, 'name', img['name'])
+            keys.add(ostype_key)
+            keys.add(name_key)
+            pipe.hset(images_key, uuid, pickle.dumps(img, pickle.HIGHEST_PROTOCOL))
+
+            for key in (created_key, ostype_key, name_key):
+                pipe.execute_command('ZADD', key, score, uuid)  # Same argument order in Redis and StrictRedis
+
+            count += 1
+
+            if count % self.BATCH_SIZE == 0:
+                pipe.execute()
+
+        old_gen = self.gen
+        pipe.sadd(self._get_key(gen, 'keys'), *keys)
+        pipe.delete(self.key)
+        pipe.hmset(self.key, {'gen': gen, 'count': count, 'etag': etag or '', 'last_modified': last_modified or ''})
+
+        if old_gen:
+            self._expire_gen(pipe, old_gen)
+
+        pipe.execute()
+        self._meta = None
+
+        return count
+
+    def delete(self):
+        """Remove the catalog (keys of the current generation will expire)"""
+        gen = self.gen
+        pipe = self.redis.pipeline(transaction=False)
+
+        if gen:
+            self._expire_gen(pipe, gen)
+
+        pipe.delete(self.key)
+        pipe.execute()
+        self._meta = None
+
+    def get(self, uuid):
+        """Return one ImageStoreObject or None"""
+        gen = self.gen
+
+        if not gen:
+            return None
+
+        img = self.redis.hget(self._get_key(gen, 'images'), uuid)
+
+        if img is None:
+            return None
+
+        return pickle.loads(img)
+
+    def get_many(self, uuids, gen=None):
+        """Return list of ImageStoreObjects in the same order as uuids"""
+        gen = gen or self.gen
+
+        if not gen or not uuids:
+            return []
+
+        return [pickle.loads(img) for img in self.redis.hmget(self._get_key(gen, 'images'), uuids) if img is not None]
+
+    def _store_query(self, gen, command, keys):
+        """Store union or intersection of index keys into a temporary key"""
+        key = self._get_key(gen, 'query', hashlib.md5(repr((command, keys)).encode('utf-8')).hexdigest())
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.execute_command(command, key, len(keys), *(keys + ['AGGREGATE', 'MAX']))
+        pipe.expire(key, self.QUERY_TIMEOUT)
+        pipe.execute()
+
+        return key
+
+    def query(self, created_since=None, excluded_ostypes=(), name=None):
+        """Return ImageStoreQuery with images ordered by created time (newest first)"""
+        gen = self.gen
+
+        if not gen:
+            return ImageStoreQuery(self)
+
+        index = self._get_key(gen, 'created')
+
+        if excluded_ostypes:
+            keys = [self._get_key(gen, 'ostype', str(ostype)) for ostype in sorted(ImageStoreObject.OSTYPE.keys())
+                    if ostype not in excluded_ostypes]
+
+            if not keys:
+                return ImageStoreQuery(self)
+
+            index = self._store_query(gen, 'ZUNIONSTORE', keys)
+
+        if name:
+            index = self._store_query(gen, 'ZINTERSTORE', [self._get_key(gen, 'name', name), index])
+
+        if created_since:
+            min_score = '(%d' % self._get_score(created_since)
+        else:
+            min_score = '-inf'
+
+        return ImageStoreQuery(self, gen=gen, index=index, min_score=min_score)
+
+
 class ImageStore(_DummyDataModel):
     """
     Dummy model for representing a specific instance of a image repository (a.k.a. imagestore).
@@ -88,6 +339,7 @@ class ImageStore(_DummyDataModel):
 
     def __init__(self, name, url=None):
         self.name = name
+        self._catalog = ImageStoreCatalog(name)
         data = cache.get(self._cache_key_repo)
 
         if not data:
@@ -120,54 +372,47 @@ class ImageStore(_DummyDataModel):
         return self.CACHE_PREFIX_REPO + self.name
 
     @property
-    def _cache_key_images(self):
+    def _cache_key_images(self):  # Image list stored by older versions
         return self._cache_key_repo + self.CACHE_SUFFIX_IMAGES
 
+    @property
+    def catalog(self):
+        return self._catalog
+
     @property
     def images(self):
-        return cache.get(self._cache_key_images) or []
+        """Lazy list of all images (newest first)"""
+        return self._catalog.query()
 
-    def images_filter(self, created_since=None, limit=None, excluded_ostypes=()):
-        def apply_filters(filters):
-            def fun(image):
-                return all(filter_(image) for filter_ in filters)
-            return fun
-        active_filters = []
+    def get_image(self, uuid):
+        return self._catalog.get(uuid)
 
-        if created_since:
-            active_filters.append(lambda img: img['created'] > created_since)
+    def images_query(self, created_since=None, excluded_ostypes=(), name=None):
+        return self._catalog.query(created_since=created_since, excluded_ostypes=excluded_ostypes, name=name)
 
-        if excluded_ostypes:
-            active_filters.append(lambda img: img['ostype'] not in excluded_ostypes)
-
-        images = filter(apply_filters(active_filters), self.images)
+    def images_filter(self, created_since=None, limit=None, excluded_ostypes=(), name=None):
+        images = self.images_query(created_since=created_since, excluded_ostypes=excluded_ostypes, name=name)
 
         if limit:
-            images = images[:limit]
+            return images[:limit]
 
-        return images
+        return list(images)
 
-    @staticmethod
-    def _ordering_newest_first(images):
-        return sorted(images, key=itemgetter('created'), reverse=True)
-
-    def save_images(self, images, order_fun=None):
-        if not order_fun:
-            order_fun = self._ordering_newest_first
+    def save_images(self, images, etag=None, last_modified=None):
+        cache.delete(self._cache_key_images)
 
-        cache.set(
-            self._cache_key_images,
-            order_fun(ImageStoreObject(img, self.get_image_manifest_url(img['uuid'])) for img in images)
-        )
+        return self._catalog.save((ImageStoreObject(img, self.get_image_manifest_url(img['uuid'])) for img in images),
+                                  etag=etag, last_modified=last_modified)
 
     def delete_images(self):
         cache.delete(self._cache_key_images)
+        self._catalog.delete()
 
-    def save(self, images=None):
+    def save(self, images=None, etag=None, last_modified=None):
         cache.set(self._cache_key_repo, self)
 
-        if images:
-            self.save_images(images)
+        if images is not None:
+            self.save_images(images, etag=etag, last_modified=last_modified)
 
     def delete(self):
         self.delete_images()
@@ -1,6 +1,7 @@
 from __future__ import absolute_import
 
 from django.db import models
+from django.db.models import Q
 from django.utils.translation import ugettext_lazy as _
 from django.utils.six import text_type
 # noinspection PyCompatibility
@@ -144,3 +145,41 @@ class IPAddress(models.Model):
     @property
     def web_data(self):  # NetworkIPForm
         return {'ip': self.ip, 'usage': self.web_usage, 'note': self.note}
+
+    # noinspection PyUnusedLocal
+    @staticmethod
+    def post_save(sender, instance, **kwargs):
+        """Update free IP address pool of the subnet"""
+        instance.subnet.ip_pool.update(instance)
+
+    # noinspection PyUnusedLocal
+    @staticmethod
+    def vms_changed(sender, instance, action, reverse, pk_set, **kwargs):
+        """Update free IP address pool after changing additional VMs (allowed_ips) of IP addresses"""
+        if action not in ('post_add', 'post_remove') or not pk_set:
+            return
+
+        if reverse:  # instance is Vm and pk_set are IPAddress IDs
+            ips = IPAddress.objects.select_related('subnet').filter(pk__in=pk_set)
+        else:
+            ips = (instance,)
+
+        for ipaddr in ips:
+            ipaddr.subnet.ip_pool.update(ipaddr)
+
+    # noinspection PyUnusedLocal
+    @staticmethod
+    def pre_delete_vm(sender, instance, **kwargs):
+        """Remember IP addresses, which will be released by the VM deletion (on_delete=SET_NULL sends no signals)"""
+        instance._released_ips = list(IPAddress.objects.filter(Q(vm=instance) | Q(vms=instance))
+                                      .values_list('id', flat=True).distinct())
+
+    # noinspection PyUnusedLocal
+    @staticmethod
+    def post_delete_vm(sender, instance, **kwargs):
+        """Put IP addresses released by the deleted VM back into free IP address pools"""
+        released_ips = getattr(instance, '_released_ips', None)
+
+        if released_ips:
+            for ipaddr in IPAddress.objects.select_related('subnet').filter(pk__in=released_ips):
+                ipaddr.subnet.ip_pool.update(ipaddr)
@@ -0,0 +1,208 @@
+from functools import partial
+from logging import getLogger
+from time import time
+
+from django.core.cache import cache, caches
+from django.db import connection
+
+logger = getLogger(__name__)
+
+
+class IPAddressPool(object):
+    """
+    Free IP addresses (IPAddress objects with VM usage, which are not associated with any VM) of one subnet stored
+    in a redis set. Addresses are handed out with SPOP, so concurrent requests never get the same address.
+
+    An allocated address is reserved (sorted set scored by expiration time) until the IPAddress is associated with
+    a VM (see IPAddress.post_save() and IPAddress.vms_changed()). Expired reservations are returned into the pool
+    if the address is still free. Every allocated address is also verified in the DB, so stale pool entries
+    (e.g. deleted IPAddress objects) are just dropped.
+
+    Released addresses are put into the pool after the DB transaction is committed. Used addresses are removed from
+    the pool immediately - a rolled back transaction can only cause that a free address is missing in the pool until
+    the next rebuild. The pool is rebuilt from DB if it does not exist in redis or if it was not rebuilt for
+    SYNC_TIMEOUT seconds. The ip_pool management command can be used to detect (and fix) a drift between the pool
+    and the DB.
+    """
+    KEY = 'subnet-free-ips:%s'  # %s = subnet.uuid
+    RESERVATION_TIMEOUT = 300
+    SYNC_TIMEOUT = 3600
+
+    __slots__ = ('subnet', 'key', 'key_reserved', 'key_synced')
+
+    def __init__(self, subnet):
+        self.subnet = subnet
+        self.key = '%s:%s:%s' % (cache.key_prefix, cache.version, self.KEY % subnet.uuid)
+        self.key_reserved = self.key + ':reserved'
+        self.key_synced = self.key + ':synced'
+
+    def __repr__(self):
+        return '<IPAddressPool: %s>' % self.subnet
+
+    @property
+    def redis(self):
+        return caches['redis'].master_client
+
+    def get_free_ips(self, ips=None):
+        """Return queryset of free IP addresses from DB"""
+        from vms.models.ipaddress import IPAddress
+
+        qs = IPAddress.objects.filter(subnet=self.subnet, vm__isnull=True, vms=None, usage=IPAddress.VM)
+
+        if ips is not None:
+            qs = qs.filter(ip__in=ips)
+
+        return qs
+
+    def scan(self):
+        """Return set of free IP addresses calculated from DB (full scan)"""
+        return set(self.get_free_ips().values_list('ip', flat=True))
+
+    def load(self):
+        """Return set of IP addresses in the pool"""
+        return self.redis.smembers(self.key)
+
+    def get_reserved(self):
+        """Return set of reserved IP addresses"""
+        return set(self.redis.zrange(self.key_reserved, 0, -1))
+
+    def rebuild(self, ips=None):
+        """Replace the whole pool with a fresh full scan. Reserved addresses are not put into the pool"""
+        if ips is None:
+            ips = self.scan()
+
+        ips = set(ips) - self.get_reserved()
+        pipe = self.redis.pipeline()
+        pipe.delete(self.key)
+
+        if ips:
+            pipe.sadd(self.key, *ips)
+
+        pipe.set(self.key_synced, 1, ex=self.SYNC_TIMEOUT)
+        pipe.execute()
+        logger.info('Free IP address pool for subnet %s was rebuilt with %d addresses', self.subnet, len(ips))
+
+        return ips
+
+    def _ensure_synced(self):
+        if not self.redis.exists(self.key_synced):
+            self.rebuild()
+
+    def clear(self):
+        """Remove the whole pool (it will be rebuilt when used next time)"""
+        self.redis.delete(self.key, self.key_reserved, self.key_synced)
+
+    def _add(self, ips):
+        reserved = self.get_reserved()
+        ips = [ip for ip in ips if ip not in reserved]
+
+        if ips:
+            self.redis.sadd(self.key, *ips)
+
+    def add(self, ips):
+        """Put IP addresses back into the pool (after the current transaction is committed) unless they are reserved"""
+        if ips:
+            connection.on_commit(partial(self._add, list(ips)))
+
+    def remove(self, ips):
+        """Remove IP addresses from the pool and from reservations"""
+        if not ips:
+            return
+
+        pipe = self.redis.pipeline()
+        pipe.srem(self.key, *ips)
+        pipe.zrem(self.key_reserved, *ips)
+        pipe.execute()
+
+    def update(self, ipaddr):
+        """Add or remove IPAddress object according to its state"""
+        if ipaddr.subnet_id != self.subnet.uuid:
+            return
+
+        if ipaddr.usage == ipaddr.VM and ipaddr.vm_id is None and not ipaddr.vms.exists():
+            self.add((ipaddr.ip,))
+        else:
+            self.remove((ipaddr.ip,))
+
+    def reclaim(self):
+        """Put expired reservations of still free IP addresses back into the pool"""
+        expired = self.redis.zrangebyscore(self.key_reserved, '-inf', time())
+
+        if not expired:
+            return 0
+
+        free = list(self.get_free_ips(ips=expired).values_list('ip', flat=True))
+        pipe = self.redis.pipeline()
+        pipe.zrem(self.key_reserved, *expired)
+
+        if free:
+            pipe.sadd(self.key, *free)
+
+        pipe.execute()
+
+        return len(free)
+
+    def _release(self, ips):
+        self.redis.zrem(self.key_reserved, *ips)
+        self._add(list(self.get_free_ips(ips=ips).values_list('ip', flat=True)))
+
+    def release(self, ips):
+        """Cancel reservation of IP addresses, which were allocated, but will not be used"""
+        if ips:
+            connection.on_commit(partial(self._release, [getattr(ip, 'ip', ip) for ip in ips]))
+
+    @classmethod
+    def add_released(cls, ipaddrs):
+        """Put IPAddress objects released by a queryset update (which does not send signals) back into pools of
+        their subnets if they are free"""
+        subnets = {}
+
+        for ipaddr in ipaddrs:
+            subnets.setdefault(ipaddr.subnet, []).append(ipaddr.ip)
+
+        for subnet, ips in subnets.items():
+            pool = cls(subnet)
+            pool.add(list(pool.get_free_ips(ips=ips).values_list('ip', flat=True)))
+
+    def allocate(self, count=1, exclude=()):
+        """Pop and reserve up to count free IP addresses. Return list of IPAddress objects"""
+        self._ensure_synced()
+        self.reclaim()
+        redis = self.redis
+        exclude = frozenset(exclude)
+        allocated = []
+        skipped = []
+
+        while len(allocated) < count:
+            pipe = redis.pipeline()
+
+            for _ in range(count - len(allocated)):
+                pipe.spop(self.key)
+
+            ips = [ip for ip in pipe.execute() if ip is not None]
+
+            if not ips:
+                break
+
+            skipped.extend(ip for ip in ips if ip in exclude)
+            ips = [ip for ip in ips if ip not in exclude]
+
+            if not ips:
+                continue
+
+            free = {i.ip: i for i in self.get_free_ips(ips=ips).select_related('subnet')}
+            stale = [ip for ip in ips if ip not in free]
+
+            if stale:
+                logger.warning('Dropping stale IP addresses %s from free IP address pool of subnet %s',
+                               stale, self.subnet)
+
+            if free:
+                expires = time() + self.RESERVATION_TIMEOUT
+                redis.execute_command('ZADD', self.key_reserved, *[j for ip in free for j in (expires, ip)])
+                allocated.extend(free[ip] for ip in ips if ip in free)
+
+        if skipped:
+            redis.sadd(self.key, *skipped)
+
+        return allocated
@@ -0,0 +1,192 @@
+from logging import getLogger
+
+from django.core.cache import cache, caches
+from django.db import connection
+from django.utils.six import iteritems, itervalues
+
+try:
+    # noinspection PyPep8Naming
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+logger = getLogger(__name__)
+
+
+def _get_redis():
+    return caches['redis'].master_client
+
+
+class ResourceLedgerChange(object):
+    """
+    Update (entry) or removal (entry=None) of one VM entry in a resource ledger, which is applied to redis after
+    the current DB transaction is committed (registered by connection.on_commit()).
+    """
+    __slots__ = ('key', 'vm_uuid', 'entry')
+
+    def __init__(self, key, vm_uuid, entry=None):
+        self.key = key
+        self.vm_uuid = vm_uuid
+        self.entry = entry
+
+    def __call__(self):
+        if self.entry is None:
+            _get_redis().hdel(self.key, self.vm_uuid)
+        else:
+            _get_redis().hset(self.key, self.vm_uuid, pickle.dumps(self.entry))
+
+    @classmethod
+    def pending(cls, key):
+        """Generate changes of a ledger made in the current (not committed yet) transaction. The list of commit hooks
+        is maintained by django-transaction-hooks, which also removes hooks registered in a rolled back savepoint"""
+        if connection.in_atomic_block:
+            for _, func in connection.run_on_commit:
+                if isinstance(func, cls) and func.key == key:
+                    yield func
+
+
+class ResourceLedger(object):
+    """
+    Resources (vCPUs, RAM, disk size per zpool) used by VMs on one compute node stored in a redis hash.
+
+    Every VM on the node has one entry (hash field = VM uuid), which is replaced after the VM is saved with changed
+    resources or removed when the VM is deleted or moved to another node (see Vm.save() and Vm.post_delete()).
+    Node, DcNode and NodeStorage resource counters are calculated from these entries, so that updating one VM
+    does not require decoding of all VMs defined on the node.
+
+    Changes are written to redis after the DB transaction is committed. Until then they are visible only to the
+    current transaction (in the same way as the changed VMs).
+
+    The ledger is rebuilt from DB (full scan of all VMs on the node) if it does not exist in redis. The
+    resource_ledger management command can be used to detect (and fix) a drift between the ledger and the full scan.
+    """
+    KEY = 'node-resource-ledger:%s'  # %s = node.uuid
+    SYNCED = '__synced__'  # Hash field marking a ledger, which was fully initialized from DB
+
+    __slots__ = ('node', 'key', '_entries')
+
+    def __init__(self, node):
+        self.node = node
+        self.key = '%s:%s:%s' % (cache.key_prefix, cache.version, self.KEY % node.uuid)
+        self._entries = None
+
+    def __repr__(self):
+        return '<ResourceLedger: %s>' % self.node
+
+    @property
+    def redis(self):
+        return _get_redis()
+
+    @staticmethod
+    def get_vm_entry(vm):
+        """Return tuple (dc_id, vCPUs, RAM, {zpool: disk_size}) used in resource accounting for one VM.
+        The values must be the same as in Vm.get_cpu_ram_disk(zpool=zpool, ram_overhead=True) for every zpool."""
+        cpu, ram = vm.get_cpu_ram(ram_overhead=True)
+        disks = vm.get_disks()
+
+        if vm.is_deployed():
+            for zpool, size in iteritems(vm.get_disks(active=True)):
+                if size > disks[zpool]:
+                    disks[zpool] = size
+
+        return vm.dc_id, cpu, ram, dict(disks)
+
+    def scan(self):
+        """Return {vm_uuid: entry} dict calculated from all VMs on this node (full scan)"""
+        return {vm.uuid: self.get_vm_entry(vm) for vm in self.node.vm_set.select_related('slavevm')}
+
+    def rebuild(self, entries=None):
+        """Replace the whole ledger with a fresh full scan"""
+        if entries is None:
+            entries = self.scan()
+
+        data = {vm_uuid: pickle.dumps(entry) for vm_uuid, entry in iteritems(entries)}
+        data[self.SYNCED] = 1
+        pipe = self.redis.pipeline()
+        pipe.delete(self.key)
+        pipe.hmset(self.key, data)
+        pipe.execute()
+        self._entries = entries
+        logger.info('Resource ledger for node %s was rebuilt from %d VMs', self.node, len(entries))
+
+        return entries
+
+    def load(self):
+        """Return {vm_uuid: entry} dict from redis including changes made in the current transaction.
+        Rebuild the ledger if it does not exist"""
+        if self._entries is None:
+            data = self.redis.hgetall(self.key)
+
+            if data.pop(self.SYNCED, None) is not None:
+                entries = {vm_uuid: pickle.loads(entry) for vm_uuid, entry in iteritems(data)}
+            elif connection.in_atomic_block:  # The full scan would include not committed changes
+                return self.scan()
+            else:
+                return self.rebuild()
+
+            for change in ResourceLedgerChange.pending(self.key):
+                if change.entry is None:
+                    entries.pop(change.vm_uuid, None)
+                else:
+                    entries[change.vm_uuid] = change.entry
+
+            self._entries = entries
+
+        return self._entries
+
+    @property
+    def entries(self):
+        return self.load()
+
+    def update(self, vm):
+        """Set (replace) the VM entry after the current transaction is committed"""
+        entry = self.get_vm_entry(vm)
+        connection.on_commit(ResourceLedgerChange(self.key, vm.uuid, entry))
+        self._entries = None
+
+        return entry
+
+    def remove(self, vm_uuid):
+        """Remove the VM entry after the current transaction is committed"""
+        connection.on_commit(ResourceLedgerChange(self.key, vm_uuid))
+        self._entries = None
+
+    def clear(self):
+        """Remove the whole ledger (it will be rebuilt when used next time)"""
+        self.redis.delete(self.key)
+        self._entries = None
+
+    def _filter(self, dc=None, dc_exclude=None, dcs_exclude=None):
+        """Generate entries according to DC filter parameters (see Node.get_free_resources())"""
+        dc_id = getattr(dc, 'id', dc)
+        dc_exclude_id = getattr(dc_exclude, 'id', dc_exclude)
+
+        if dcs_exclude:
+            dcs_exclude = frozenset(getattr(i, 'id', i) for i in dcs_exclude)
+
+        for entry in itervalues(self.load()):
+            entry_dc_id = entry[0]
+
+            if dc_id is not None and entry_dc_id != dc_id:
+                continue
+            if dcs_exclude and entry_dc_id in dcs_exclude:
+                continue
+            if dc_exclude_id is not None and entry_dc_id == dc_exclude_id:
+                continue
+
+            yield entry
+
+    def get_used_resources(self, zpool, **dc_filter):
+        """Return tuple (vCPUs, RAM, disk size on zpool) used by VMs"""
+        cpu, ram, disk = 0, 0, 0
+
+        for _, vm_cpu, vm_ram, vm_disks in self._filter(**dc_filter):
+            cpu += vm_cpu
+            ram += vm_ram
+            disk += vm_disks.get(zpool, 0)
+
+        return cpu, ram, disk
+
+    def get_disk_size(self, zpool, **dc_filter):
+        """Return disk size on zpool used by VMs"""
+        return sum(vm_disks.get(zpool, 0) for _, _, _, vm_disks in self._filter(**dc_filter))
@@ -5,11 +5,12 @@ from django.core.cache import cache
 from django.conf import settings
 
 import decimal
-import operator
-from functools import reduce
 
 # noinspection PyProtectedMember
 from vms.models.base import _JsonPickleModel, _StatusModel, _UserTasksModel, _HVMType
+from vms.models.fields import JSONBField
+from vms.models.ledger import ResourceLedger
+from vms.models.placement import PlacementEngine
 from vms.models.dc import Dc
 from vms.models.storage import Storage, NodeStorage
 from gui.models import User
@@ -59,6 +60,7 @@ class Node(_StatusModel, _JsonPickleModel, _UserTasksModel):
     _storage = None  # Local storage cache
     _ns = None  # Local node storage cache
     _ip = None  # Related IPAddress object
+    _jsonb_fields = {'enc_json': 'json_data'}  # _PickleModel
 
     # Inherited: status_change, created, changed, json
     uuid = models.CharField(_('UUID'), max_length=36, primary_key=True)
@@ -82,6 +84,7 @@ class Node(_StatusModel, _JsonPickleModel, _UserTasksModel):
     is_backup = models.BooleanField(_('Backup'), default=False)
     is_head = models.BooleanField(_('Head node'), default=False)
     note = models.TextField(_('Note'), blank=True)
+    json_data = JSONBField(null=True, default=None, editable=False)  # native jsonb storage of json
 
     class Meta:
         app_label = 'vms'
@@ -662,37 +665,23 @@ class Node(_StatusModel, _JsonPickleModel, _UserTasksModel):
 
         return self.cpu * float(self.cpu_coef), self.ram * float(self.ram_coef), disk_size_total
 
+    @property
+    def resource_ledger(self):
+        """Resources used by VMs on this node"""
+        return ResourceLedger(self)
+
     def get_used_resources(self, dc):
         """Count used node resources in DC"""
-        cpu, ram, disk = 0, 0, 0
-
-        for vm in self.vm_set.filter(dc=dc):
-            vm_cpu, vm_ram, vm_disk = vm.get_cpu_ram_disk(zpool=self.zpool, ram_overhead=True)
-            cpu += vm_cpu
-            ram += vm_ram
-            disk += vm_disk
+        cpu, ram, disk = self.resource_ledger.get_used_resources(self.zpool, dc=dc)
 
         return int(cpu), int(ram), int(disk)
 
     def get_free_resources(self, cpu, ram, disk, dc=None, dc_exclude=None, dcs_exclude=None):
         """Count free node resources according to parameters"""
-        if dc:
-            vms = self.vm_set.filter(dc=dc)
-        else:
-            vms = self.vm_set.all()
+        vm_cpu, vm_ram, vm_disk = self.resource_ledger.get_used_resources(self.zpool, dc=dc, dc_exclude=dc_exclude,
+                                                                          dcs_exclude=dcs_exclude)
 
-        if dcs_exclude:
-            vms = vms.exclude(dc__in=dcs_exclude)
-        if dc_exclude:
-            vms = vms.exclude(dc=dc_exclude)
-
-        for vm in vms:
-            vm_cpu, vm_ram, vm_disk = vm.get_cpu_ram_disk(zpool=self.zpool, ram_overhead=True)
-            cpu -= vm_cpu
-            ram -= vm_ram
-            disk -= vm_disk
-
-        return int(cpu), int(ram), int(disk)
+        return int(cpu - vm_cpu), int(ram - vm_ram), int(disk - vm_disk)
 
     def get_ram_kvm_overhead(self, dc=None):
         """Get KVM_MEMORY_OVERHEAD for all VMs on this node (and DC)"""
@@ -955,45 +944,15 @@ class DcNode(_JsonPickleModel):
         self.save_item('ram_kvm_overhead', value, save=False)
 
     @classmethod
-    def choose_node(cls, dc, vm):
+    def choose_node(cls, dc, vm, policy=None):
         """Choose appropriate node for a new VM"""
-        vm_cpu, vm_ram = vm.get_cpu_ram(ram_overhead=True)
-        vm_disk = vm.get_disks()
-        resources = {'cpu_free__gte': vm_cpu, 'ram_free__gte': vm_ram}
-
-        if vm_disk:  # First find valid and free storages
-            storages = []
-
-            for zpool, size in vm_disk.items():
-                storages.append(models.Q(zpool=zpool) & models.Q(storage__size_free__gte=size))
-
-            nodes = NodeStorage.objects.filter(dc=dc, zpool__in=vm_disk.keys()).filter(reduce(operator.or_, storages)) \
-                .distinct('node').values_list('node_id', flat=True)
-            resources['node_id__in'] = list(nodes)
-
-            if Node.ZPOOL in vm_disk:
-                resources['disk_free__gte'] = vm_disk[Node.ZPOOL]
-
-        try:
-            kwargs = {}
-            dc_nodes = cls.objects.filter(dc=dc, node__status=Node.ONLINE, node__is_compute=True, **kwargs) \
-                .filter(**resources).order_by('-priority', 'cpu_free', 'ram_free', 'disk_free')
-
-            dc_node = None
-            if vm.is_bhyve:
-                # choose the first node matching the criteria
-                for i in range(len(dc_nodes)):
-                    node_candidate = dc_nodes[i].node
-                    if not node_candidate.bhyve_capable or vm_cpu > node_candidate.bhyve_max_vcpus:
-                        continue
-                    dc_node = node_candidate
-            else:
-                dc_node = dc_nodes[0].node
-
-            return dc_node
+        return PlacementEngine(dc, policy=policy).place([vm])[0]
 
-        except IndexError:
-            return None
+    @classmethod
+    def choose_nodes(cls, dc, vms, policy=None):
+        """Choose appropriate nodes for a batch of new VMs. Resources of every placed VM are reserved before
+        the next VM is placed. Return list of nodes (None if a VM cannot be placed)"""
+        return PlacementEngine(dc, policy=policy).place(vms)
 
     def check_free_resources(self, cpu=None, ram=None, disk=None):
         """Return True if it is possible to allocate resources on this node"""
@@ -0,0 +1,217 @@
+from logging import getLogger
+
+from django.utils.six import iteritems
+
+logger = getLogger(__name__)
+
+
+class PlacementRequest(object):
+    """
+    Resources required by one VM (see Vm.get_cpu_ram(ram_overhead=True) and Vm.get_disks()).
+    """
+    __slots__ = ('cpu', 'ram', 'disks', 'bhyve', 'obj')
+
+    def __init__(self, cpu, ram, disks=None, bhyve=False, obj=None):
+        self.cpu = cpu
+        self.ram = ram
+        self.disks = disks or {}
+        self.bhyve = bhyve
+        self.obj = obj
+
+    def __repr__(self):
+        return '<PlacementRequest: cpu=%s ram=%s disks=%s>' % (self.cpu, self.ram, self.disks)
+
+    @classmethod
+    def from_vm(cls, vm):
+        cpu, ram = vm.get_cpu_ram(ram_overhead=True)
+
+        return cls(cpu, ram, disks=dict(vm.get_disks()), bhyve=vm.is_bhyve(), obj=vm)
+
+
+class PlacementCandidate(object):
+    """
+    One row of the capacity matrix: free resources of a compute node in a DC (DcNode) and of its node storages.
+    Free resources are decreased by reservations made during a batch placement.
+    """
+    __slots__ = ('node', 'priority', 'cpu', 'ram', 'disk', 'cpu_free', 'ram_free', 'disk_free', 'storages',
+                 '_bhyve')
+
+    def __init__(self, node, priority, cpu, ram, disk, cpu_free, ram_free, disk_free, storages=None, bhyve=None):
+        self.node = node
+        self.priority = priority
+        self.cpu = cpu
+        self.ram = ram
+        self.disk = disk
+        self.cpu_free = cpu_free
+        self.ram_free = ram_free
+        self.disk_free = disk_free
+        self.storages = storages or {}  # {zpool: size_free}
+        self._bhyve = bhyve  # (bhyve_capable, bhyve_max_vcpus) or None = not loaded yet
+
+    def __repr__(self):
+        return '<PlacementCandidate: %s>' % self.node
+
+    @property
+    def bhyve(self):
+        if self._bhyve is None:  # Node sysinfo is decoded only when needed
+            self._bhyve = (self.node.bhyve_capable, self.node.bhyve_max_vcpus)
+        return self._bhyve
+
+    def fits(self, req, zpool_default):
+        """Return True if the VM resources can be allocated on this node"""
+        if req.cpu > self.cpu_free or req.ram > self.ram_free:
+            return False
+
+        storages = self.storages
+
+        for zpool, size in iteritems(req.disks):
+            if zpool == zpool_default and size > self.disk_free:
+                return False
+            if size > storages.get(zpool, -1):
+                return False
+
+        if req.bhyve:
+            bhyve_capable, bhyve_max_vcpus = self.bhyve
+            if not bhyve_capable or req.cpu > bhyve_max_vcpus:
+                return False
+
+        return True
+
+    def free_ratio(self, req, zpool_default):
+        """Average free fraction of node CPU, RAM and disk after placing the VM"""
+        ratios = []
+
+        if self.cpu:
+            ratios.append(float(self.cpu_free - req.cpu) / self.cpu)
+        if self.ram:
+            ratios.append(float(self.ram_free - req.ram) / self.ram)
+        if self.disk:
+            ratios.append(float(self.disk_free - req.disks.get(zpool_default, 0)) / self.disk)
+
+        if ratios:
+            return sum(ratios) / len(ratios)
+
+        return 0
+
+    def reserve(self, req, zpool_default):
+        """Subtract VM resources from free resources"""
+        self.cpu_free -= req.cpu
+        self.ram_free -= req.ram
+
+        for zpool, size in iteritems(req.disks):
+            if zpool == zpool_default:
+                self.disk_free -= size
+            if zpool in self.storages:
+                self.storages[zpool] -= size
+
+
+class PlacementEngine(object):
+    """
+    Automatic compute node chooser.
+
+    The capacity matrix (free resources of all online compute nodes in a DC and of their node storages) is loaded
+    from DB with two queries and all candidates are scored in memory. A batch of VMs can be placed with one matrix;
+    resources of every placed VM are reserved before the next VM is placed.
+
+    Policies (all of them prefer nodes with a higher DcNode.priority first):
+        - priority: nodes with less free resources first (CPU, RAM, disk) - the original node chooser behaviour,
+        - pack: nodes with the lowest free resource fraction after the placement first,
+        - spread: nodes with the highest free resource fraction after the placement first.
+    """
+    PRIORITY = 'priority'
+    PACK = 'pack'
+    SPREAD = 'spread'
+    POLICIES = frozenset([PRIORITY, PACK, SPREAD])
+    POLICY = (
+        (PRIORITY, 'priority'),
+        (PACK, 'pack'),
+        (SPREAD, 'spread'),
+    )
+
+    def __init__(self, dc, policy=None, candidates=None, zpool_default=None):
+        if policy is None:
+            policy = dc.settings.VMS_NODE_PLACEMENT_POLICY
+
+        if policy not in self.POLICIES:
+            raise ValueError('Invalid placement policy "%s"' % policy)
+
+        self.dc = dc
+        self.policy = policy
+
+        if zpool_default is None:
+            from vms.models.node import Node
+            zpool_default = Node.ZPOOL
+
+        self.zpool_default = zpool_default
+
+        if candidates is None:
+            candidates = self.load_candidates(dc)
+
+        self.candidates = candidates
+
+    def __repr__(self):
+        return '<PlacementEngine: %s (%s), %d nodes>' % (self.dc, self.policy, len(self.candidates))
+
+    @staticmethod
+    def load_candidates(dc):
+        """Load capacity matrix for all online compute nodes in a DC"""
+        from vms.models.node import Node, DcNode
+        from vms.models.storage import NodeStorage
+
+        dc_nodes = DcNode.objects.select_related('node').filter(dc=dc, node__status=Node.ONLINE, node__is_compute=True)
+        candidates = {dc_node.node_id: PlacementCandidate(dc_node.node, dc_node.priority, dc_node.cpu, dc_node.ram,
+                                                          dc_node.disk, dc_node.cpu_free, dc_node.ram_free,
+                                                          dc_node.disk_free)
+                      for dc_node in dc_nodes}
+
+        if candidates:
+            node_storages = NodeStorage.objects.filter(dc=dc, node_id__in=candidates.keys()) \
+                                               .values_list('node_id', 'zpool', 'storage__size_free')
+
+            for node_id, zpool, size_free in node_storages:
+                candidates[node_id].storages[zpool] = size_free
+
+        return list(candidates.values())
+
+    def _get_sort_key(self, req):
+        zpool_default = self.zpool_default
+
+        if self.policy == self.PACK:
+            return lambda c: (-c.priority, c.free_ratio(req, zpool_default))
+        elif self.policy == self.SPREAD:
+            return lambda c: (-c.priority, -c.free_ratio(req, zpool_default))
+        else:
+            return lambda c: (-c.priority, c.cpu_free, c.ram_free, c.disk_free)
+
+    def choose(self, req, reserve=False):
+        """Return the best candidate for one placement request or None"""
+        zpool_default = self.zpool_default
+        fitting = [c for c in self.candidates if c.fits(req, zpool_default)]
+
+        if not fitting:
+            return None
+
+        best = min(fitting, key=self._get_sort_key(req))
+
+        if reserve:
+            best.reserve(req, zpool_default)
+
+        return best
+
+    def place(self, reqs):
+        """Place a batch of VMs (or placement requests). Return list of nodes (None if a VM cannot be placed)"""
+        nodes = []
+
+        for req in reqs:
+            if not isinstance(req, PlacementRequest):
+                req = PlacementRequest.from_vm(req)
+
+            candidate = self.choose(req, reserve=True)
+
+            if candidate is None:
+                logger.warning('Could not find node with free resources for %s in DC %s', req.obj or req, self.dc)
+                nodes.append(None)
+            else:
+                nodes.append(candidate.node)
+
+        return nodes
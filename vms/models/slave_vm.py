@@ -24,6 +24,13 @@ class SlaveVm(_JsonPickleModel):
         (ON, ugettext_noop('enabled')),
     )
 
+    REP_COMPRESSION = (  # See pack() in functions.sh
+        ('gzip', 'gzip'),
+        ('bzip2', 'bzip2'),
+        ('xz', 'xz'),
+        ('zstd', 'zstd'),
+    )
+
     vm = models.OneToOneField(Vm)
     master_vm = models.ForeignKey(Vm, related_name='slave_vm', verbose_name=_('Master server'))
     name = models.CharField(_('Slave name'), max_length=24, blank=True, default='', db_index=True)
@@ -47,9 +54,14 @@ class SlaveVm(_JsonPickleModel):
             # noinspection PyProtectedMember
             for field in master_vm._meta.fields:
                 attname = field.attname
-                if attname not in ('uuid', 'hostname', 'enc_json_active', 'vnc_port', 'created', 'changed'):
+                if attname not in ('uuid', 'hostname', 'enc_json_active', 'vnc_port', 'created', 'changed') and \
+                        attname not in Vm._jsonb_fields.values():
                     setattr(slave_vm, attname, getattr(master_vm, attname))
 
+            # Copy jsonb data (if used) through the encoded fields properties
+            slave_vm.json = master_vm.json
+            slave_vm.info = master_vm.info
+
             # Replace master uuid in json with slave uuid
             self.json = slave_vm.json.load(slave_vm.json.dump().replace(master_vm.uuid, slave_vm.uuid))
 
@@ -152,6 +164,52 @@ class SlaveVm(_JsonPickleModel):
             value = int(value)
         self.save_item('rep_bwlimit', value, save=False)
 
+    @property
+    def rep_compression(self):
+        """Replication stream compression algorithm"""
+        return self.json.get('rep_compression', None)
+
+    @rep_compression.setter
+    def rep_compression(self, value):
+        """Replication stream compression algorithm"""
+        self.save_item('rep_compression', value or None, save=False)
+
+    @property
+    def rep_compression_level(self):
+        """Replication stream compression level"""
+        return self.json.get('rep_compression_level', None)
+
+    @rep_compression_level.setter
+    def rep_compression_level(self, value):
+        """Replication stream compression level"""
+        if value is not None:
+            value = int(value)
+        self.save_item('rep_compression_level', value, save=False)
+
+    @property
+    def rep_compression_threads(self):
+        """Number of replication stream compression threads"""
+        return self.json.get('rep_compression_threads', None)
+
+    @rep_compression_threads.setter
+    def rep_compression_threads(self, value):
+        """Number of replication stream compression threads"""
+        if value is not None:
+            value = int(value)
+        self.save_item('rep_compression_threads', value, save=False)
+
+    @property
+    def rep_compression_spec(self):
+        """Compression option for esrep (algorithm[:level[:threads]]) or None"""
+        compression = self.rep_compression
+
+        if not compression:
+            return None
+
+        level, threads = self.rep_compression_level, self.rep_compression_threads
+
+        return '%s:%s:%s' % (compression, 'null' if level is None else level, 'null' if threads is None else threads)
+
     @property
     def rep_enabled(self):
         """Wrapper around sync_status"""
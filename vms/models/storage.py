@@ -21,16 +21,7 @@ def b_to_mb(value):
 
 def _calculate_vms_size(ns, dc=None):
     """Used in node_storage.get_vms_size()"""
-    res = 0
-    qs = ns.node.vm_set
-
-    if dc:
-        qs = qs.filter(dc=dc)
-
-    for vm in qs.all():
-        res += vm.get_disk_size(zpool=ns.zpool)
-
-    return res
+    return ns.node.resource_ledger.get_disk_size(ns.zpool, dc=dc)
 
 
 def _calculate_snapshots_size(ns, snap_model=None, dc=None):
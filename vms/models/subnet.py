@@ -136,6 +136,13 @@ class Subnet(_VirtModel, _DcMixin, _UserTasksModel):
             'dhcp_passthrough': self.dhcp_passthrough,
         }
 
+    @property
+    def ip_pool(self):
+        """Free IP addresses of this subnet"""
+        from vms.models.ippool import IPAddressPool  # circular imports
+
+        return IPAddressPool(self)
+
     def is_used_by_vms(self, dc=None):
         # Since this function returns a boolean value, we can use the association between an IPAddress and a VM
         # to quickly find out whether there is a VM that uses this Subnet. In case there is no relationship we
@@ -167,3 +174,4 @@ class Subnet(_VirtModel, _DcMixin, _UserTasksModel):
     def post_delete_subnet(self, sender, instance, **kwargs):
         """Called via signal after Subnet has been deleted from database"""
         RecurseNetworks.delete_entries(subnet=str(instance.ip_network), net_name=instance.name)
+        instance.ip_pool.clear()
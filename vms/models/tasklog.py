@@ -82,16 +82,32 @@ class TaskLogEntry(models.Model):
         return redis.delete(key)
 
     @classmethod
-    def add(cls, **kwargs):
-        """Log!"""
+    def _new(cls, kwargs):
+        kwargs = kwargs.copy()
         # Translate object_type to real field name
         kwargs['content_type_model'] = kwargs.pop('object_type', '')
-        entry = cls(**kwargs)
+
+        return cls(**kwargs)
+
+    @classmethod
+    def add(cls, **kwargs):
+        """Log!"""
+        entry = cls._new(kwargs)
         entry.save()
 
         if entry.flag == cls.UPDATE:
             entry.delete_object_cache()
 
+    @classmethod
+    def add_bulk(cls, entries):
+        """Log multiple entries (list of add() kwargs) with one INSERT"""
+        entries = [cls._new(kwargs) for kwargs in entries]
+        cls.objects.bulk_create(entries)
+
+        for entry in entries:
+            if entry.flag == cls.UPDATE:
+                entry.delete_object_cache()
+
     @property
     def object_type(self):
         if self.content_type:
@@ -1,5 +1,6 @@
 import re
 from collections import defaultdict
+from copy import deepcopy
 from django.conf import settings
 # noinspection PyProtectedMember
 from django.core.cache import caches
@@ -18,7 +19,7 @@ from types import NoneType
 from uuid import uuid4, UUID
 
 from vms.utils import SortedPickleDict
-from vms.models.fields import CommaSeparatedUUIDField
+from vms.models.fields import CommaSeparatedUUIDField, JSONBField
 # noinspection PyProtectedMember
 from vms.models.base import _JsonPickleModel, _StatusModel, _OSType, _HVMType, _UserTasksModel
 from vms.models.utils import pair_keys_to_items, diff_dict, diff_dict_nested
@@ -232,6 +233,10 @@ class Vm(_StatusModel, _JsonPickleModel, _OSType, _HVMType, _UserTasksModel):
     _log_name_attr = 'hostname'  # _UserTasksModel
     _cache_status = True  # _StatusModel
     _update_changed = False  # _StatusModel
+    _jsonb_fields = {'enc_json': 'json_data', 'enc_json_active': 'json_active_data',  # _PickleModel
+                     'enc_info': 'info_data'}
+    # Fields affecting node resources (see ResourceLedger)
+    RESOURCE_FIELDS = frozenset(['enc_json', 'enc_json_active', 'node', 'dc', 'hvm_type', 'ostype'])
     _orig_node = None  # Original value of node if changed
     _node_changed = False  # Node has changed
     _tags = None  # New tags set in save()
@@ -259,6 +264,10 @@ class Vm(_StatusModel, _JsonPickleModel, _OSType, _HVMType, _UserTasksModel):
     # default is an empty dict
     enc_json_active = models.TextField(blank=False, editable=False, default=_JsonPickleModel.EMPTY)
     enc_info = models.TextField(blank=False, editable=False, default=_JsonPickleModel.EMPTY)
+    # native jsonb storage of json, json_active and info (see VMS_JSON_STORAGE)
+    json_data = JSONBField(null=True, default=None, editable=False)
+    json_active_data = JSONBField(null=True, default=None, editable=False)
+    info_data = JSONBField(null=True, default=None, editable=False)
 
     tags = TaggableManager(through=TagVm, blank=True)
 
@@ -277,22 +286,22 @@ class Vm(_StatusModel, _JsonPickleModel, _OSType, _HVMType, _UserTasksModel):
     # It should change only after successful VM creation/update
     @property
     def json_active(self):
-        return self._decode(self.enc_json_active)
+        return self._decode_field('enc_json_active')
 
     @json_active.setter
     def json_active(self, data):
-        self.enc_json_active = self._encode(data)
+        self._encode_field('enc_json_active', data)
         self._update_changed = True
 
     # info property is used to store vmadm info dict
     # It is updated after some status changes
     @property
     def info(self):
-        return self._decode(self.enc_info)
+        return self._decode_field('enc_info')
 
     @info.setter
     def info(self, data):
-        self.enc_info = self._encode(data)
+        self._encode_field('enc_info', data)
 
     # FQDN tuple (hostname, domain) cache
     _fqdn = (None, None)
@@ -649,7 +658,7 @@ class Vm(_StatusModel, _JsonPickleModel, _OSType, _HVMType, _UserTasksModel):
             - resize_needed
             - root_pw (moved to internal_metadata)
             - root_authorized_keys"""
-        _json = self.json
+        _json = deepcopy(self.json)  # The returned json is modified and is not saved back into the VM object
         _json['autoboot'] = False
 
         for prop in ('snapshots', 'create_timestamp', 'server_uuid', 'state', 'zonepath', 'zone_state', 'zoneid',
@@ -803,6 +812,7 @@ class Vm(_StatusModel, _JsonPickleModel, _OSType, _HVMType, _UserTasksModel):
     def post_delete(sender, instance, **kwargs):
         """Remove cache items and cleanup node and storage resources"""
         if instance.node:
+            instance.node.resource_ledger.remove(instance.uuid)
             instance.node.update_resources(save=True)
             zpools = instance.get_disks().keys()
             dc = instance.dc
@@ -829,10 +839,21 @@ class Vm(_StatusModel, _JsonPickleModel, _OSType, _HVMType, _UserTasksModel):
         if sync_json or self._node_changed:
             self.sync_json()
 
+        resources_changed = self._resources_changed(kwargs.get('update_fields', None))
+
         # Classic django model.save()
         ret = super(Vm, self).save(**kwargs)
         self._update_changed = False
 
+        # Update VM resources in node resource ledger(s)
+        if self._node_changed:
+            if self._orig_node:
+                self._orig_node.resource_ledger.remove(self.uuid)
+            if self.node:
+                self.node.resource_ledger.update(self)
+        elif resources_changed and self.node:
+            self.node.resource_ledger.update(self)
+
         # Save tags if set
         if self._tags is not None:
             # noinspection PyArgumentList
@@ -866,6 +887,14 @@ class Vm(_StatusModel, _JsonPickleModel, _OSType, _HVMType, _UserTasksModel):
 
         return ret
 
+    def _resources_changed(self, update_fields):
+        """Return True if save(update_fields=update_fields) may change resources used by this VM"""
+        if update_fields is None or self.RESOURCE_FIELDS.intersection(update_fields):
+            return True
+
+        # Disk sizes are calculated differently for deployed and not created VMs
+        return 'status' in update_fields and (self.status == self.NOTCREATED) != (self._orig_status == self.NOTCREATED)
+
     def save_disks(self, disks, **kwargs):
         """Set disks list in json"""
         if self.is_hvm():
@@ -996,7 +1025,7 @@ class Vm(_StatusModel, _JsonPickleModel, _OSType, _HVMType, _UserTasksModel):
         """
         res = SortedPickleDict()
 
-        j = pair_keys_to_items(self.json.get(item, []), key)
+        j = pair_keys_to_items(deepcopy(self.json.get(item, [])), key)  # diff_dict_nested() modifies the new items
         j_active = pair_keys_to_items(self.json_active.get(item, []), key)
 
         add_, remove_, update_ = diff_dict_nested(j_active, j, key, remove_empty=remove_empty)
@@ -2262,6 +2291,6 @@ class Vm(_StatusModel, _JsonPickleModel, _OSType, _HVMType, _UserTasksModel):
     @extra_opts.setter
     def extra_opts(self, extra_opts):
         if self.is_kvm():
-            self.json['qemu_extra_opts'] = extra_opts
+            self.save_item('qemu_extra_opts', extra_opts, save=False)
         elif self.is_bhyve():
-            self.json['bhyve_extra_opts'] = extra_opts
+            self.save_item('bhyve_extra_opts', extra_opts, save=False)
@@ -0,0 +1,49 @@
+from unittest import TestCase
+
+from django.db import transaction
+
+from api.dc.base.serializers import DefaultDcSettingsSerializer
+from vms.models import DefaultDc
+from vms.models.dc import DcSettings
+
+
+class DcSettingsTests(TestCase):
+    setting = 'DC_SETTINGS_TEST'
+
+    def tearDown(self):
+        dc = DefaultDc()
+
+        if self.setting in dc.custom_settings:
+            dc.delete_setting(self.setting)
+
+    def test_serializer(self):
+        dc = DefaultDc()
+        ser = DefaultDcSettingsSerializer(None, dc)
+        self.assertEqual(ser.data['dc'], dc.name)
+        self.assertNotIn('dc', dc.settings)
+
+    def test_version_bump_on_commit(self):
+        dc = DefaultDc()
+        version = DcSettings.get_version(dc.id)
+
+        with transaction.atomic():
+            dc.save_setting(self.setting, 1)
+            self.assertEqual(DcSettings.get_version(dc.id), version)
+            self.assertEqual(dc.settings[self.setting], 1)
+
+        self.assertGreater(DcSettings.get_version(dc.id), version)
+        self.assertEqual(DefaultDc().settings[self.setting], 1)
+
+    def test_no_version_bump_on_rollback(self):
+        dc = DefaultDc()
+        version = DcSettings.get_version(dc.id)
+
+        try:
+            with transaction.atomic():
+                dc.save_setting(self.setting, 1)
+                raise ValueError
+        except ValueError:
+            pass
+
+        self.assertEqual(DcSettings.get_version(dc.id), version)
+        self.assertNotIn(self.setting, DefaultDc().settings)
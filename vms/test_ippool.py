@@ -0,0 +1,57 @@
+from unittest import TestCase
+from uuid import uuid4
+
+from django.db import transaction
+
+from vms.models import Subnet
+from vms.models.ippool import IPAddressPool
+
+
+class IPAddressPoolTests(TestCase):
+    ips = ['10.255.255.10', '10.255.255.11']
+
+    def setUp(self):
+        self.pool = IPAddressPool(Subnet(uuid=str(uuid4()), name='test-ip-pool'))  # Not saved -> no IPs in DB
+        self.pool.rebuild(ips=())
+
+    def tearDown(self):
+        self.pool.clear()
+
+    def test_add_without_transaction(self):
+        self.pool.add(self.ips)
+        self.assertEqual(self.pool.load(), set(self.ips))
+
+    def test_add_on_commit(self):
+        with transaction.atomic():
+            self.pool.add(self.ips)
+            self.assertEqual(self.pool.load(), set())
+
+        self.assertEqual(self.pool.load(), set(self.ips))
+
+    def test_add_rollback(self):
+        try:
+            with transaction.atomic():
+                self.pool.add(self.ips)
+                raise ValueError
+        except ValueError:
+            pass
+
+        self.assertEqual(self.pool.load(), set())
+
+    def test_remove_immediately(self):
+        self.pool.add(self.ips)
+
+        with transaction.atomic():
+            self.pool.remove(self.ips[:1])
+            self.assertEqual(self.pool.load(), set(self.ips[1:]))
+
+    def test_synced_marker_expires(self):
+        ttl = self.pool.redis.ttl(self.pool.key_synced)
+        self.assertTrue(0 < ttl <= IPAddressPool.SYNC_TIMEOUT)
+
+    def test_rebuild_after_expiration(self):
+        self.pool.add(self.ips)  # Not free in DB
+        self.pool.redis.delete(self.pool.key_synced)
+        self.assertEqual(self.pool.allocate(count=2), [])
+        self.assertEqual(self.pool.load(), set())
+        self.assertTrue(self.pool.redis.exists(self.pool.key_synced))
@@ -0,0 +1,92 @@
+from unittest import TestCase
+from uuid import uuid4
+
+from django.db import transaction
+
+from vms.models.ledger import ResourceLedger
+
+
+class FakeNode(object):
+    def __init__(self):
+        self.uuid = str(uuid4())
+
+
+class FakeVm(object):
+    dc_id = 1
+
+    def __init__(self, cpu=1, ram=512, disk=10240):
+        self.uuid = str(uuid4())
+        self.cpu, self.ram, self.disk = cpu, ram, disk
+
+    def get_cpu_ram(self, ram_overhead=False):
+        return self.cpu, self.ram
+
+    def get_disks(self, active=False):
+        return {'zones': self.disk}
+
+    def is_deployed(self):
+        return False
+
+
+class ResourceLedgerTests(TestCase):
+    def setUp(self):
+        self.ledger = ResourceLedger(FakeNode())
+        self.ledger.rebuild(entries={})
+
+    def tearDown(self):
+        self.ledger.clear()
+
+    def _redis_entries(self):
+        return ResourceLedger(self.ledger.node).entries
+
+    def test_update_without_transaction(self):
+        vm = FakeVm()
+        self.ledger.update(vm)
+        self.assertEqual(self._redis_entries(), {vm.uuid: (1, 1, 512, {'zones': 10240})})
+        self.ledger.remove(vm.uuid)
+        self.assertEqual(self._redis_entries(), {})
+
+    def test_update_on_commit(self):
+        vm1, vm2 = FakeVm(), FakeVm(cpu=2)
+        self.ledger.update(vm1)
+
+        with transaction.atomic():
+            self.ledger.update(vm2)
+            self.ledger.remove(vm1.uuid)
+            self.assertEqual(self.ledger.get_used_resources('zones'), (2, 512, 10240))
+            self.assertTrue(self.ledger.redis.hexists(self.ledger.key, vm1.uuid))
+            self.assertFalse(self.ledger.redis.hexists(self.ledger.key, vm2.uuid))
+
+        self.assertEqual(self._redis_entries(), {vm2.uuid: (1, 2, 512, {'zones': 10240})})
+
+    def test_update_rollback(self):
+        vm1, vm2 = FakeVm(), FakeVm()
+        self.ledger.update(vm1)
+
+        try:
+            with transaction.atomic():
+                self.ledger.update(vm2)
+                self.ledger.remove(vm1.uuid)
+                self.assertEqual(list(self.ledger.entries), [vm2.uuid])
+                raise ValueError
+        except ValueError:
+            pass
+
+        self.assertEqual(list(self._redis_entries()), [vm1.uuid])
+
+    def test_update_savepoint_rollback(self):
+        vm1, vm2 = FakeVm(), FakeVm()
+
+        with transaction.atomic():
+            self.ledger.update(vm1)
+
+            try:
+                with transaction.atomic():
+                    self.ledger.update(vm2)
+                    raise ValueError
+            except ValueError:
+                pass
+
+            self.assertEqual(list(self.ledger.entries), [vm1.uuid])
+
+        self.assertEqual(list(self._redis_entries()), [vm1.uuid])
@@ -0,0 +1,100 @@
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+
+from vms.models import Dc
+from vms.models.base import decode_counter
+from vms.models.cache import LocalModelCache
+
+
+@override_settings(VMS_JSON_STORAGE='pickle')
+class PickleModelTests(SimpleTestCase):
+    def _dc(self):
+        dc = Dc(name='test-pickle-model')
+        dc.json = {
+            'settings': {'VMS_VM_DOMAIN_DEFAULT': 'example.com'},
+            'nics': [{'ip': '10.0.0.1'}, {'ip': '10.0.0.2'}],
+        }
+
+        return dc
+
+    def test_decode_cached(self):
+        dc = self._dc()
+        self.assertTrue(dc.json)  # Decoded and cached
+        count = decode_counter.count
+
+        for _ in range(3):
+            self.assertEqual(dc.json['nics'][1]['ip'], '10.0.0.2')
+
+        self.assertEqual(decode_counter.count, count)
+
+    def test_decode_copy(self):
+        dc = self._dc()
+        json = dc.json
+        self.assertIsNot(json, dc.json)
+
+        json['settings'].update({'VMS_VM_DOMAIN_DEFAULT': 'example.org'})
+        del json['nics'][0]
+        json['new'] = True
+
+        self.assertEqual(dc.custom_settings, {'VMS_VM_DOMAIN_DEFAULT': 'example.com'})
+        self.assertEqual(len(dc.json['nics']), 2)
+        self.assertNotIn('new', dc.json)
+
+    def test_custom_settings_changed(self):
+        dc = self._dc()
+        dcs = dc.custom_settings
+        dcs.update({'VMS_VM_DOMAIN_DEFAULT': 'example.org'})
+        self.assertNotEqual(dc.custom_settings, dcs)
+
+        dc.custom_settings = dcs
+        self.assertEqual(dc.custom_settings, dcs)
+
+    def test_setter_invalidates_cache(self):
+        dc = self._dc()
+        self.assertTrue(dc.json)  # Decoded and cached
+        dc.save_item('new', 1, save=False)
+        self.assertEqual(dc.json['new'], 1)
+        dc.delete_item('new', save=False)
+        self.assertNotIn('new', dc.json)
+
+
+@override_settings(VMS_JSON_STORAGE='dual')
+class JsonbModelTests(PickleModelTests):
+    def test_jsonb_not_shared(self):
+        dc = self._dc()
+        json = dc.json
+        self.assertIsNot(json, dc.json_data)
+
+        json['nics'][0]['ip'] = '10.0.0.3'
+        self.assertEqual(dc.json_data['nics'][0]['ip'], '10.0.0.1')
+        self.assertEqual(dc.json['nics'][0]['ip'], '10.0.0.1')
+
+    def test_local_model_cache_copy(self):
+        dc = self._dc()
+        self.assertTrue(dc.json)  # Decoded and cached
+        dc_copy = LocalModelCache._copy(dc)
+        dc_copy.json['new'] = True
+        dc_copy.save_item('nics', [], save=False)
+
+        self.assertEqual(len(dc.json['nics']), 2)
+        self.assertNotIn('new', dc.json)
+        self.assertEqual(dc_copy.json['nics'], [])
+
+
+@override_settings(VMS_JSON_STORAGE='jsonb')
+class JsonbOnlyModelTests(JsonbModelTests):
+    pass
+
+
+class JsonbEncodeTests(SimpleTestCase):
+    def test_encode_jsonb(self):
+        data = {'a': [1, 2.5, True, None, {'b': 'c'}], u'd': u'e'}
+        jsonb = Dc._encode_jsonb(data)
+
+        self.assertEqual(jsonb, data)
+        self.assertIsNot(jsonb['a'], data['a'])
+        self.assertIsNot(jsonb['a'][4], data['a'][4])
+
+    def test_encode_jsonb_invalid(self):
+        for data in ({'a': (1, 2)}, {1: 'a'}, {'a': {'b': set()}}, {'a': [float('nan')]}, {'a': object()}):
+            self.assertRaises(ValueError, Dc._encode_jsonb, data)
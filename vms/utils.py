@@ -27,6 +27,38 @@ class FrozenAttrDict(frozendict):
     __getattr__ = frozendict.__getitem__
 
 
+class FrozenDefAttrDict(FrozenAttrDict):
+    """
+    FrozenAttrDict with support for default values (same as DefAttrDict, but immutable).
+    """
+    def __init__(self, data, defaults=None):
+        super(FrozenDefAttrDict, self).__init__(data)
+        if defaults is None:
+            defaults = AttrDict()
+        self.__defaults__ = defaults
+
+    def __getattr__(self, key):
+        if key.startswith('_'):  # Internal attributes (e.g. during unpickling)
+            raise AttributeError(key)
+
+        try:
+            return self._dict[key]
+        except KeyError:
+            return getattr(self.__defaults__, key)
+
+    def __getitem__(self, key):
+        try:
+            return self._dict[key]
+        except KeyError:
+            return getattr(self.__defaults__, key)
+
+    def get(self, key, default=None):
+        try:
+            return self.__getitem__(key)
+        except (KeyError, AttributeError):
+            return default
+
+
 class DefAttrDict(AttrDict):
     """
     AttrDict with support for default values, which must be a AttrDict.